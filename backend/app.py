@@ -1,26 +1,41 @@
 import os
 os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import uuid
 import re
 import json
 import tempfile
+import time
 import requests as http_requests
 
+import numpy as np
+
 from models.embedder import Embedder
+from models.embedding_scheduler import EmbeddingScheduler
 from processors.document_reader import extract_text_from_file
 from processors.metadata_extractor import extract_metadata # Added
 from processors.text_chunker import chunk_syllabus, chunk_syllabus_with_modules
 from processors.curriculum_segmenter import segment_curriculum
 from vectorstores.chroma_store import VectorStore
+from vectorstores.bm25_index import BM25Index
+from vectorstores.partitions import PartitionCatalog
 from services.chunk_cleaner import clean_retrieved_chunks
+from services.chunk_features import is_reference_entry, keyword_set
 from services.chunk_quality import filter_chunks_for_embedding   # NEW: pre-embedding quality gate
 
 from services.question_analyzer import analyze_question
 from services.co_mapper import CoMapper            # Feature 3
 from services.concept_expander import ConceptStore
+from services.question_context import QuestionContext
+from services.syllabus_concepts import extract_syllabus_concept_sets
+from services import nlp_registry
+from services.analysis_jobs import JobStore, JobRunner
+from services.result_cache import ResultCache
+from services.question_bank import QuestionBank
+from services.bloom_classifier import classify_bloom
+from validators.syllabus_validator import LLM_GATE
 from services.curriculum_scope_validator import (
     extract_syllabus_concepts,
     store_scope_concepts,
@@ -29,6 +44,17 @@ from services.curriculum_scope_validator import (
     validate_scope,
 )
 from config import SCOPE_VALIDATOR_ENABLED, SCOPE_HIGH_SIM_THR, SCOPE_OVERLAP_MIN_THR, SCOPE_CONCEPTS_TOP_N, SCOPE_SEMANTIC_CUTOFF
+from config import EMBED_BATCHING_ENABLED, EMBED_BATCH_WINDOW_MS, EMBED_BATCH_MAX_SIZE
+from config import ANALYZE_BATCH_VECTORIZED, ANALYZE_STREAM_WINDOW
+from config import ANALYSIS_JOBS_DB, ANALYSIS_JOB_WORKERS, ANALYSIS_JOB_LEASE_SECONDS
+from config import (
+    RESULT_CACHE_ENABLED, RESULT_CACHE_MEMORY_ITEMS, RESULT_CACHE_DISK_ENABLED,
+    RESULT_CACHE_PATH, RESULT_CACHE_MAX_MB, LLM_MODEL_PATH,
+)
+from config import QUESTION_BANK_ENABLED, QUESTION_BANK_PATH, QUESTION_BANK_MIN_COSINE
+from config import BM25_ENABLED, BM25_PATH, BM25_FUSION, BM25_CANDIDATES, BM25_RRF_K, BM25_DENSE_WEIGHT
+from config import VECTOR_EXACT_SEARCH, VECTOR_EXACT_MAX_CHUNKS
+from config import CHROMA_PARTITIONED, PARTITION_CATALOG_PATH
 from debug_logger import dsection, dlog, dlist, dsummary, derror, ddivider
 
 # --------------------------------------------------
@@ -38,9 +64,65 @@ app = Flask(__name__)
 CORS(app)
 
 embedder   = Embedder()
-vector_db  = VectorStore(embed_fn=embedder.embed)
-co_mapper  = CoMapper(embed_fn=embedder.embed)     # Feature 3 — shares same embedder
-concept_store = ConceptStore(embed_fn=embedder.embed)
+# Concurrent request threads share one micro-batching queue in front of the model
+embed_scheduler = (
+    EmbeddingScheduler(embedder.embed, window_ms=EMBED_BATCH_WINDOW_MS, max_batch=EMBED_BATCH_MAX_SIZE)
+    if EMBED_BATCHING_ENABLED else None
+)
+embed_fn   = embed_scheduler.embed if embed_scheduler else embedder.embed
+
+# One collection per syllabus in every Chroma store, routed by the catalog
+partition_catalog = PartitionCatalog(PARTITION_CATALOG_PATH) if CHROMA_PARTITIONED else None
+
+vector_db  = VectorStore(
+    embed_fn=embed_fn,
+    lexical_index=BM25Index(BM25_PATH) if BM25_ENABLED else None,
+    fusion=BM25_FUSION,
+    fusion_candidates=BM25_CANDIDATES,
+    rrf_k=BM25_RRF_K,
+    dense_weight=BM25_DENSE_WEIGHT,
+    exact_search=VECTOR_EXACT_SEARCH,
+    exact_max_chunks=VECTOR_EXACT_MAX_CHUNKS,
+    partition_catalog=partition_catalog,
+)
+co_mapper  = CoMapper(embed_fn=embed_fn, partition_catalog=partition_catalog)     # Feature 3 — shares same embedder
+concept_store = ConceptStore(embed_fn=embed_fn, partition_catalog=partition_catalog)
+if partition_catalog is not None and vector_db.collection.count():
+    print("[Startup] WARNING: CHROMA_PARTITIONED is on but the shared 'syllabi' collection still holds "
+          "chunks — run migrate_partitions.py --to partitioned (server stopped).")
+
+# Finished analyses: exact repeats (result cache) and paraphrases (question
+# bank).  The namespace covers every setting that changes a result, so
+# tuning them never serves answers computed under the old values.
+_RESULT_NAMESPACE = "|".join(str(v) for v in (
+    embedder.cache_namespace, os.path.basename(LLM_MODEL_PATH), SCOPE_VALIDATOR_ENABLED,
+    SCOPE_HIGH_SIM_THR, SCOPE_OVERLAP_MIN_THR, SCOPE_SEMANTIC_CUTOFF, SCOPE_CONCEPTS_TOP_N,
+    BM25_ENABLED and (BM25_FUSION, BM25_CANDIDATES, BM25_RRF_K, BM25_DENSE_WEIGHT), VECTOR_EXACT_SEARCH,
+))
+result_cache = ResultCache(
+    RESULT_CACHE_PATH if RESULT_CACHE_DISK_ENABLED else None,
+    memory_items=RESULT_CACHE_MEMORY_ITEMS,
+    max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024,
+    namespace=_RESULT_NAMESPACE,
+) if RESULT_CACHE_ENABLED else None
+question_bank = QuestionBank(
+    QUESTION_BANK_PATH, min_cosine=QUESTION_BANK_MIN_COSINE, namespace=_RESULT_NAMESPACE,
+) if QUESTION_BANK_ENABLED else None
+
+
+def _invalidate_results(syllabus_id=None):
+    """Forget cached analyses of one syllabus (re-ingest / delete), or of all when None."""
+    for cache in (result_cache, question_bank):
+        if cache is None:
+            continue
+        if syllabus_id is None:
+            cache.clear()
+        else:
+            cache.invalidate(syllabus_id)
+
+
+def _index_generation(syllabus_id):
+    return result_cache.generation(syllabus_id) if result_cache is not None else 0
 
 SYLLABI         = {}
 SYLLABUS_CHUNKS = {}
@@ -62,7 +144,7 @@ def _hydrate_syllabi_from_chroma():
     in /parse_curriculum returns True (causing 'already selected but nothing shown').
     """
     try:
-        all_data = vector_db.collection.get(include=["metadatas"])
+        all_data = vector_db.get_chunks(include=["metadatas"])
         metas    = all_data.get("metadatas") or []
 
         seen_ids = set()
@@ -100,22 +182,46 @@ def _hydrate_syllabi_from_chroma():
                 SYLLABI[sid]["modules"].append(mod)
 
         # Automatically backfill scope concepts for hydrated syllabi if they don't have them
+        from services.curriculum_scope_validator import (
+            load_scope_concepts, store_scope_concepts_many, extract_syllabus_concepts_many,
+            precompute_scope_embeddings,
+        )
+        pending = {}
         for sid in seen_ids:
             try:
-                from services.curriculum_scope_validator import load_scope_concepts, store_scope_concepts, extract_syllabus_concepts
-                if not load_scope_concepts(sid):
+                if load_scope_concepts(sid):
+                    # Memory-map the persisted word matrix (encodes it once for older ingestions)
+                    precompute_scope_embeddings(sid, embed_fn)
+                else:
                     print(f"[Startup] Backfilling scope concepts for syllabus: {sid}")
-                    res = vector_db.collection.get(where={"syllabus_id": sid}, include=["documents"])
+                    res = vector_db.get_chunks(sid, include=["documents"])
                     docs = res.get("documents") or []
                     if docs:
-                        full_text = " ".join(docs)
-                        concepts = extract_syllabus_concepts(full_text, top_n=SCOPE_CONCEPTS_TOP_N)
-                        store_scope_concepts(sid, concepts)
-                        print(f"[Startup] Successfully backfilled {len(concepts)} concepts for {sid}")
+                        pending[sid] = " ".join(docs)
                     else:
                         print(f"[Startup] No documents found in database for {sid}")
             except Exception as ex:
                 print(f"[Startup] Failed to backfill concepts for {sid}: {ex}")
+        if pending:
+            try:
+                # One batched spaCy pass and one transaction for every backfilled syllabus
+                extracted  = extract_syllabus_concepts_many(list(pending.values()), top_n=SCOPE_CONCEPTS_TOP_N)
+                backfilled = dict(zip(pending.keys(), extracted))
+                store_scope_concepts_many(backfilled, embed_fn=embed_fn)
+                print(f"[Startup] Successfully backfilled scope concepts for {len(backfilled)} syllabi")
+            except Exception as ex:
+                print(f"[Startup] Failed to store backfilled concepts: {ex}")
+
+        # Per-chunk features into memory and the BM25 index (built for older ingestions)
+        try:
+            backfilled = vector_db.backfill_chunk_features()
+            if backfilled:
+                print(f"[Startup] Backfilled chunk features for {backfilled} chunks")
+            indexed = vector_db.backfill_lexical_index()
+            if indexed:
+                print(f"[Startup] Built BM25 index for {indexed} syllabi")
+        except Exception as ex:
+            print(f"[Startup] Failed to load chunk features / BM25 index: {ex}")
 
         if hydrated:
             print(f"[Startup] Hydrated {hydrated} syllabus entries from ChromaDB.")
@@ -164,136 +270,6 @@ def split_questions(raw: str):
     return [p.strip() for p in text.split("\n") if p.strip()]
 
 
-# Module-name extractor — reads from chunk text since VectorStore metadata
-# does not store a module field. Handles two formats:
-#
-#  Format A — explicit prefix:  "M1:", "Module 1:", "UNIT 1:"
-#  Format B — table row:        "1  Introduction: topics..."
-#                               (bare number, then title ending in colon)
-_MODULE_RE = re.compile(
-    r"(?:^|\n)\s*"
-    r"(?:M(?:odule)?\s*([\dIVX]+)\s*[:–-]|UNIT\s*([\dIVX]+)\s*[:–-])"
-    r"\s*(.+)",
-    re.IGNORECASE,
-)
-
-# Matches: start-of-line, optional whitespace, 1-2 digit unit number,
-# whitespace, then a capitalised title word ending in a colon.
-_BARE_UNIT_RE = re.compile(
-    r"(?:^|\n)\s*(\d{1,2})\s+([A-Z][^:\n]{2,60}?):\s*",
-)
-
-def _calculate_keyword_overlap(question: str, chunk_text: str) -> float:
-    """Calculate simple lexical overlap of technical terms between question and chunk."""
-    q_words = set(w for w in re.findall(r'\b[a-zA-Z0-9]{4,}\b', question.lower()))
-    if not q_words:
-        return 0.0
-    c_words = set(w for w in re.findall(r'\b[a-zA-Z0-9]{4,}\b', chunk_text.lower()))
-    overlap = q_words.intersection(c_words)
-    return len(overlap) / len(q_words)
-
-
-def _extract_module(text: str):
-    """Return a module label from chunk text, or None."""
-    if not text:
-        return None
-
-    # Try Format A first (explicit prefix)
-    m = _MODULE_RE.search(text)
-    if m:
-        num   = (m.group(1) or m.group(2) or "").strip()
-        title = m.group(3).strip()[:60]
-        return f"Unit {num}: {title}" if num else title
-
-    # Try Format B (bare number + capitalised title, as in university tables)
-    m2 = _BARE_UNIT_RE.search(text)
-    if m2:
-        num   = m2.group(1).strip()
-        title = m2.group(2).strip()[:50]
-        return f"Unit {num}: {title}"
-
-    return None
-
-
-# ── Reference-book detection ──────────────────────────────────────────────────
-# Catches bibliographic entries that get chunked as numbered topics.
-# Two-pronged approach:
-#   1. Regex for short "Title, Author, ABBREV" entries
-#   2. Keyword scan for publisher names in short chunks
-
-_REFERENCE_BOOK_RE = re.compile(
-    r"^\s*(?:\d{1,2}\.\s*)?"           # optional leading number: "1. " or "8. "
-    r".{5,60},"                         # title (5-60 chars) followed by comma
-    r"\s*[A-Z][A-Za-z.\s]{1,30},"      # author name(s) followed by comma
-    r"\s*[A-Z]{2,5}\s*\.?\s*$",        # publisher abbreviation at end
-    re.MULTILINE,
-)
-
-# Common publisher / bibliographic keywords (case-insensitive scan)
-_PUBLISHER_KW = re.compile(
-    r"Publishing|Publishers|Press|Edition|McGraw|Pearson|Wiley|Springer|Elsevier|"
-    r"Oxford|Cambridge|Prentice|Tata|Jaico|Housing|Ltd\.?|Inc\.?|"
-    r"\bPHI\b|\bEPH\b|\bTMH\b|\bSPD\b|\bBPB\b",
-    re.IGNORECASE,
-)
-
-# Strong bibliographic signals — patterns that almost certainly indicate
-# a reference book entry, even if the title contains syllabus-sounding words.
-_BIBLIO_SIGNAL = re.compile(
-    r"""\bby\s+[A-Z][a-z]"""             # "by Stavronlakis", "by Reynolds"
-    r"""|\u201c[^\u201d]{5,}\u201d"""     # "curly-quoted title"
-    r'''|"[^"]{5,}"'''                    # "straight-quoted title"
-    r"""|'[^']{5,}'"""                    # 'single-quoted title'
-    r"""|\b\d{1,2}(?:st|nd|rd|th)\s+Ed""" # "2nd Edition"
-    r"""|\bISBN\b""",                     # ISBN number
-    re.IGNORECASE,
-)
-
-# Words that strongly indicate real syllabus content, not a reference
-_SYLLABUS_SIGNAL = re.compile(
-    r"Overview|Definition|Introduction|Concept|Architecture|Protocol|"
-    r"Mechanism|Technique|Algorithm|Application|Type[s]?|Model[s]?|"
-    r"Security|Management|System|Design|Analysis|Method",
-    re.IGNORECASE,
-)
-
-
-def _is_reference_entry(text: str) -> bool:
-    """
-    Return True if the chunk looks like a bibliographic reference
-    rather than actual syllabus content.
-
-    Catches patterns like:
-      - "E-Commerce, M.M. Oka, EPH"
-      - "Loshin Pete, Murphy P.A. : Electronic Commerce, Jaico Publishing Housing."
-      - '8. "Third Generation Mobile Telecommunication systems", by P.Stavronlakis, Springer Publishers.'
-    """
-    text = text.strip()
-    # Real topics are longer — references are short citation lines
-    if len(text) > 150:
-        return False
-
-    # Approach 1: regex for  Title, Author, ABBREV  pattern
-    if _REFERENCE_BOOK_RE.match(text):
-        return True
-
-    # Approach 2: publisher keyword + bibliographic signal = always a reference
-    #   (overrides syllabus-signal safety valve — book titles often contain
-    #    words like "Systems", "Security", "Management")
-    has_publisher = _PUBLISHER_KW.search(text)
-    has_biblio    = _BIBLIO_SIGNAL.search(text)
-
-    if has_publisher and has_biblio:
-        return True
-
-    # Approach 3: publisher keyword + comma, but no syllabus signal
-    if len(text) < 150 and text.count(",") >= 1 and has_publisher:
-        if not _SYLLABUS_SIGNAL.search(text):
-            return True
-
-    return False
-
-
 def _dedup_chunks(chunks: list) -> list:
     """Remove duplicate, overlapping, and reference-book chunks. Keep lowest-distance copy."""
     result: list = []
@@ -306,8 +282,9 @@ def _dedup_chunks(chunks: list) -> list:
         if not txt:
             continue
 
-        # Skip reference book entries
-        if _is_reference_entry(txt):
+        # Skip reference book entries (flag precomputed at ingestion when present)
+        is_ref = c.get("is_reference")
+        if is_ref if is_ref is not None else is_reference_entry(txt):
             continue
             
         # Check if this text (or a significant part of it) is already in results
@@ -374,7 +351,15 @@ def _smart_filter_chunks(chunks: list, same_gap: float = 0.02, cross_gap: float
 # --------------------------------------------------
 # Helper: build enriched response dict
 # --------------------------------------------------
-def _build_result(q_text, similarity, top_chunks, analysis):
+# Ingestion-time flags used by the filters above; not part of the response
+_INTERNAL_CHUNK_KEYS = ("is_reference", "is_noisy")
+
+
+def _public_chunks(chunks):
+    return [{k: v for k, v in c.items() if k not in _INTERNAL_CHUNK_KEYS} for c in chunks]
+
+
+def _build_result(q_text, similarity, top_chunks, analysis, ctx=None):
     """Assemble the full per-question result dict."""
     return {
         "question":          q_text,
@@ -391,17 +376,21 @@ def _build_result(q_text, similarity, top_chunks, analysis):
         "difficulty":        analysis["difficulty"],
         "mapped_co":         analysis["mapped_co"],
         "mapped_co_full":    analysis.get("mapped_co_full"),   # e.g. "PEC-IT801B.CO2"
+        "co_similarity":     analysis.get("co_similarity"),
+        "co_alternatives":   analysis.get("co_alternatives", []),  # next-best COs, ranked
         "mapped_pco":        analysis["mapped_pco"],
         # ---- existing LLM fields ----
         "llm_decision":      analysis["llm"]["llm_decision"]     if analysis["llm"] else None,
         "llm_justification": analysis["llm"]["llm_justification"] if analysis["llm"] else None,
         "llm_module":        analysis["llm"]["llm_module"]        if analysis["llm"] else None,
-        "top_chunks":        analysis.get("top_chunks", top_chunks),
+        "top_chunks":        _public_chunks(analysis.get("top_chunks", top_chunks)),
         # ---- diagnostics ----
         "semantic_score":    top_chunks[0].get("semantic_score", similarity) if top_chunks else 0.0,
         "keyword_overlap_score": top_chunks[0].get("keyword_overlap_score", 0.0) if top_chunks else 0.0,
         "concept_boost":     top_chunks[0].get("concept_boost", 0.0) if top_chunks else 0.0,
         "final_score":       similarity,
+        "encode_calls":      ctx.encode_calls if ctx is not None else None,
+        "cache_source":      None,      # "exact" (result cache) or "semantic" (question bank) when reused
     }
 
 
@@ -507,7 +496,7 @@ def ingest_syllabus():
         
         # Clean text and chunk, then filter out references before embedding
         raw_seg_chunks = chunk_syllabus_with_modules(seg["text"])
-        ref_filtered   = [c for c in raw_seg_chunks if not _is_reference_entry(c[0])]
+        ref_filtered   = [c for c in raw_seg_chunks if not is_reference_entry(c[0])]
         # STEP 1-4: Pre-embedding quality gate — reject metadata/header chunks
         seg_chunks, purged = filter_chunks_for_embedding(ref_filtered)
         print(f"[Ingest Legacy] {seg.get('subject_name','?')}: {len(seg_chunks)} quality chunks "
@@ -544,7 +533,7 @@ def ingest_syllabus():
         try:
             _scope_text = " ".join(c for c, _ in seg_chunks)
             _scope_concepts = extract_syllabus_concepts(_scope_text, top_n=SCOPE_CONCEPTS_TOP_N)
-            store_scope_concepts(seg_id, _scope_concepts)
+            store_scope_concepts(seg_id, _scope_concepts, embed_fn=embed_fn)
         except Exception as _e:
             print(f"[ScopeValidator] Concept extraction failed for {seg_id}: {_e}")
 
@@ -588,6 +577,9 @@ def ingest_syllabus():
             except Exception as _e:
                 print(f"[Ingest Auto PCO] Failed for {seg_id}: {_e}")
 
+        # Only now is the syllabus fully indexed (chunks, scope concepts, COs)
+        _invalidate_results(seg_id)
+
     return jsonify({
         "success":     True,
         "syllabus_ids": segment_ids,
@@ -652,8 +644,7 @@ def ingest_from_url():
         seg_id = seg.get("syllabus_id") or str(uuid.uuid4())
         
         # Check if already embedded
-        existing = vector_db.collection.get(where={"syllabus_id": seg_id})
-        if existing and existing.get("ids"):
+        if vector_db.exists(seg_id):
             print(f"[Ingestion] URL: Skipping duplicate {seg_id}")
             segment_ids.append(seg_id)
             continue
@@ -661,7 +652,7 @@ def ingest_from_url():
         segment_ids.append(seg_id)
         
         raw_seg_chunks = chunk_syllabus_with_modules(seg.get("syllabus_text", seg.get("text", "")))
-        ref_filtered = [c for c in raw_seg_chunks if not _is_reference_entry(c[0])]
+        ref_filtered = [c for c in raw_seg_chunks if not is_reference_entry(c[0])]
         clean_chunks, purged = filter_chunks_for_embedding(ref_filtered)
         
         if not clean_chunks:
@@ -681,16 +672,20 @@ def ingest_from_url():
         
         vector_db.add_syllabus(seg_id, clean_chunks, extra_meta=extra_meta)
 
+        # One NLP pass feeds both the ConceptStore and the Curriculum Scope Validator
+        _raw_concepts, _scope_concepts, _concept_stats = extract_syllabus_concept_sets(
+            [c for c, _ in clean_chunks], top_n=SCOPE_CONCEPTS_TOP_N
+        )
+        print(f"[Ingestion] Concept coverage for {seg_id}: "
+              f"{_concept_stats['chunks_with_concepts']}/{_concept_stats['chunks']} chunks")
         try:
-            concept_store.add_syllabus_concepts(seg_id, [c for c, _ in clean_chunks])
+            concept_store.add_syllabus_concepts(seg_id, [c for c, _ in clean_chunks], concepts=_raw_concepts)
         except Exception as e:
             pass
 
-        # Curriculum Scope Validator — extract and store domain concepts
+        # Curriculum Scope Validator — store domain concepts
         try:
-            _scope_text = " ".join(c for c, _ in clean_chunks)
-            _scope_concepts = extract_syllabus_concepts(_scope_text, top_n=SCOPE_CONCEPTS_TOP_N)
-            store_scope_concepts(seg_id, _scope_concepts)
+            store_scope_concepts(seg_id, _scope_concepts, embed_fn=embed_fn)
         except Exception as _e:
             print(f"[ScopeValidator] Concept extraction failed for {seg_id}: {_e}")
 
@@ -749,6 +744,9 @@ def ingest_from_url():
             except Exception as _e:
                 print(f"[Ingest Auto PCO URL] Failed for {seg_id}: {_e}")
 
+        # Only now is the syllabus fully indexed (chunks, concepts, COs)
+        _invalidate_results(seg_id)
+
     return jsonify({
         "success":     True,
         "syllabus_ids": segment_ids,
@@ -773,6 +771,9 @@ def delete_syllabus():
     vector_db.delete_syllabus(syllabus_id)
     SYLLABUS_CHUNKS.pop(syllabus_id, None)
     delete_scope_concepts(syllabus_id)
+    concept_store.delete_syllabus_concepts(syllabus_id)
+    co_mapper.clear_pcos_for_syllabus(syllabus_id)
+    _invalidate_results(syllabus_id)
     return jsonify({"success": True})
 
 
@@ -787,16 +788,17 @@ def purge_all():
         vector_db.delete_syllabus(sid)
     SYLLABI.clear()
     SYLLABUS_CHUNKS.clear()
-    clear_all_scope_concepts()   # wipe scope_concepts.json
+    clear_all_scope_concepts()   # wipe scope_concepts.sqlite3
+    concept_store.clear()
+    vector_db.clear_derived()
+    co_mapper.clear_pcos_for_syllabus()
+    _invalidate_results()
 
     # Also try to nuke any orphaned vectors not tracked in SYLLABI
     try:
-        total_in_db = vector_db.collection.count()
+        total_in_db = vector_db.count()
         if total_in_db > 0:
-            # Get all IDs and delete them
-            all_data = vector_db.collection.get()
-            if all_data and all_data.get("ids"):
-                vector_db.collection.delete(ids=all_data["ids"])
+            vector_db.reset_collection()
     except Exception as e:
         print(f"Purge orphan cleanup error: {e}")
 
@@ -867,11 +869,215 @@ def detect_subject():
         "metadata": extracted
     })
 
-@app.route("/analyze_question", methods=["POST", "OPTIONS"])
-def analyze():
-    if request.method == "OPTIONS":
-        return ("", 200)
+# --------------------------------------------------
+# Question analysis stages
+#   retrieval  — _retrieve_one (per question) / _retrieve_batch (whole paper)
+#   finishing  — _finish_question: filters, scope gate, LLM, CO enrichment
+# --------------------------------------------------
+_RETRIEVAL_K = 8   # increased k to 8 before dedup
+
+
+def _chunk_entry(doc, feats, d, sem_sim, kw_overlap, applied_boost, final_sim):
+    return {
+        "text":       doc,
+        "distance":   d,
+        "semantic_score": sem_sim,
+        "keyword_overlap_score": kw_overlap,
+        "concept_boost": applied_boost,
+        "similarity": final_sim,
+        "module":       feats.module,
+        "is_reference": feats.reference,
+        "is_noisy":     feats.noisy,
+    }
+
+
+def _chunk_features(result):
+    """ChunkFeatures of every chunk in one query() result (memory / metadata, no regex)."""
+    docs  = (result.get("documents") or [[]])[0]
+    metas = (result.get("metadatas") or [[]])[0] or [None] * len(docs)
+    ids   = (result.get("ids") or [[]])[0] or [None] * len(docs)
+    return [vector_db.chunk_features.get(cid, doc, meta) for cid, doc, meta in zip(ids, docs, metas)]
+
+
+def _keyword_overlap(q_words, c_words):
+    """Share of the question's technical terms that appear in the chunk."""
+    return len(q_words & c_words) / len(q_words) if q_words else 0.0
+
+
+def _prefetch_options(syllabus_id):
+    """Which question-derived texts QuestionContext prefetches for a syllabus."""
+    return {
+        "concepts":      bool(syllabus_id),
+        "content_words": bool(syllabus_id) and SCOPE_VALIDATOR_ENABLED,
+    }
+
+
+def _retrieve_one(q_text, syllabus_id, ctx=None):
+    """
+    Retrieve and hybrid-score chunks for one question → (ctx, top_chunks, similarity).
+    ctx: a context already prefetched by the caller (the question-bank probe).
+    """
+    # One encode call for the question, its concept phrases and its
+    # scope-validator words — every stage below reads from this context.
+    if ctx is None:
+        ctx = QuestionContext(q_text, embed_fn=embed_fn).prefetch(**_prefetch_options(syllabus_id))
+
+    # Pass syllabus_id to filter the vector search! (Fixes mismatch)
+    result    = vector_db.query(q_text, k=_RETRIEVAL_K, syllabus_id=syllabus_id, ctx=ctx)
+    distances = result.get("distances") or [[]]
+    docs      = result.get("documents") or [[]]
+
+    similarity = 0.0
+    top_chunks = []
+
+    if distances and distances[0]:
+        # --- DYNAMIC CONCEPT EXPANSION BOOST ---
+        concept_boost = 0.0
+        if syllabus_id:
+            concept_boost = concept_store.compute_concept_boost(q_text, syllabus_id, ctx=ctx)
+
+        q_words = keyword_set(q_text)
+        for d, doc, feats in zip(distances[0], docs[0], _chunk_features(result)):
+            d = float(d) if d is not None else 1.0
+            sem_sim = max(0.0, min(1.0, 1.0 - d))
+            kw_overlap = _keyword_overlap(q_words, feats.tokens)
+
+            # Hybrid score: 80% semantic, 20% exact keyword overlap
+            base_sim = (sem_sim * 0.80) + (kw_overlap * 0.20)
+
+            # Apply safe hybrid boosting (only if moderately high)
+            applied_boost = concept_boost if base_sim > 0.60 else 0.0
+            final_sim = min(1.0, base_sim + applied_boost)
+
+            top_chunks.append(_chunk_entry(doc, feats, d, sem_sim, kw_overlap, applied_boost, final_sim))
+
+        # Re-sort chunks by new hybrid similarity
+        top_chunks.sort(key=lambda x: x["similarity"], reverse=True)
+        if top_chunks:
+            similarity = top_chunks[0]["similarity"]
+
+    return ctx, top_chunks, similarity
+
+
+def _retrieve_batch(questions, syllabus_id, contexts=None):
+    """
+    Vectorized retrieval for a whole question paper.
+
+    One nlp.pipe + one encode call for every question (QuestionContext.prefetch_many),
+    one multi-embedding collection.query, one concept-boost product, and the
+    hybrid scores of all question × chunk pairs as (n_questions, k) arrays.
+    Scores are identical to running _retrieve_one per question.
+    contexts: contexts already prefetched by the caller (the question-bank probe).
+    """
+    if contexts is None:
+        contexts = QuestionContext.prefetch_many(questions, embed_fn=embed_fn, **_prefetch_options(syllabus_id))
+    q_mat   = np.stack([ctx.query_embedding for ctx in contexts])
+    results = vector_db.query_many(q_mat, k=_RETRIEVAL_K, syllabus_id=syllabus_id, query_texts=questions)
+    boosts  = (
+        concept_store.compute_concept_boost_many(contexts, syllabus_id)
+        if syllabus_id else np.zeros(len(questions))
+    )
+
+    n, k  = len(questions), max([len(r["distances"][0]) for r in results] + [0])
+    dist  = np.ones((n, k))
+    kw    = np.zeros((n, k))
+    valid = np.zeros((n, k), dtype=bool)
+    feats = [_chunk_features(r) for r in results]
+    for i, (q_text, r) in enumerate(zip(questions, results)):
+        q_words = keyword_set(q_text)
+        for j, (d, f) in enumerate(zip(r["distances"][0], feats[i])):
+            valid[i, j] = True
+            dist[i, j]  = float(d) if d is not None else 1.0
+            kw[i, j]    = _keyword_overlap(q_words, f.tokens)
+
+    # Hybrid score: 80% semantic, 20% exact keyword overlap, safe concept boost
+    sem     = np.clip(1.0 - dist, 0.0, 1.0)
+    base    = (sem * 0.80) + (kw * 0.20)
+    applied = np.where(base > 0.60, boosts[:, None], 0.0)
+    final   = np.minimum(1.0, base + applied)
+
+    retrieved = []
+    for i, (ctx, r) in enumerate(zip(contexts, results)):
+        top_chunks = [
+            _chunk_entry(doc, f, float(dist[i, j]), float(sem[i, j]), float(kw[i, j]),
+                         float(applied[i, j]), float(final[i, j]))
+            for j, (doc, f) in enumerate(zip(r["documents"][0], feats[i]))
+            if valid[i, j]
+        ]
+        top_chunks.sort(key=lambda x: x["similarity"], reverse=True)
+        similarity = top_chunks[0]["similarity"] if top_chunks else 0.0
+        retrieved.append((ctx, top_chunks, similarity))
+    return retrieved
+
+
+def _finish_question(q_text, ctx, top_chunks, similarity, syllabus_id, threshold):
+    """Filters, scope gate, gated LLM analysis and CO enrichment for one retrieved question."""
+    # Dedup → reference filter → smart relevance filter → chunk cleaner
+    top_chunks = _smart_filter_chunks(_dedup_chunks(top_chunks))
+    top_chunks = clean_retrieved_chunks(top_chunks)  # post-retrieval noise gate
+
+    # ── Curriculum Scope Validator ──────────────────────────────────────
+    # Fires only when similarity is high AND concept overlap is extremely low.
+    # Catches false positives caused by generic shared academic vocabulary
+    # (e.g. ML question scoring high on a Cryptography syllabus because
+    # both domains use "algorithm", "key", "system").
+    if SCOPE_VALIDATOR_ENABLED:
+        scope_result = validate_scope(
+            question=q_text,
+            similarity=similarity,
+            syllabus_id=syllabus_id,
+            embed_fn=embed_fn,
+            high_sim_threshold=SCOPE_HIGH_SIM_THR,
+            min_overlap_threshold=SCOPE_OVERLAP_MIN_THR,
+            semantic_cutoff=SCOPE_SEMANTIC_CUTOFF,
+            ctx=ctx,
+        )
+        if scope_result["is_out_of_scope"]:
+            # Build a rejection result without invoking the LLM
+            rejection_analysis = {
+                "is_in_syllabus":        False,
+                "gatekeeper_passed":     False,
+                "reason":                scope_result["reason"],
+                "llm":                   None,
+                "top_chunks":            [],
+                "retrieval_status":      "MATCH_FOUND",
+                "match_strength":        "WEAK_MATCH",
+                "match_type":            "OUT_OF_CURRICULUM",
+                "modules_detected":      [],
+                "bloom_level":           "Unknown",
+                "difficulty":            "Unknown",
+                "mapped_co":             None,
+                "mapped_pco":            None,
+                "curriculum_relevance":  False,
+                "strict_syllabus_match": False,
+                "rejection_reason":      scope_result["reason"],
+                "concept_overlap":       scope_result["concept_overlap"],
+                "scope_rejected":        True,
+            }
+            return _build_result(q_text, similarity, [], rejection_analysis, ctx=ctx)
+    # ── End Scope Validator ─────────────────────────────────────────────
+
+    syllabus_meta = SYLLABI.get(syllabus_id, {}) if syllabus_id else {}
+
+    analysis = analyze_question(
+        question=q_text,
+        similarity=similarity,
+        threshold=threshold,
+        top_chunks=top_chunks,
+        co_mapper=co_mapper,
+        syllabus_id=syllabus_id,
+        syllabus_meta=syllabus_meta,
+        ctx=ctx,
+    )
+
+    return _build_result(q_text, similarity, top_chunks, analysis, ctx=ctx)
+
 
+def _parse_analyze_request():
+    """
+    Read an /analyze_question request (JSON, form or uploaded paper).
+    Returns (questions, syllabus_id, threshold, vectorized, data) or a Flask error response.
+    """
     data  = request.form if request.form else request.get_json(silent=True) or {}
     files = request.files if request.form else {}
 
@@ -892,126 +1098,318 @@ def analyze():
 
     questions = split_questions(question_text)
 
-    # Process each question (handles both single and batch)
-    processed_results = []
-    for q_text in questions:
-        # Pass syllabus_id to filter the vector search! (Fixes mismatch)
-        result    = vector_db.query(q_text, k=8, syllabus_id=syllabus_id) # increased k to 8 before dedup
-        distances = result.get("distances") or [[]]
-        docs      = result.get("documents") or [[]]
-        metas     = result.get("metadatas") or [[]]
-
-        similarity = 0.0
-        top_chunks = []
-
-        if distances and distances[0]:
-            # --- DYNAMIC CONCEPT EXPANSION BOOST ---
-            concept_boost = 0.0
-            if syllabus_id:
-                concept_boost = concept_store.compute_concept_boost(q_text, syllabus_id)
-
-            for d, doc, meta in zip(distances[0], docs[0], metas[0]):
-                d = float(d) if d is not None else 1.0
-                sem_sim = max(0.0, min(1.0, 1.0 - d))
-                kw_overlap = _calculate_keyword_overlap(q_text, doc)
-                
-                # Hybrid score: 80% semantic, 20% exact keyword overlap
-                base_sim = (sem_sim * 0.80) + (kw_overlap * 0.20)
-                
-                # Apply safe hybrid boosting (only if moderately high)
-                applied_boost = concept_boost if base_sim > 0.60 else 0.0
-                final_sim = min(1.0, base_sim + applied_boost)
-                
-                top_chunks.append({
-                    "text":       doc,
-                    "distance":   d,
-                    "semantic_score": sem_sim,
-                    "keyword_overlap_score": kw_overlap,
-                    "concept_boost": applied_boost,
-                    "similarity": final_sim,
-                    "module": (
-                        meta.get("module") or _extract_module(doc)
-                    ) if isinstance(meta, dict) else _extract_module(doc),
-                })
-            
-            # Re-sort chunks by new hybrid similarity
-            top_chunks.sort(key=lambda x: x["similarity"], reverse=True)
-            if top_chunks:
-                similarity = top_chunks[0]["similarity"]
-
-        # Dedup → reference filter → smart relevance filter → chunk cleaner
-        top_chunks = _smart_filter_chunks(_dedup_chunks(top_chunks))
-        top_chunks = clean_retrieved_chunks(top_chunks)  # post-retrieval noise gate
-
-        # ── Curriculum Scope Validator ──────────────────────────────────────
-        # Fires only when similarity is high AND concept overlap is extremely low.
-        # Catches false positives caused by generic shared academic vocabulary
-        # (e.g. ML question scoring high on a Cryptography syllabus because
-        # both domains use "algorithm", "key", "system").
-        if SCOPE_VALIDATOR_ENABLED:
-            scope_result = validate_scope(
-                question=q_text,
-                similarity=similarity,
-                syllabus_id=syllabus_id,
-                embed_fn=embedder.embed,
-                high_sim_threshold=SCOPE_HIGH_SIM_THR,
-                min_overlap_threshold=SCOPE_OVERLAP_MIN_THR,
-                semantic_cutoff=SCOPE_SEMANTIC_CUTOFF,
-            )
-            if scope_result["is_out_of_scope"]:
-                # Build a rejection result without invoking the LLM
-                rejection_analysis = {
-                    "is_in_syllabus":        False,
-                    "gatekeeper_passed":     False,
-                    "reason":                scope_result["reason"],
-                    "llm":                   None,
-                    "top_chunks":            [],
-                    "retrieval_status":      "MATCH_FOUND",
-                    "match_strength":        "WEAK_MATCH",
-                    "match_type":            "OUT_OF_CURRICULUM",
-                    "modules_detected":      [],
-                    "bloom_level":           "Unknown",
-                    "difficulty":            "Unknown",
-                    "mapped_co":             None,
-                    "mapped_pco":            None,
-                    "curriculum_relevance":  False,
-                    "strict_syllabus_match": False,
-                    "rejection_reason":      scope_result["reason"],
-                    "concept_overlap":       scope_result["concept_overlap"],
-                    "scope_rejected":        True,
-                }
-                processed_results.append(_build_result(q_text, similarity, [], rejection_analysis))
-                continue
-        # ── End Scope Validator ─────────────────────────────────────────────
+    # Multi-question papers run retrieval vectorized across all questions;
+    # "batch_mode": false forces the per-question loop (for comparison).
+    vectorized = len(questions) > 1 and str(
+        data.get("batch_mode", ANALYZE_BATCH_VECTORIZED)
+    ).lower() not in ("0", "false", "no", "off")
+    return questions, syllabus_id, threshold, vectorized, data
 
-        syllabus_meta = SYLLABI.get(syllabus_id, {}) if syllabus_id else {}
 
-        analysis = analyze_question(
-            question=q_text,
-            similarity=similarity,
-            threshold=threshold,
-            top_chunks=top_chunks,
-            co_mapper=co_mapper,
-            syllabus_id=syllabus_id,
-            syllabus_meta=syllabus_meta,
-        )
+def _iter_results(questions, syllabus_id, threshold, vectorized, window=None, catch_errors=False, use_cache=True):
+    """
+    Yield (index, result) in question order.
+
+    window:       vectorized retrieval runs over slices of this many questions,
+                  so the first result does not wait for the whole paper.
+    catch_errors: yield the exception as the result instead of raising, so a
+                  stream can report a failed question and carry on.
+    use_cache:    serve repeated questions from the result cache and
+                  paraphrases from the question bank (and store fresh results
+                  in both); reused questions skip retrieval and the LLM.
+    """
+    cache = result_cache if use_cache else None
+    bank  = question_bank if use_cache else None
+    step  = window or len(questions) or 1
+    for start in range(0, len(questions), step):
+        block  = questions[start:start + step]
+        cached = {}
+        probes = {}      # offset → (query vector, bloom level) for the question bank
+        contexts = {}    # offset → QuestionContext prefetched for the bank probe
+        # Captured before any lookup: results are stored under the generation
+        # they were computed against, so a re-ingest mid-analysis never caches them as fresh
+        generation = _index_generation(syllabus_id)
+        if cache is not None:
+            for offset, q_text in enumerate(block):
+                hit = cache.get(q_text, syllabus_id, threshold, generation)
+                if hit is not None:
+                    hit["question"]     = q_text
+                    hit["cache_source"] = "exact"
+                    cached[offset] = hit
+
+        misses = [o for o in range(len(block)) if o not in cached]
+        if bank is not None and misses:
+            try:
+                # The probe reads the contexts' query vectors, and retrieval reuses
+                # the same contexts: still one encode call per question
+                built = QuestionContext.prefetch_many(
+                    [block[o] for o in misses], embed_fn=embed_fn, **_prefetch_options(syllabus_id)
+                )
+                contexts = dict(zip(misses, built))
+                vectors = np.stack([ctx.query_embedding for ctx in built])
+                blooms  = [classify_bloom(block[o])["bloom_level"] for o in misses]
+                hits    = bank.lookup_many(vectors, blooms, syllabus_id, threshold, generation)
+                for o, vec, bloom, hit in zip(misses, vectors, blooms, hits):
+                    if hit is None:
+                        probes[o] = (vec, bloom)
+                        continue
+                    reused = hit["result"]
+                    reused.update({
+                        "question":          block[o],
+                        "cache_source":      "semantic",
+                        "reused_question":   hit["question"],
+                        "reused_similarity": hit["cosine"],
+                    })
+                    cached[o] = reused
+            except Exception as e:
+                derror("QuestionBank", "Lookup failed", str(e))
+            misses = [o for o in misses if o not in cached]
+
+        retrieved = {}
+        if vectorized and misses:
+            try:
+                retrieved = dict(zip(misses, _retrieve_batch(
+                    [block[o] for o in misses], syllabus_id,
+                    contexts=[contexts[o] for o in misses] if contexts else None,
+                )))
+            except Exception as e:
+                if not catch_errors:
+                    raise
+                for offset in range(len(block)):
+                    yield start + offset, cached.get(offset, e)
+                continue
 
-        # Enrich with full CO identifier (e.g. "PEC-IT801B.CO2") for the UI
-        if analysis.get("mapped_co") and co_mapper:
+        for offset, q_text in enumerate(block):
+            if offset in cached:
+                yield start + offset, cached[offset]
+                continue
             try:
-                co_full = co_mapper.map_question_to_co_full(q_text, syllabus_id)
-                if co_full:
-                    analysis["mapped_co_full"] = co_full.get("full_co_id")
-            except Exception:
-                pass
+                ctx, top_chunks, similarity = (
+                    retrieved[offset] if offset in retrieved
+                    else _retrieve_one(q_text, syllabus_id, ctx=contexts.get(offset))
+                )
+                result = _finish_question(q_text, ctx, top_chunks, similarity, syllabus_id, threshold)
+                if cache is not None:
+                    cache.put(q_text, syllabus_id, threshold, result, generation)
+                if offset in probes:
+                    vec, bloom = probes[offset]
+                    bank.add(q_text, vec, bloom, result, syllabus_id, threshold, generation)
+            except Exception as e:
+                if not catch_errors:
+                    raise
+                result = e
+            yield start + offset, result
+
+
+def _wants_cache(data):
+    return str(data.get("use_cache", True)).lower() not in ("0", "false", "no", "off")
+
+
+@app.route("/analyze_question", methods=["POST", "OPTIONS"])
+def analyze():
+    if request.method == "OPTIONS":
+        return ("", 200)
 
-        processed_results.append(_build_result(q_text, similarity, top_chunks, analysis))
+    parsed = _parse_analyze_request()
+    if not isinstance(parsed[0], list):
+        return parsed      # (error response, status)
+    questions, syllabus_id, threshold, vectorized, data = parsed
 
+    processed_results = [
+        r for _, r in _iter_results(questions, syllabus_id, threshold, vectorized, use_cache=_wants_cache(data))
+    ]
 
     if len(questions) == 1:
         return jsonify({"mode": "single", **processed_results[0]})
     
-    return jsonify({"mode": "batch", "questions": processed_results})
+    return jsonify({
+        "mode":      "batch",
+        "execution": "vectorized" if vectorized else "sequential",
+        "questions": processed_results,
+    })
+
+
+@app.route("/analyze_question/stream", methods=["POST", "OPTIONS"])
+def analyze_stream():
+    """
+    Streaming variant of /analyze_question for long question papers.
+
+    Each question's result is written as soon as it is ready, so the first
+    result arrives after one question's work regardless of paper length,
+    and results are not accumulated on the server.
+
+    Format: newline-delimited JSON (application/x-ndjson) by default;
+    Server-Sent Events when "format": "sse" is sent or the client accepts
+    text/event-stream.
+
+    Records:
+        {"type": "start",   "total": 60, "execution": "vectorized"}
+        {"type": "result",  "index": 0, "question": "...", ...}     ← _build_result payload
+        {"type": "error",   "index": 7, "question": "...", "error": "..."}
+        {"type": "summary", "total": 60, "completed": 60, "in_syllabus": 41, ..., "elapsed_ms": 83120.4}
+    """
+    if request.method == "OPTIONS":
+        return ("", 200)
+
+    parsed = _parse_analyze_request()
+    if not isinstance(parsed[0], list):
+        return parsed      # (error response, status)
+    questions, syllabus_id, threshold, vectorized, data = parsed
+
+    sse = (
+        str(data.get("format", "")).lower() == "sse"
+        or "text/event-stream" in request.headers.get("Accept", "")
+    )
+
+    def encode(record):
+        payload = json.dumps(record)
+        return f"event: {record['type']}\ndata: {payload}\n\n" if sse else payload + "\n"
+
+    def generate():
+        t0 = time.perf_counter()
+        summary = {
+            "type":            "summary",
+            "total":           len(questions),
+            "completed":       0,
+            "errors":          0,
+            "in_syllabus":     0,
+            "not_in_syllabus": 0,
+            "llm_calls":       0,
+            "cache_hits":      0,
+            "match_types":     {},
+        }
+        yield encode({
+            "type":      "start",
+            "total":     len(questions),
+            "execution": "vectorized" if vectorized else "sequential",
+        })
+
+        for index, result in _iter_results(
+            questions, syllabus_id, threshold, vectorized,
+            window=ANALYZE_STREAM_WINDOW, catch_errors=True, use_cache=_wants_cache(data),
+        ):
+            if isinstance(result, Exception):
+                derror("Stream", f"Question {index + 1} failed", str(result))
+                summary["errors"] += 1
+                yield encode({"type": "error", "index": index, "question": questions[index], "error": str(result)})
+                continue
+
+            summary["completed"] += 1
+            summary["in_syllabus" if result.get("is_in_syllabus") else "not_in_syllabus"] += 1
+            if result.get("cache_source"):
+                summary["cache_hits"] += 1
+            elif result.get("llm_decision") is not None:
+                summary["llm_calls"] += 1
+            mt = result.get("match_type", "UNKNOWN")
+            summary["match_types"][mt] = summary["match_types"].get(mt, 0) + 1
+            yield encode({"type": "result", "index": index, **result})
+
+        summary["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        yield encode(summary)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+# --------------------------------------------------
+# Routes — background analysis jobs
+# --------------------------------------------------
+def _run_job_questions(questions, syllabus_id, threshold, vectorized):
+    return _iter_results(
+        questions, syllabus_id, threshold, vectorized,
+        window=ANALYZE_STREAM_WINDOW, catch_errors=True,
+    )
+
+
+job_runner = JobRunner(
+    JobStore(ANALYSIS_JOBS_DB, lease_seconds=ANALYSIS_JOB_LEASE_SECONDS), _run_job_questions, workers=ANALYSIS_JOB_WORKERS, gate=LLM_GATE
+)
+
+
+@app.before_request
+def _start_job_runner():
+    # Started by the process that actually serves requests, so the debug
+    # reloader's parent process never claims jobs.  Resumes interrupted jobs.
+    job_runner.start()
+
+
+@app.route("/analysis_jobs", methods=["POST", "OPTIONS"])
+def submit_analysis_job():
+    """
+    Queue a question paper for background analysis.
+
+    Accepts the same body as /analyze_question (text, form or uploaded
+    paper).  Returns 202 immediately:
+        {"job_id": "3f2a...", "status": "queued", "progress": {"total": 60, ...}}
+    """
+    if request.method == "OPTIONS":
+        return ("", 200)
+
+    parsed = _parse_analyze_request()
+    if not isinstance(parsed[0], list):
+        return parsed      # (error response, status)
+    questions, syllabus_id, threshold, vectorized, _ = parsed
+
+    job = job_runner.submit(questions, syllabus_id, threshold, vectorized)
+    dlog("Jobs", "Queued", f"{job['job_id']} ({len(questions)} questions)")
+    return jsonify(job), 202
+
+
+@app.route("/analysis_jobs", methods=["GET"])
+def list_analysis_jobs():
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify({"jobs": job_runner.store.list(limit)})
+
+
+@app.route("/analysis_jobs/<job_id>", methods=["GET"])
+def analysis_job_status(job_id):
+    """
+    Job status with per-question progress.
+
+        {"job_id": "...", "status": "running",
+         "progress": {"total": 60, "completed": 23, "errors": 1, "pending": 36, "percent": 40.0},
+         "question_states": ["done", "done", "error", "pending", ...]}
+    """
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    job["question_states"] = job_runner.store.question_states(job_id, job["progress"]["total"])
+    return jsonify(job)
+
+
+@app.route("/analysis_jobs/<job_id>/result", methods=["GET"])
+def analysis_job_result(job_id):
+    """
+    Results stored so far, in question order — partial while the job runs.
+    Page with ?offset=&limit=.  Each entry is the /analyze_question result
+    payload plus "index" and "ok"; failed questions carry "error" instead.
+    """
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    offset = request.args.get("offset", 0, type=int)
+    limit  = request.args.get("limit", None, type=int)
+    return jsonify({
+        "job_id":    job_id,
+        "status":    job["status"],
+        "complete":  job["status"] == "done",
+        "progress":  job["progress"],
+        "questions": job_runner.store.results(job_id, offset=offset, limit=limit),
+    })
+
+
+@app.route("/analysis_jobs/<job_id>", methods=["DELETE"])
+def cancel_analysis_job(job_id):
+    """Cancel a queued or running job (results so far are kept); ?purge=1 also deletes it."""
+    if job_runner.store.status(job_id) is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    cancelled = job_runner.store.cancel(job_id)
+    purged = request.args.get("purge", "").lower() in ("1", "true", "yes") and job_runner.store.delete(job_id)
+    return jsonify({"job_id": job_id, "cancelled": cancelled, "purged": bool(purged)})
 
 
 # --------------------------------------------------
@@ -1233,7 +1631,7 @@ def ingest_selected():
 
         # Chunk → filter references → quality gate → embed
         raw_chunks  = chunk_syllabus_with_modules(seg["syllabus_text"])
-        ref_filtered = [c for c in raw_chunks if not _is_reference_entry(c[0])]
+        ref_filtered = [c for c in raw_chunks if not is_reference_entry(c[0])]
         # STEP 1-4: Pre-embedding quality gate — purge low-info metadata chunks
         clean_chunks, purged = filter_chunks_for_embedding(ref_filtered)
 
@@ -1269,20 +1667,26 @@ def ingest_selected():
         vector_db.add_syllabus(sid, clean_chunks, extra_meta=extra_meta)
         dlog("Database", "Vectors stored", f"{len(clean_chunks)} chunks embedded and saved")
 
+        # One NLP pass feeds both the ConceptStore and the Curriculum Scope Validator
+        _raw_concepts, _scope_concepts, _concept_stats = extract_syllabus_concept_sets(
+            [c for c, _ in clean_chunks], top_n=SCOPE_CONCEPTS_TOP_N
+        )
+
         # Existing ConceptStore (retrieval boosting)
         try:
-            concept_store.add_syllabus_concepts(sid, [c for c, _ in clean_chunks])
+            concept_store.add_syllabus_concepts(sid, [c for c, _ in clean_chunks], concepts=_raw_concepts)
             dlog("Database", "Concept store", "updated")
+            dlog("Database", "Concept coverage",
+                 f"{_concept_stats['chunks_with_concepts']}/{_concept_stats['chunks']} chunks "
+                 f"({_concept_stats['coverage']:.0%})")
             print(f"[Ingestion] Extracted local concepts for {sid}")
         except Exception as e:
             derror("Database", "Concept store update failed", str(e))
             print(f"[Ingestion] Failed to extract concepts for {sid}: {e}")
 
-        # Curriculum Scope Validator — extract and store domain concepts
+        # Curriculum Scope Validator — store domain concepts
         try:
-            _scope_text = " ".join(c for c, _ in clean_chunks)
-            _scope_concepts = extract_syllabus_concepts(_scope_text, top_n=SCOPE_CONCEPTS_TOP_N)
-            store_scope_concepts(sid, _scope_concepts)
+            store_scope_concepts(sid, _scope_concepts, embed_fn=embed_fn)
             dlog("Database", "Scope concepts stored", len(_scope_concepts))
         except Exception as _e:
             derror("Database", "Scope concept extraction failed", str(_e))
@@ -1329,6 +1733,7 @@ def ingest_selected():
                 derror("Database", "CO-PO auto-ingest failed", str(_e))
                 print(f"[Ingestion] Failed to auto-ingest parsed CO-PO for {sid}: {_e}")
 
+        _invalidate_results(sid)
         SYLLABI[sid] = {
             "syllabus_id":           sid,
             "curriculum_department":  seg["curriculum_department"],
@@ -1354,7 +1759,7 @@ def ingest_selected():
     # ── DEBUG: Ingestion Summary (Section 10) ──────────────────────────────
     db_chunk_count = 0
     try:
-        db_chunk_count = vector_db.collection.count()
+        db_chunk_count = vector_db.count()
     except Exception:
         pass
 
@@ -1431,6 +1836,9 @@ def reset_vector_db():
     Use this when the vector DB is polluted with bad embeddings.
     """
     vector_db.reset_collection()
+    concept_store.clear()
+    co_mapper.clear_pcos_for_syllabus()
+    _invalidate_results()
     count = len(SYLLABI)
     SYLLABI.clear()
     SYLLABUS_CHUNKS.clear()
@@ -1442,6 +1850,35 @@ def reset_vector_db():
     })
 
 
+@app.route("/diagnostics", methods=["GET"])
+def diagnostics():
+    """
+    Runtime performance counters for the serving pipeline.
+
+    Response structure:
+        {
+          "embedder":        {"model": "...", "backend": "onnx-int8", "device": "cpu"},
+          "embedding_cache": {"memory_hits": 120, "disk_hits": 40, "misses": 12, ...},
+          "embedding_scheduler": {"queue_depth": 0, "batch_size_histogram": {"4": 17}, ...},
+          "nlp":             {"load_seconds": 0.41, "loads_avoided": 38, "docs_per_sec": 210.5, ...},
+          "llm_gate":        {"interactive": {"acquired": 9, "avg_wait_ms": 310.2}, "background": {...}},
+          "analysis_jobs":   {"workers": 1, "alive": 1, "active_jobs": ["3f2a..."], "questions_done": 412},
+          "result_cache":    {"memory_hits": 310, "disk_hits": 42, "misses": 95, "hit_ratio": 0.7875, ...},
+          "question_bank":   {"lookups": 95, "hits": 31, "bloom_blocks": 4, "stored": 1220, ...}
+        }
+    """
+    return jsonify({
+        "embedder":            embedder.describe(),
+        "embedding_cache":     embedder.cache_stats(),
+        "embedding_scheduler": embed_scheduler.stats() if embed_scheduler else {},
+        "nlp":                 nlp_registry.stats(),
+        "llm_gate":            LLM_GATE.stats(),
+        "analysis_jobs":       job_runner.stats(),
+        "result_cache":        result_cache.stats() if result_cache is not None else {},
+        "question_bank":       question_bank.stats() if question_bank is not None else {},
+    })
+
+
 # --------------------------------------------------
 # Entrypoint
 # --------------------------------------------------
@@ -25,6 +25,115 @@ LLM_RUNTIME = {
     "n_gpu_layers": 20,
 }
 
+# --------------------------------------------------
+# Embeddings
+# --------------------------------------------------
+EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-base"
+
+# Inference backend for the embedder (models/embedder.py):
+#   "torch"     — SentenceTransformer on EMBEDDING_DEVICE ("auto" picks cuda/mps/cpu)
+#   "onnx"      — exported ONNX Runtime graph (CPU)
+#   "onnx-int8" — dynamically int8-quantized ONNX graph (CPU, fastest on GPU-less nodes)
+# Use evaluation/bench_embedding_backends.py to check parity before switching.
+EMBEDDING_BACKEND      = os.environ.get("EMBEDDING_BACKEND", "torch")
+EMBEDDING_DEVICE       = os.environ.get("EMBEDDING_DEVICE", "auto")
+EMBEDDING_QUANT_CONFIG = os.environ.get("EMBEDDING_QUANT_CONFIG", "avx2")  # avx2 | avx512 | avx512_vnni | arm64
+EMBEDDING_EXPORT_DIR   = os.path.join(BASE_DIR, "data", "onnx_models")
+
+# Persistent content-addressed embedding cache (models/embedding_cache.py).
+# Keys are (model, task prefix, text hash), so re-ingesting unchanged chunks,
+# CO texts or concept phrases never runs the transformer again.
+EMBED_CACHE_ENABLED      = True
+EMBED_CACHE_PATH         = os.path.join(BASE_DIR, "data", "embedding_cache", "embeddings.sqlite3")
+EMBED_CACHE_DTYPE        = "float32"   # "float16" halves disk usage at ~1e-3 precision
+EMBED_CACHE_MAX_MB       = 512         # disk tier size bound (LRU eviction beyond this)
+EMBED_CACHE_MEMORY_ITEMS = 10_000      # in-memory LRU tier (~30 MB at 768 dims)
+
+# Dynamic micro-batching of concurrent embed calls (models/embedding_scheduler.py).
+# Requests arriving within the window are encoded together in one call.
+EMBED_BATCHING_ENABLED = True
+EMBED_BATCH_WINDOW_MS  = 5      # how long the worker waits to fill a batch
+EMBED_BATCH_MAX_SIZE   = 64     # texts per batch; larger requests bypass the queue
+
+# --------------------------------------------------
+# spaCy (services/nlp_registry.py)
+# --------------------------------------------------
+# One shared pipeline per process.  Concept extraction only needs POS tags
+# and noun chunks (tagger + parser), so NER and the lemmatizer are skipped.
+SPACY_MODEL      = "en_core_web_sm"
+SPACY_DISABLE    = ("ner", "lemmatizer")
+SPACY_BATCH_SIZE = 32                                          # docs per nlp.pipe batch
+SPACY_N_PROCESS  = int(os.environ.get("SPACY_N_PROCESS", "1"))  # >1 forks workers for bulk ingest
+# Long texts are streamed through nlp.pipe in pieces of at most this many
+# characters (split on whitespace), so nothing is truncated and peak memory
+# is bounded by one batch of pieces rather than the whole syllabus.
+SPACY_MAX_PIECE_CHARS = 20_000
+
+# --------------------------------------------------
+# Question analysis
+# --------------------------------------------------
+# Multi-question papers: run retrieval for all questions at once (one encode
+# call, one multi-embedding Chroma query, array hybrid scoring).  Requests
+# may still pass "batch_mode": false to use the per-question loop.
+ANALYZE_BATCH_VECTORIZED = True
+
+# /analyze_question/stream: questions retrieved per vectorized slice.  Small
+# enough that the first result arrives quickly, large enough to batch well.
+ANALYZE_STREAM_WINDOW = 16
+
+# /analysis_jobs: background jobs for large papers and bulk audits
+# (services/analysis_jobs.py).  Workers share this process's models and
+# yield the LLM to interactive requests.
+ANALYSIS_JOBS_DB      = os.path.join(BASE_DIR, "data", "analysis_jobs.sqlite3")
+ANALYSIS_JOB_WORKERS  = int(os.environ.get("ANALYSIS_JOB_WORKERS", "1"))
+# A running job whose process has not renewed its lease for this long is
+# re-queued for another worker (the heartbeat renews every third of it).
+ANALYSIS_JOB_LEASE_SECONDS = 120
+
+# Finished /analyze_question results (services/result_cache.py), keyed by
+# normalized question, syllabus_id, threshold and the syllabus's index
+# generation.  Re-ingest / delete invalidates only that syllabus.  Requests
+# may send "use_cache": false to force a fresh analysis.
+RESULT_CACHE_ENABLED      = True
+RESULT_CACHE_MEMORY_ITEMS = 2_000
+RESULT_CACHE_DISK_ENABLED = True       # persist across restarts (and evaluation runs)
+RESULT_CACHE_PATH         = os.path.join(BASE_DIR, "data", "result_cache.sqlite3")
+RESULT_CACHE_MAX_MB       = 128
+
+# Semantic reuse of earlier analyses for paraphrased questions
+# (services/question_bank.py): a question reuses its nearest analyzed
+# neighbour when cosine >= QUESTION_BANK_MIN_COSINE and the Bloom level
+# matches.  Tune with evaluation/replay_question_bank.py --verify.
+QUESTION_BANK_ENABLED    = True
+QUESTION_BANK_PATH       = os.path.join(BASE_DIR, "data", "question_bank.sqlite3")
+QUESTION_BANK_MIN_COSINE = 0.93
+
+# Lexical candidate generation (vectorstores/bm25_index.py): a per-syllabus
+# BM25 index built at ingestion, fused with the dense search inside
+# VectorStore.query.  Each side contributes BM25_CANDIDATES chunks before the
+# fused top k is taken.  Compare with evaluation/bench_bm25_fusion.py.
+BM25_ENABLED      = True
+BM25_PATH         = os.path.join(BASE_DIR, "data", "bm25_index.sqlite3")
+BM25_FUSION       = "rrf"      # "rrf" (reciprocal rank) | "weighted" (cosine + normalised BM25)
+BM25_CANDIDATES   = 20
+BM25_RRF_K        = 60
+BM25_DENSE_WEIGHT = 0.7        # "weighted" only: share of the dense cosine
+
+# Exact dense search for syllabus-filtered queries (VectorStore): a NumPy
+# top-k over the syllabus's normalised chunk matrix (held in memory, ~1 MB
+# per 300 chunks) instead of a filtered HNSW search.  Larger syllabi and
+# global searches fall back to HNSW.
+VECTOR_EXACT_SEARCH     = True
+VECTOR_EXACT_MAX_CHUNKS = 20_000
+
+# One Chroma collection per syllabus (vectorstores/partitions.py) for the
+# chunk, concept and CO stores instead of one shared collection filtered by
+# syllabus_id; deleting a syllabus drops its collections.  Existing data is
+# moved with migrate_partitions.py (server stopped) before switching.
+# Compare with evaluation/bench_partitioning.py.
+CHROMA_PARTITIONED     = False
+PARTITION_CATALOG_PATH = os.path.join(BASE_DIR, "data", "partition_catalog.sqlite3")
+
 # Multi-module detection: minimum chunk similarity to count a module
 MODULE_SIMILARITY_THRESHOLD = 0.5
 
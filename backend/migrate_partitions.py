@@ -0,0 +1,129 @@
+"""
+migrate_partitions.py
+---------------------
+Move the Chroma stores between the shared layout (one collection per store,
+filtered by syllabus_id) and the partitioned one (one collection per
+syllabus, see vectorstores/partitions.py).
+
+Stop the server first, run the migration, then set CHROMA_PARTITIONED in
+config.py to match.  Rows are copied syllabus by syllabus (embeddings
+included, nothing is re-embedded), registered in the partition catalog and
+only then removed from the source.  The BM25 index, chunk features and
+question caches are keyed by chunk id and need no change.
+
+Usage:
+    python migrate_partitions.py --to partitioned --dry-run
+    python migrate_partitions.py --to partitioned
+    python migrate_partitions.py --to shared --stores syllabi concept_store
+"""
+
+import os
+os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
+
+import sys
+import time
+import argparse
+
+import chromadb
+
+from config import PARTITION_CATALOG_PATH
+from vectorstores.partitions import CollectionRouter, PartitionCatalog
+
+STORES     = ("syllabi", "concept_store", "course_outcomes")
+BATCH_SIZE = 500
+_INCLUDE   = ["embeddings", "documents", "metadatas"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Move Chroma data between the shared and per-syllabus collection layouts.")
+    p.add_argument("--to", required=True, choices=["partitioned", "shared"], help="Target layout.")
+    p.add_argument("--stores", nargs="+", default=list(STORES), choices=STORES, help="Stores to migrate.")
+    p.add_argument("--persist-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_db"))
+    p.add_argument("--catalog", default=PARTITION_CATALOG_PATH, help="Partition catalog path.")
+    p.add_argument("--dry-run", action="store_true", help="Report what would move without writing.")
+    p.add_argument("--keep-source", action="store_true", help="Copy only; leave the source rows in place.")
+    return p.parse_args()
+
+
+def _group_by_syllabus(data):
+    """collection.get result → {syllabus_id: (ids, embeddings, documents, metadatas)}."""
+    groups = {}
+    embs   = data.get("embeddings")           # may be an ndarray — no truthiness test
+    embs   = [] if embs is None else embs
+    docs   = data.get("documents") or [None] * len(data.get("ids") or [])
+    for cid, emb, doc, meta in zip(data.get("ids") or [], embs, docs, data.get("metadatas") or []):
+        sid = (meta or {}).get("syllabus_id")
+        if not sid:
+            continue
+        rows = groups.setdefault(sid, ([], [], [], []))
+        rows[0].append(cid)
+        rows[1].append(list(emb))
+        rows[2].append(doc)
+        rows[3].append(meta)
+    return groups
+
+
+def _copy(target, rows) -> int:
+    ids, embs, docs, metas = rows
+    for i in range(0, len(ids), BATCH_SIZE):
+        target.upsert(
+            ids=ids[i:i + BATCH_SIZE],
+            embeddings=embs[i:i + BATCH_SIZE],
+            documents=docs[i:i + BATCH_SIZE],
+            metadatas=metas[i:i + BATCH_SIZE],
+        )
+    return len(ids)
+
+
+def to_partitioned(router, dry_run, keep_source) -> dict:
+    data   = router.shared.get(include=_INCLUDE)
+    groups = _group_by_syllabus(data)
+    stats  = {"syllabi": len(groups), "rows": sum(len(r[0]) for r in groups.values()),
+              "unassigned": len(data.get("ids") or []) - sum(len(r[0]) for r in groups.values())}
+    if dry_run:
+        return stats
+    for sid, rows in groups.items():
+        _copy(router.for_syllabus(sid, create=True), rows)
+        if not keep_source:
+            router.shared.delete(ids=rows[0])
+    return stats
+
+
+def to_shared(router, dry_run, keep_source) -> dict:
+    stats = {"syllabi": 0, "rows": 0, "unassigned": 0}
+    for sid in router.syllabi():
+        coll = router.for_syllabus(sid)
+        rows = _group_by_syllabus(coll.get(include=_INCLUDE)).get(sid)
+        stats["syllabi"] += 1
+        stats["rows"]    += len(rows[0]) if rows else 0
+        if dry_run:
+            continue
+        if rows:
+            _copy(router.shared, rows)
+        if not keep_source:
+            router.drop(sid)
+    return stats
+
+
+def main():
+    args    = parse_args()
+    client  = chromadb.PersistentClient(path=args.persist_dir)
+    catalog = PartitionCatalog(args.catalog)
+    migrate = to_partitioned if args.to == "partitioned" else to_shared
+
+    print(f"[Migrate] {args.persist_dir} → {args.to}{' (dry run)' if args.dry_run else ''}")
+    for store in args.stores:
+        t0    = time.perf_counter()
+        stats = migrate(CollectionRouter(client, store, catalog), args.dry_run, args.keep_source)
+        print(f"[Migrate] {store:<16} syllabi={stats['syllabi']:<5} rows={stats['rows']:<7} "
+              f"no syllabus_id={stats['unassigned']:<5} {time.perf_counter() - t0:.2f}s")
+        if stats["unassigned"]:
+            print(f"[Migrate] WARNING: {stats['unassigned']} {store} rows have no syllabus_id and stay in the shared collection.")
+
+    if not args.dry_run:
+        print(f"[Migrate] Done. Set CHROMA_PARTITIONED = {args.to == 'partitioned'} in config.py before restarting.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,150 @@
+import os
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    EMBEDDING_DEVICE,
+    EMBEDDING_QUANT_CONFIG,
+    EMBEDDING_EXPORT_DIR,
+    EMBED_CACHE_ENABLED,
+    EMBED_CACHE_PATH,
+    EMBED_CACHE_DTYPE,
+    EMBED_CACHE_MAX_MB,
+    EMBED_CACHE_MEMORY_ITEMS,
+)
+from models.embedding_cache import EmbeddingCache, embedding_namespace
+
+
+# --------------------------------------------------
+# Backend loaders — each returns (SentenceTransformer, device)
+# All backends run the same E5 mean-pooling head; vectors are
+# L2-normalised in Embedder.embed regardless of backend.
+# --------------------------------------------------
+
+def _resolve_device(device: str) -> str:
+    if device and device != "auto":
+        return device
+    import torch
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _load_torch(model_name: str, device: str):
+    device = _resolve_device(device)
+    return SentenceTransformer(model_name, device=device), device
+
+
+def _load_onnx(model_name: str, device: str):
+    # sentence-transformers exports the ONNX graph on first load if the
+    # model repo does not ship one (requires optimum[onnxruntime]).
+    return SentenceTransformer(model_name, device="cpu", backend="onnx"), "cpu"
+
+
+def _load_onnx_int8(model_name: str, device: str):
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    local_dir = os.path.join(EMBEDDING_EXPORT_DIR, model_name.replace("/", "__"))
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANT_CONFIG}.onnx"
+
+    if not os.path.exists(os.path.join(local_dir, file_name)):
+        print(f"[Embedder] Exporting int8 ONNX graph ({EMBEDDING_QUANT_CONFIG}) to {local_dir}")
+        base = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        base.save_pretrained(local_dir)
+        export_dynamic_quantized_onnx_model(
+            base,
+            quantization_config=EMBEDDING_QUANT_CONFIG,
+            model_name_or_path=local_dir,
+        )
+
+    model = SentenceTransformer(
+        local_dir,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={"file_name": file_name},
+    )
+    return model, "cpu"
+
+
+BACKENDS = {
+    "torch":     _load_torch,
+    "onnx":      _load_onnx,
+    "onnx-int8": _load_onnx_int8,
+}
+
+
 class Embedder:
-    def __init__(self):
-        # Using 'cuda' to leverage the NVIDIA GTX 1650 for 5-10x faster embeddings
-        self.model = SentenceTransformer("intfloat/multilingual-e5-base", device='cuda')
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        backend: str = EMBEDDING_BACKEND,
+        device: str = EMBEDDING_DEVICE,
+        use_cache: bool = EMBED_CACHE_ENABLED,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+
+        self.model_name = model_name
+        self.backend    = backend
+        self.model, self.device = BACKENDS[backend](model_name, device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        print(f"[Embedder] {model_name} | backend={backend} | device={self.device}")
+
+        self.cache_namespace = embedding_namespace(model_name, backend)
+
+        self.cache = None
+        if use_cache:
+            self.cache = EmbeddingCache(
+                EMBED_CACHE_PATH,
+                dtype=EMBED_CACHE_DTYPE,
+                max_bytes=EMBED_CACHE_MAX_MB * 1024 * 1024,
+                memory_items=EMBED_CACHE_MEMORY_ITEMS,
+            )
+
+    def _encode(self, processed) -> np.ndarray:
+        vecs = self.model.encode(processed, normalize_embeddings=True, convert_to_numpy=True)
+        return np.ascontiguousarray(vecs, dtype=np.float32)
 
-    def embed(self, texts, task="query"):
+    def embed(self, texts, task="query") -> np.ndarray:
+        """
+        Encode texts into a contiguous (n, dim) float32 matrix of L2-normalised
+        vectors.  Rows can be sliced without copying; convert with .tolist()
+        only where a consumer genuinely needs Python lists.
+        """
         # E5 models require prefixing: 'query: ' for queries, 'passage: ' for documents
         prefix = "query: " if task == "query" else "passage: "
-        processed = [f"{prefix}{t}" for t in texts]
-        return self.model.encode(processed, normalize_embeddings=True).tolist()
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self.cache is None:
+            processed = [f"{prefix}{t}" for t in texts]
+            return self._encode(processed)
+
+        # Serve what we can from the cache; encode only the misses, in one call
+        keys  = [EmbeddingCache.make_key(self.cache_namespace, prefix, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+
+        if missing:
+            processed = [f"{prefix}{t}" for t in missing.values()]
+            encoded   = self.cache.round_trip(self._encode(processed))
+            fresh     = dict(zip(missing.keys(), encoded))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return np.vstack([found[k] for k in keys])
+
+    def describe(self) -> dict:
+        return {"model": self.model_name, "backend": self.backend, "device": self.device}
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the embedding cache (empty when disabled)."""
+        return self.cache.stats() if self.cache is not None else {}
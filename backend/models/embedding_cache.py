@@ -0,0 +1,264 @@
+"""
+models/embedding_cache.py
+--------------------------
+Persistent, content-addressed embedding cache used behind Embedder.embed.
+
+Two tiers:
+  1. In-memory LRU   (OrderedDict, bounded by item count)
+  2. On-disk SQLite  (one row per vector, bounded by total bytes)
+
+Keys are SHA-1 digests of (model name, task prefix, text), so the same
+chunk text, CO text or concept phrase is only ever encoded once per model,
+across re-ingests and server restarts.  Vectors are stored as raw float32
+or float16 bytes; the disk tier evicts the least-recently-used rows once
+its size limit is exceeded.
+
+Usage:
+    cache = EmbeddingCache(path, dtype="float16", max_bytes=512 * 2**20)
+    ns    = embedding_namespace("intfloat/multilingual-e5-base", "torch")
+    key   = EmbeddingCache.make_key(ns, "query: ", text)
+    found = cache.get_many([key])            # {key: np.ndarray}
+    cache.put_many({key: vector})
+    cache.stats()                            # hit / miss counters
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+
+_EVICT_BATCH = 256      # rows fetched per eviction round
+
+
+def embedding_namespace(model_name: str, backend: str) -> str:
+    """
+    Identity of the vectors a (model, backend) pair produces.  Quantized
+    graphs produce slightly different vectors, so the namespace includes the
+    backend (torch vectors are shared across devices).
+    """
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + SQLite) vector cache keyed by content hash."""
+
+    def __init__(
+        self,
+        path: str,
+        dtype: str = "float32",
+        max_bytes: int = 512 * 1024 * 1024,
+        memory_items: int = 10_000,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        self.path         = path
+        self.dtype        = np.dtype(dtype)
+        self.max_bytes    = int(max_bytes)
+        self.memory_items = int(memory_items)
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits   = 0
+        self.misses      = 0
+        self.evictions   = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "  key         TEXT PRIMARY KEY,"
+            "  dtype       TEXT NOT NULL,"
+            "  vector      BLOB NOT NULL,"
+            "  nbytes      INTEGER NOT NULL,"
+            "  last_access REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        # Running total of the disk tier, summed once here and then adjusted
+        # on every insert / delete instead of re-summed on each put
+        self._bytes = self._disk_bytes()
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(model_name: str, prefix: str, text: str) -> str:
+        """Content address for one (model, task prefix, text) triple."""
+        h = hashlib.sha1()
+        h.update(model_name.encode("utf-8"))
+        h.update(b"\x1f")
+        h.update(prefix.encode("utf-8"))
+        h.update(b"\x1f")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def round_trip(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Cast vectors through the storage dtype and back to float32, so a
+        freshly encoded vector is bit-identical to the one a later cache
+        hit will return.
+        """
+        return np.asarray(vectors, dtype=self.dtype).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # Lookup / insert
+    # ------------------------------------------------------------------
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return {key: float32 vector} for every key present in either tier."""
+        found: Dict[str, np.ndarray] = {}
+        disk_keys: List[str] = []
+
+        with self._lock:
+            for k in keys:
+                if k in found:
+                    continue
+                vec = self._memory.get(k)
+                if vec is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = vec
+                    self.memory_hits += 1
+                elif k not in disk_keys:
+                    disk_keys.append(k)
+
+            if not disk_keys:
+                return found
+
+            now = time.time()
+            for i in range(0, len(disk_keys), 500):
+                batch = disk_keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({marks})",
+                    batch,
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    vec = np.frombuffer(blob, dtype=np.dtype(dtype)).astype(np.float32)
+                    found[key] = vec
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? WHERE key IN ({marks})",
+                        [now, *batch],
+                    )
+            self._conn.commit()
+
+            self.misses += sum(1 for k in disk_keys if k not in found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """Store vectors in both tiers, then enforce the disk size limit."""
+        if not items:
+            return
+        now  = time.time()
+        rows = []
+        with self._lock:
+            for key, vec in items.items():
+                stored = np.ascontiguousarray(vec, dtype=self.dtype)
+                blob   = stored.tobytes()
+                rows.append((key, self.dtype.name, blob, len(blob), now))
+                self._remember(key, stored.astype(np.float32))
+
+            replaced = 0
+            keys = [r[0] for r in rows]
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._bytes += sum(r[3] for r in rows) - int(replaced)
+            self._evict_if_needed()
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_bytes(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+        return int(row[0])
+
+    def _evict_if_needed(self) -> None:
+        """Drop least-recently-used rows until the disk tier is under 90% of its limit."""
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, nbytes FROM embeddings ORDER BY last_access ASC LIMIT ?",
+                (_EVICT_BATCH,),
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            doomed = []
+            for key, nbytes in rows:
+                if self._bytes <= target:
+                    break
+                doomed.append((key,))
+                self._bytes -= nbytes
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+            self._conn.commit()
+            for (key,) in doomed:
+                self._memory.pop(key, None)
+            self.evictions += len(doomed)
+
+    # ------------------------------------------------------------------
+    # Maintenance / diagnostics
+    # ------------------------------------------------------------------
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            disk_bytes = self._bytes
+        hits    = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits":    self.memory_hits,
+            "disk_hits":      self.disk_hits,
+            "misses":         self.misses,
+            "hit_ratio":      round(hits / lookups, 4) if lookups else 0.0,
+            "evictions":      self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_entries":   int(entries),
+            "disk_bytes":     disk_bytes,
+            "max_bytes":      self.max_bytes,
+            "dtype":          self.dtype.name,
+        }
@@ -0,0 +1,168 @@
+"""
+models/embedding_scheduler.py
+------------------------------
+Dynamic micro-batching between concurrent callers and Embedder.embed.
+
+Under concurrent load every Flask thread asks the model for one or two
+tiny inputs (a question, a handful of question words).  The scheduler
+puts those requests on a queue; a single worker thread collects them for
+up to ``window_ms`` or until ``max_batch`` texts are waiting, runs ONE
+length-sorted encode per task prefix, and hands each caller its slice.
+
+Requests that are already large (ingestion batches) bypass the queue and
+are encoded directly in the caller's thread.
+
+Usage:
+    scheduler = EmbeddingScheduler(embedder.embed, window_ms=5, max_batch=64)
+    vectors   = scheduler.embed(["What is RSA?"], task="query")   # same contract as Embedder.embed
+    scheduler.stats()    # queue depth + batch-size histograms
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+def _bucket(n: int) -> str:
+    """Histogram bucket label: smallest power of two >= n, everything above 128 is '128+'."""
+    edge = 1
+    while edge < n and edge < 128:
+        edge *= 2
+    return f"{edge}+" if n > 128 else str(edge)
+
+
+class _Request:
+    __slots__ = ("texts", "task", "result", "error", "done")
+
+    def __init__(self, texts: List[str], task: str):
+        self.texts  = texts
+        self.task   = task
+        self.result = None
+        self.error  = None
+        self.done   = threading.Event()
+
+
+class EmbeddingScheduler:
+    """Collects concurrent embed requests into one encode call per window."""
+
+    def __init__(self, embed_fn, window_ms: float = 5.0, max_batch: int = 64):
+        self.embed_fn  = embed_fn
+        self.window    = window_ms / 1000.0
+        self.max_batch = int(max_batch)
+
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+
+        # Counters / histograms
+        self.batches  = 0
+        self.requests = 0
+        self.texts    = 0
+        self.bypassed = 0
+        self._batch_hist: Dict[str, int] = {}
+        self._depth_hist: Dict[str, int] = {}
+
+        self._worker = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------
+    # Caller API
+    # ------------------------------------------------------------------
+
+    def embed(self, texts, task: str = "query") -> np.ndarray:
+        """Same contract as Embedder.embed: (n, dim) float32 matrix, one row per text."""
+        texts = list(texts)
+        if not texts:
+            return self.embed_fn(texts, task=task)
+
+        # Big requests already batch well on their own — don't hold the queue
+        if len(texts) >= self.max_batch:
+            with self._lock:
+                self.bypassed += 1
+            return self.embed_fn(texts, task=task)
+
+        req = _Request(texts, task)
+        self._queue.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            count = len(first.texts)
+            depth = self._queue.qsize() + 1
+            deadline = time.monotonic() + self.window
+
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    req = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(req)
+                count += len(req.texts)
+
+            self._dispatch(batch, depth)
+
+    def _dispatch(self, batch: List[_Request], depth: int) -> None:
+        by_task: Dict[str, List[_Request]] = {}
+        for req in batch:
+            by_task.setdefault(req.task, []).append(req)
+
+        for task, reqs in by_task.items():
+            # Deduplicate and sort by length so the encoder pads as little as possible
+            unique = sorted({t for r in reqs for t in r.texts}, key=len)
+            try:
+                vectors = np.asarray(self.embed_fn(unique, task=task), dtype=np.float32)
+                index   = {t: i for i, t in enumerate(unique)}
+                for r in reqs:
+                    r.result = vectors[[index[t] for t in r.texts]]
+            except Exception as e:
+                for r in reqs:
+                    r.error = e
+            finally:
+                for r in reqs:
+                    r.done.set()
+
+            with self._lock:
+                self.batches  += 1
+                self.texts    += len(unique)
+                b = _bucket(len(unique))
+                self._batch_hist[b] = self._batch_hist.get(b, 0) + 1
+
+        with self._lock:
+            self.requests += len(batch)
+            d = _bucket(depth)
+            self._depth_hist[d] = self._depth_hist.get(d, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Diagnostics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_ms":             round(self.window * 1000, 3),
+                "max_batch":             self.max_batch,
+                "queue_depth":           self._queue.qsize(),
+                "batches":               self.batches,
+                "requests":              self.requests,
+                "texts":                 self.texts,
+                "bypassed":              self.bypassed,
+                "mean_batch_size":       round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram":  dict(self._batch_hist),
+                "queue_depth_histogram": dict(self._depth_hist),
+            }
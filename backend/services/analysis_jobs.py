@@ -0,0 +1,424 @@
+"""
+services/analysis_jobs.py
+--------------------------
+Background analysis jobs for large question papers and bulk audits.
+
+A synchronous /analyze_question call on a 60-question paper holds the
+HTTP connection for the whole run and times out behind proxies and in the
+evaluation scripts.  Jobs move that work off the request:
+
+    JobStore   — SQLite (WAL) queue.  One row per job plus one row per
+                 finished question, written as each question completes, so
+                 progress is visible immediately and partial results
+                 survive a restart.
+    JobRunner  — a small pool of worker threads inside the serving process.
+                 Workers reuse the process's embedder, vector store and LLM
+                 through ``run_fn`` and run as *background* callers of the
+                 LLM priority gate, so interactive requests never queue
+                 behind a job.
+
+Several processes may share one queue.  A claim records the claiming
+store's owner id and a lease, which the runner's heartbeat renews while the
+job runs.  Only jobs whose lease has expired (their process stopped) are
+put back on the queue, so a job another live worker is processing never
+runs twice; a resumed job only analyzes the questions without a stored
+result.
+
+Usage:
+    store  = JobStore("data/analysis_jobs.sqlite3")
+    runner = JobRunner(store, run_fn, workers=1, gate=LLM_GATE).start()
+    job    = runner.submit(questions, syllabus_id="IT-VIII-PEC-IT801B", threshold=0.2)
+    store.get(job["job_id"])                 # status + progress
+    store.results(job["job_id"])             # per-question results so far
+
+``run_fn(questions, syllabus_id, threshold, vectorized)`` must yield
+``(position, result_or_exception)`` for every question it is given.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobStore:
+    """Jobs and their per-question results in SQLite (WAL)."""
+
+    def __init__(self, path: str, lease_seconds: float = 120.0):
+        self.path  = path
+        self.lease = float(lease_seconds)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"     # this process's claims
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "  job_id      TEXT PRIMARY KEY,"
+            "  status      TEXT NOT NULL,"
+            "  syllabus_id TEXT,"
+            "  threshold   REAL NOT NULL,"
+            "  vectorized  INTEGER NOT NULL,"
+            "  questions   TEXT NOT NULL,"
+            "  total       INTEGER NOT NULL,"
+            "  error       TEXT,"
+            "  created_at  REAL NOT NULL,"
+            "  started_at  REAL,"
+            "  finished_at REAL,"
+            "  owner       TEXT,"
+            "  lease_until REAL"
+            ");"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            "  job_id  TEXT NOT NULL,"
+            "  idx     INTEGER NOT NULL,"
+            "  ok      INTEGER NOT NULL,"
+            "  payload TEXT NOT NULL,"
+            "  PRIMARY KEY (job_id, idx)"
+            ");"
+        )
+        # Queues created before leases existed
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, decl in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def create(
+        self,
+        questions: List[str],
+        syllabus_id: Optional[str],
+        threshold: float,
+        vectorized: bool = True,
+    ) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs(job_id, status, syllabus_id, threshold, vectorized, questions, total, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, syllabus_id, float(threshold), int(bool(vectorized)),
+                 json.dumps(list(questions)), len(questions), time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str, questions: bool = False) -> Optional[Dict[str, Any]]:
+        """Job row with progress counters, or None.  ``questions=True`` includes the question list."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status, syllabus_id, threshold, vectorized, questions, total, error,"
+                "       created_at, started_at, finished_at,"
+                "       (SELECT COUNT(*) FROM job_results r WHERE r.job_id = jobs.job_id AND r.ok = 1),"
+                "       (SELECT COUNT(*) FROM job_results r WHERE r.job_id = jobs.job_id AND r.ok = 0)"
+                " FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._job(row, questions) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, status, syllabus_id, threshold, vectorized, questions, total, error,"
+                "       created_at, started_at, finished_at,"
+                "       (SELECT COUNT(*) FROM job_results r WHERE r.job_id = jobs.job_id AND r.ok = 1),"
+                "       (SELECT COUNT(*) FROM job_results r WHERE r.job_id = jobs.job_id AND r.ok = 0)"
+                " FROM jobs ORDER BY created_at DESC LIMIT ?",
+                (int(limit),),
+            ).fetchall()
+        return [self._job(r) for r in rows]
+
+    @staticmethod
+    def _job(row: Tuple, questions: bool = False) -> Dict[str, Any]:
+        (job_id, status, sid, threshold, vectorized, q_json, total, error,
+         created, started, finished, completed, errors) = row
+        pending = total - completed - errors
+        job = {
+            "job_id":      job_id,
+            "status":      status,
+            "syllabus_id": sid,
+            "threshold":   threshold,
+            "vectorized":  bool(vectorized),
+            "progress": {
+                "total":     total,
+                "completed": completed,
+                "errors":    errors,
+                "pending":   pending,
+                "percent":   round((total - pending) / total * 100, 1) if total else 100.0,
+            },
+            "error":       error,
+            "created_at":  created,
+            "started_at":  started,
+            "finished_at": finished,
+        }
+        if questions:
+            job["questions"] = json.loads(q_json)
+        return job
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest queued job to running under this store's
+        lease and return it (with questions).  Jobs whose lease expired are
+        re-queued first.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._requeue_expired(now)
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?), owner = ?, lease_until = ?"
+                " WHERE job_id = ? AND status = ?",
+                (RUNNING, now, self.owner, now + self.lease, row[0], QUEUED),
+            )
+            if cur.rowcount == 0:
+                return None      # another process claimed it first
+        return self.get(row[0], questions=True)
+
+    def status(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def holds(self, job_id: str) -> bool:
+        """True while the job is running under this store's claim (not cancelled, not taken over)."""
+        with self._lock:
+            row = self._conn.execute("SELECT status, owner FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] == RUNNING and row[1] == self.owner
+
+    def renew(self, job_ids: Iterable[str]) -> int:
+        """Extend this store's lease on running jobs (heartbeat).  Returns leases renewed."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND status = ? AND owner = ?",
+                [(time.time() + self.lease, job_id, RUNNING, self.owner) for job_id in job_ids],
+            )
+        return cur.rowcount
+
+    def finish(self, job_id: str, status: str = DONE, error: Optional[str] = None) -> bool:
+        """
+        Close a job running under this store's claim.  A job cancelled (or
+        re-claimed after its lease expired) meanwhile keeps its state.
+        """
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ? AND status = ? AND owner = ?",
+                (status, error, time.time(), job_id, RUNNING, self.owner),
+            )
+        return cur.rowcount > 0
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+        return cur.rowcount > 0
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            cur = self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return cur.rowcount > 0
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease expired (their process stopped) back on the queue."""
+        with self._lock, self._conn:
+            return self._requeue_expired(time.time())
+
+    def _requeue_expired(self, now: float) -> int:
+        cur = self._conn.execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL"
+            " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+            (QUEUED, RUNNING, now),
+        )
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Per-question results
+    # ------------------------------------------------------------------
+
+    def record_result(self, job_id: str, index: int, result: Any, question: str = "") -> None:
+        """Store one question's result (or the exception it raised) as soon as it is ready."""
+        if isinstance(result, Exception):
+            ok, payload = 0, {"question": question, "error": str(result)}
+        else:
+            ok, payload = 1, result
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results(job_id, idx, ok, payload) VALUES (?, ?, ?, ?)",
+                (job_id, int(index), ok, json.dumps(payload)),
+            )
+
+    def done_indices(self, job_id: str) -> Set[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT idx FROM job_results WHERE job_id = ?", (job_id,)).fetchall()
+        return {r[0] for r in rows}
+
+    def question_states(self, job_id: str, total: int) -> List[str]:
+        """Per-question state ("done", "error" or "pending"), in question order."""
+        states = ["pending"] * total
+        with self._lock:
+            rows = self._conn.execute("SELECT idx, ok FROM job_results WHERE job_id = ?", (job_id,)).fetchall()
+        for idx, ok in rows:
+            if 0 <= idx < total:
+                states[idx] = "done" if ok else "error"
+        return states
+
+    def results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored results in question order; errors carry ``"error"`` instead of an analysis."""
+        sql = "SELECT idx, ok, payload FROM job_results WHERE job_id = ? AND idx >= ? ORDER BY idx"
+        args: Tuple = (job_id, int(offset))
+        if limit is not None:
+            sql += " LIMIT ?"
+            args += (int(limit),)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [{"index": idx, "ok": bool(ok), **json.loads(payload)} for idx, ok, payload in rows]
+
+
+class JobRunner:
+    """Worker-thread pool that drains a JobStore through ``run_fn``."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        run_fn: Callable[[List[str], Optional[str], float, bool], Iterable[Tuple[int, Any]]],
+        workers: int = 1,
+        gate=None,
+        poll_seconds: float = 1.0,
+    ):
+        self.store   = store
+        self.run_fn  = run_fn
+        self.workers = max(1, int(workers))
+        self.gate    = gate
+        self.poll    = poll_seconds
+
+        self._wake     = threading.Event()
+        self._stop     = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._active: Dict[str, int] = {}       # job_id → worker number
+        self._lock     = threading.Lock()
+        self._questions_done = 0
+
+    def start(self) -> "JobRunner":
+        """Start the workers and lease heartbeat (idempotent) after re-queueing expired jobs."""
+        if self._threads:
+            return self
+        with self._lock:
+            if self._threads:
+                return self
+            self._stop.clear()
+            resumed = self.store.requeue_expired()
+            if resumed:
+                print(f"[Jobs] Resuming {resumed} interrupted job(s)")
+            for n in range(self.workers):
+                t = threading.Thread(target=self._worker, args=(n,), name=f"analysis-job-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            t = threading.Thread(target=self._heartbeat, name="analysis-job-heartbeat", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[Jobs] {self.workers} worker(s) started")
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, questions: List[str], syllabus_id: Optional[str], threshold: float,
+               vectorized: bool = True) -> Dict[str, Any]:
+        job = self.store.create(questions, syllabus_id, threshold, vectorized)
+        self._wake.set()
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers":         self.workers,
+                "alive":           sum(t.is_alive() for t in self._threads),
+                "active_jobs":     list(self._active),
+                "questions_done":  self._questions_done,
+            }
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _heartbeat(self) -> None:
+        """Renew the lease of every job this process is running, three times per lease."""
+        while not self._stop.wait(max(self.store.lease / 3.0, 0.01)):
+            with self._lock:
+                active = list(self._active)
+            try:
+                self.store.renew(active)
+            except Exception as e:
+                print(f"[Jobs] Lease renewal failed: {e}")
+
+    def _worker(self, n: int) -> None:
+        with self.gate.background() if self.gate else nullcontext():
+            while not self._stop.is_set():
+                try:
+                    job = self.store.claim_next()
+                except Exception as e:
+                    print(f"[Jobs] Worker {n} could not read the queue: {e}")
+                    job = None
+                if job is None:
+                    self._wake.wait(self.poll)
+                    self._wake.clear()
+                    continue
+                with self._lock:
+                    self._active[job["job_id"]] = n
+                try:
+                    self._run(job)
+                finally:
+                    with self._lock:
+                        self._active.pop(job["job_id"], None)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id    = job["job_id"]
+        questions = job["questions"]
+        done      = self.store.done_indices(job_id)
+        pending   = [i for i in range(len(questions)) if i not in done]
+        if done:
+            print(f"[Jobs] {job_id[:8]}: resuming at {len(done)}/{len(questions)} questions")
+
+        t0 = time.perf_counter()
+        try:
+            for pos, result in self.run_fn(
+                [questions[i] for i in pending], job["syllabus_id"], job["threshold"], job["vectorized"]
+            ):
+                index = pending[pos]
+                self.store.record_result(job_id, index, result, question=questions[index])
+                with self._lock:
+                    self._questions_done += 1
+                if self._stop.is_set() or not self.store.holds(job_id):
+                    return           # cancelled, taken over, or shutting down (re-queued once the lease expires)
+        except Exception as e:
+            print(f"[Jobs] {job_id[:8]} failed: {e}")
+            self.store.finish(job_id, FAILED, str(e))
+            return
+
+        self.store.finish(job_id, DONE)
+        print(f"[Jobs] {job_id[:8]}: {len(pending)} question(s) in {time.perf_counter() - t0:.1f}s")
@@ -89,8 +89,9 @@ def clean_retrieved_chunks(chunks: list) -> list:
     """
     Filter a list of retrieved chunk dicts.
 
-    Each chunk dict is expected to have at minimum a 'text' key.
-    Applies two filter passes:
+    Each chunk dict is expected to have at minimum a 'text' key.  Chunks
+    carrying an 'is_noisy' flag (computed at ingestion) are filtered by it;
+    the rest go through two filter passes:
       1. Bibliographic/metadata noise (chunk_cleaner rules)
       2. Low-information content (chunk_quality gate — catches old polluted vectors)
 
@@ -107,6 +108,14 @@ def clean_retrieved_chunks(chunks: list) -> list:
     removed = 0
     
     for chunk in chunks:
+        # Flag precomputed at ingestion (services/chunk_features.py) covers both passes
+        if chunk.get("is_noisy") is not None:
+            if chunk["is_noisy"]:
+                removed += 1
+            else:
+                cleaned.append(chunk)
+            continue
+
         text = chunk.get("text", "").strip()
 
         # Pass 1: bibliographic/structural noise
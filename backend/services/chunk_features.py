@@ -0,0 +1,282 @@
+"""
+services/chunk_features.py
+---------------------------
+Per-chunk features computed once at ingestion.
+
+Every /analyze_question call used to re-derive, for each of the k retrieved
+chunks, things that never change between queries: the keyword token set
+(lexical overlap), the module label (two regexes when the metadata has
+none), the reference-book flag (_dedup_chunks) and the noise flag
+(clean_retrieved_chunks).  VectorStore.add_syllabus now computes them with
+compute_chunk_features() and stores them in the chunk's Chroma metadata;
+ChunkFeatureStore keeps a compact copy in memory, keyed by chunk id, so
+query-time scoring is set intersections and dict lookups.
+
+Chunks stored before this (or under an older FEATURES_VERSION) are computed
+on first sight and backfilled at startup (VectorStore.backfill_chunk_features).
+
+Usage:
+    feats = compute_chunk_features(text, module="Unit 2: Hashing")
+    meta.update(features_to_metadata(feats))
+    store.put(chunk_id, feats, syllabus_id)
+    store.get(chunk_id, text, meta).tokens      # -> frozenset({"hash", ...})
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from typing import Dict, Optional, Set
+
+from services.chunk_cleaner import _is_noisy_chunk
+from services.chunk_quality import is_low_information_chunk
+
+# Bump when any extractor below changes — persisted features of an older
+# version are ignored and recomputed.
+FEATURES_VERSION = 1
+
+
+# ── Module labels ─────────────────────────────────────────────────────────────
+# Module-name extractor — reads from chunk text for chunks ingested without a
+# module label. Handles two formats:
+#
+#  Format A — explicit prefix:  "M1:", "Module 1:", "UNIT 1:"
+#  Format B — table row:        "1  Introduction: topics..."
+#                               (bare number, then title ending in colon)
+_MODULE_RE = re.compile(
+    r"(?:^|\n)\s*"
+    r"(?:M(?:odule)?\s*([\dIVX]+)\s*[:–-]|UNIT\s*([\dIVX]+)\s*[:–-])"
+    r"\s*(.+)",
+    re.IGNORECASE,
+)
+
+# Matches: start-of-line, optional whitespace, 1-2 digit unit number,
+# whitespace, then a capitalised title word ending in a colon.
+_BARE_UNIT_RE = re.compile(
+    r"(?:^|\n)\s*(\d{1,2})\s+([A-Z][^:\n]{2,60}?):\s*",
+)
+
+
+# ── Keyword tokens ────────────────────────────────────────────────────────────
+
+def keyword_set(text: str) -> set:
+    """Technical terms (4+ alphanumerics) used for keyword overlap."""
+    return set(w for w in re.findall(r'\b[a-zA-Z0-9]{4,}\b', text.lower()))
+
+
+def extract_module(text: str):
+    """Return a module label from chunk text, or None."""
+    if not text:
+        return None
+
+    # Try Format A first (explicit prefix)
+    m = _MODULE_RE.search(text)
+    if m:
+        num   = (m.group(1) or m.group(2) or "").strip()
+        title = m.group(3).strip()[:60]
+        return f"Unit {num}: {title}" if num else title
+
+    # Try Format B (bare number + capitalised title, as in university tables)
+    m2 = _BARE_UNIT_RE.search(text)
+    if m2:
+        num   = m2.group(1).strip()
+        title = m2.group(2).strip()[:50]
+        return f"Unit {num}: {title}"
+
+    return None
+
+
+# ── Reference-book detection ──────────────────────────────────────────────────
+# Catches bibliographic entries that get chunked as numbered topics.
+# Two-pronged approach:
+#   1. Regex for short "Title, Author, ABBREV" entries
+#   2. Keyword scan for publisher names in short chunks
+
+_REFERENCE_BOOK_RE = re.compile(
+    r"^\s*(?:\d{1,2}\.\s*)?"           # optional leading number: "1. " or "8. "
+    r".{5,60},"                         # title (5-60 chars) followed by comma
+    r"\s*[A-Z][A-Za-z.\s]{1,30},"      # author name(s) followed by comma
+    r"\s*[A-Z]{2,5}\s*\.?\s*$",        # publisher abbreviation at end
+    re.MULTILINE,
+)
+
+# Common publisher / bibliographic keywords (case-insensitive scan)
+_PUBLISHER_KW = re.compile(
+    r"Publishing|Publishers|Press|Edition|McGraw|Pearson|Wiley|Springer|Elsevier|"
+    r"Oxford|Cambridge|Prentice|Tata|Jaico|Housing|Ltd\.?|Inc\.?|"
+    r"\bPHI\b|\bEPH\b|\bTMH\b|\bSPD\b|\bBPB\b",
+    re.IGNORECASE,
+)
+
+# Strong bibliographic signals — patterns that almost certainly indicate
+# a reference book entry, even if the title contains syllabus-sounding words.
+_BIBLIO_SIGNAL = re.compile(
+    r"""\bby\s+[A-Z][a-z]"""             # "by Stavronlakis", "by Reynolds"
+    r"""|\u201c[^\u201d]{5,}\u201d"""     # "curly-quoted title"
+    r'''|"[^"]{5,}"'''                    # "straight-quoted title"
+    r"""|'[^']{5,}'"""                    # 'single-quoted title'
+    r"""|\b\d{1,2}(?:st|nd|rd|th)\s+Ed""" # "2nd Edition"
+    r"""|\bISBN\b""",                     # ISBN number
+    re.IGNORECASE,
+)
+
+# Words that strongly indicate real syllabus content, not a reference
+_SYLLABUS_SIGNAL = re.compile(
+    r"Overview|Definition|Introduction|Concept|Architecture|Protocol|"
+    r"Mechanism|Technique|Algorithm|Application|Type[s]?|Model[s]?|"
+    r"Security|Management|System|Design|Analysis|Method",
+    re.IGNORECASE,
+)
+
+
+def is_reference_entry(text: str) -> bool:
+    """
+    Return True if the chunk looks like a bibliographic reference
+    rather than actual syllabus content.
+
+    Catches patterns like:
+      - "E-Commerce, M.M. Oka, EPH"
+      - "Loshin Pete, Murphy P.A. : Electronic Commerce, Jaico Publishing Housing."
+      - '8. "Third Generation Mobile Telecommunication systems", by P.Stavronlakis, Springer Publishers.'
+    """
+    text = text.strip()
+    # Real topics are longer — references are short citation lines
+    if len(text) > 150:
+        return False
+
+    # Approach 1: regex for  Title, Author, ABBREV  pattern
+    if _REFERENCE_BOOK_RE.match(text):
+        return True
+
+    # Approach 2: publisher keyword + bibliographic signal = always a reference
+    #   (overrides syllabus-signal safety valve — book titles often contain
+    #    words like "Systems", "Security", "Management")
+    has_publisher = _PUBLISHER_KW.search(text)
+    has_biblio    = _BIBLIO_SIGNAL.search(text)
+
+    if has_publisher and has_biblio:
+        return True
+
+    # Approach 3: publisher keyword + comma, but no syllabus signal
+    if len(text) < 150 and text.count(",") >= 1 and has_publisher:
+        if not _SYLLABUS_SIGNAL.search(text):
+            return True
+
+    return False
+
+
+# ── Features ──────────────────────────────────────────────────────────────────
+
+class ChunkFeatures:
+    """Query-invariant features of one chunk."""
+
+    __slots__ = ("tokens", "module", "reference", "noisy")
+
+    def __init__(self, tokens: frozenset, module: Optional[str], reference: bool, noisy: bool):
+        self.tokens    = tokens       # keyword_set() of the chunk text
+        self.module    = module       # metadata module, else extract_module(), else None
+        self.reference = reference    # is_reference_entry() — dropped by _dedup_chunks
+        self.noisy     = noisy        # dropped by clean_retrieved_chunks (either pass)
+
+
+def _intern(words) -> frozenset:
+    # Chunks of one syllabus share most of their vocabulary
+    return frozenset(sys.intern(w) for w in words)
+
+
+def compute_chunk_features(text: str, module: Optional[str] = None) -> ChunkFeatures:
+    text = text or ""
+    stripped = text.strip()
+    return ChunkFeatures(
+        tokens=_intern(keyword_set(text)),
+        module=module or extract_module(text),
+        reference=is_reference_entry(stripped),
+        noisy=_is_noisy_chunk(stripped) or is_low_information_chunk(stripped),
+    )
+
+
+def features_to_metadata(feats: ChunkFeatures) -> dict:
+    """Chroma metadata fields (str/bool/int only) carrying the features."""
+    return {
+        "kw_tokens":    " ".join(sorted(feats.tokens)),
+        "module_label": feats.module or "",
+        "is_reference": feats.reference,
+        "is_noisy":     feats.noisy,
+        "features_v":   FEATURES_VERSION,
+    }
+
+
+def features_from_metadata(meta: Optional[dict]) -> Optional[ChunkFeatures]:
+    """Features persisted by features_to_metadata, or None when absent / stale."""
+    if not isinstance(meta, dict) or meta.get("features_v") != FEATURES_VERSION:
+        return None
+    return ChunkFeatures(
+        tokens=_intern((meta.get("kw_tokens") or "").split()),
+        module=meta.get("module_label") or None,
+        reference=bool(meta.get("is_reference")),
+        noisy=bool(meta.get("is_noisy")),
+    )
+
+
+class ChunkFeatureStore:
+    """In-memory chunk id → ChunkFeatures, grouped by syllabus for deletes."""
+
+    def __init__(self):
+        self._features: Dict[str, ChunkFeatures] = {}
+        self._by_syllabus: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits     = 0    # served from memory
+        self.loaded   = 0    # parsed from persisted metadata
+        self.computed = 0    # nothing persisted — extracted from the text
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def put(self, chunk_id: str, feats: ChunkFeatures, syllabus_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._features[chunk_id] = feats
+            self._by_syllabus.setdefault(syllabus_id or "", set()).add(chunk_id)
+
+    def get(self, chunk_id: Optional[str], text: str, meta: Optional[dict] = None) -> ChunkFeatures:
+        """
+        Features of one retrieved chunk: from memory, else from its persisted
+        metadata (chunks ingested by another worker), else computed from text.
+        """
+        feats = self._features.get(chunk_id) if chunk_id else None
+        if feats is not None:
+            self.hits += 1
+            return feats
+        feats = features_from_metadata(meta)
+        if feats is not None:
+            self.loaded += 1
+        else:
+            module = meta.get("module") if isinstance(meta, dict) else None
+            feats  = compute_chunk_features(text, module)
+            self.computed += 1
+        if chunk_id:
+            self.put(chunk_id, feats, meta.get("syllabus_id") if isinstance(meta, dict) else None)
+        return feats
+
+    def drop_syllabus(self, syllabus_id: str) -> int:
+        with self._lock:
+            ids = self._by_syllabus.pop(syllabus_id, set())
+            for chunk_id in ids:
+                self._features.pop(chunk_id, None)
+        return len(ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._features.clear()
+            self._by_syllabus.clear()
+
+    def stats(self) -> dict:
+        return {
+            "chunks":   len(self._features),
+            "syllabi":  len(self._by_syllabus),
+            "hits":     self.hits,
+            "loaded":   self.loaded,
+            "computed": self.computed,
+        }
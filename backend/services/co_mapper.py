@@ -4,8 +4,16 @@ services/co_mapper.py
 Feature 3: Course Outcome (CO) mapping.
 Feature 3B: Program Outcome (PCO/PO) mapping.
 
-COs are stored in a dedicated ChromaDB collection (semantic search).
-PCOs are stored as a simple in-memory dict (CO->PO lookup - no embedding needed).
+COs are stored in a dedicated ChromaDB collection (the source of record).
+A syllabus has only 5-8 COs, so queries are served from an in-memory,
+pre-normalised matrix per syllabus (loaded at startup, refreshed on
+ingest): one dot product ranks every CO, with no Chroma traffic on the
+query path.  CO writes bump a per-syllabus version
+(vectorstores/syllabus_versions.py), so a worker reloads the matrices
+another worker re-ingested or cleared.
+PCOs are a CO->PO lookup (no embedding needed) persisted in SQLite
+(services/co_po_store.py), so they survive restarts and every worker
+process sees the same mapping.
 
 Metadata schema per stored CO:
     course_code  : "PEC-IT801B"
@@ -21,6 +29,9 @@ Usage (ingestion):
     ])
 
 Usage (analysis):
+    match = co_mapper.map_question(question, syllabus_id)
+    # -> {"display_co": "CO2", "full_co_id": "PEC-IT801B.CO2", "similarity": 0.91,
+    #     "alternatives": [{"display_co": "CO4", ...}, ...]}  or None
     co  = co_mapper.map_question_to_co(question, syllabus_id)  # -> "CO2" or None
     pco = co_mapper.get_pco_for_co(syllabus_id, co)           # -> "PO2" or None
 """
@@ -28,27 +39,154 @@ Usage (analysis):
 import os
 os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
 
+import threading
+from typing import Dict, List
+
 import chromadb
+import numpy as np
+
 from debug_logger import dsection, dlog, dlist, derror, ddivider
+from services.co_po_store import CoPoStore
+from vectorstores.partitions import CollectionRouter
+from vectorstores.syllabus_versions import ALL_SYLLABI, SyllabusVersions
+
+
+class _COMatrix:
+    """Unit-normalised CO embeddings of one syllabus plus their metadata rows."""
+
+    __slots__ = ("matrix", "metas", "documents")
+
+    def __init__(self, matrix: np.ndarray, metas: List[dict], documents: List[str]):
+        self.matrix    = matrix
+        self.metas     = metas
+        self.documents = documents
 
 
 class CoMapper:
     """
-    Manages CO semantic search (ChromaDB) and PCO direct lookup (dict).
+    Manages CO semantic search (ChromaDB) and PCO direct lookup (SQLite).
     Reuses the same embed_fn as the main VectorStore -- no extra models.
+
+    With a partition_catalog each syllabus's COs live in their own collection
+    (vectorstores/partitions.py).  The duplicate check of add_cos is then
+    per syllabus: the same course code under two syllabus ids is stored twice.
     """
 
     COLLECTION_NAME = "course_outcomes"
 
-    def __init__(self, embed_fn, persist_dir: str = "./data/vector_db"):
+    def __init__(self, embed_fn, persist_dir: str = "./data/vector_db", pco_path: str = None,
+                 partition_catalog=None, versions_path: str = None):
         self.embed_fn  = embed_fn
         self.client    = chromadb.PersistentClient(path=persist_dir)
-        self.collection = self.client.get_or_create_collection(
-            name=self.COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"},
+        self._router   = CollectionRouter(self.client, self.COLLECTION_NAME, partition_catalog)
+        self.collection = self._router.shared
+        # PCO lookup: (syllabus_id, "CO1") -> "PO2", durable and shared across workers
+        self._co_to_pco = CoPoStore(
+            pco_path or os.path.join(os.path.dirname(os.path.abspath(persist_dir)), "co_po.sqlite3")
+        )
+
+        self._matrices: Dict[str, _COMatrix] = {}   # syllabus_id → CO matrix
+        self._global: _COMatrix | None = None      # every CO, for unscoped queries
+        self._lock = threading.Lock()
+        # Shared with the other worker processes on this persist_dir
+        self._versions = SyllabusVersions(
+            versions_path or os.path.join(os.path.dirname(os.path.abspath(persist_dir)), "co_versions.sqlite3")
         )
-        # PCO lookup: {syllabus_id: {"CO1": "PO2", "CO2": "PO1"}}
-        self._co_to_pco: dict[str, dict] = {}
+        self.load_all()
+
+    # ------------------------------------------------------------------
+    # In-memory CO matrices
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _build(embeddings, metas: List[dict], documents: List[str]) -> _COMatrix:
+        mat = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if mat.ndim != 2 or mat.shape[0] == 0:
+            return _COMatrix(np.empty((0, 0), dtype=np.float32), [], [])
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return _COMatrix(mat / norms, list(metas), list(documents))
+
+    def load_all(self) -> int:
+        """Load every syllabus's CO matrix with one read per collection.  Returns COs loaded."""
+        grouped: Dict[str, tuple] = {}
+        loaded = 0
+        try:
+            for coll in self._router.collections():
+                res = coll.get(include=["embeddings", "metadatas", "documents"])
+                embeddings = res.get("embeddings")
+                metas      = res.get("metadatas") or []
+                documents  = res.get("documents") or [""] * len(metas)
+                loaded    += len(metas)
+                if embeddings is not None:
+                    for emb, meta, doc in zip(embeddings, metas, documents):
+                        rows = grouped.setdefault((meta or {}).get("syllabus_id", ""), ([], [], []))
+                        rows[0].append(emb)
+                        rows[1].append(meta or {})
+                        rows[2].append(doc or "")
+        except Exception as e:
+            print(f"  [CO Mapper] Could not load CO matrices: {e}")
+            return 0
+
+        with self._lock:
+            self._matrices = {sid: self._build(*rows) for sid, rows in grouped.items()}
+            self._global = None
+        return loaded
+
+    def refresh(self, syllabus_id: str) -> None:
+        """Reload one syllabus's CO matrix from the collection (after ingest / clear)."""
+        try:
+            coll = self._router.for_syllabus(syllabus_id)
+            res = coll.get(
+                where=self._router.where(syllabus_id), include=["embeddings", "metadatas", "documents"]
+            ) if coll is not None else {}
+            embeddings = res.get("embeddings")
+            matrix = self._build(
+                embeddings if embeddings is not None else [],
+                res.get("metadatas") or [],
+                res.get("documents") or [],
+            )
+        except Exception as e:
+            print(f"  [CO Mapper] Could not load COs for {syllabus_id}: {e}")
+            matrix = self._build([], [], [])
+        with self._lock:
+            if matrix.metas:
+                self._matrices[syllabus_id] = matrix
+            else:
+                self._matrices.pop(syllabus_id, None)
+            self._global = None
+
+    def _written(self, syllabus_id: str) -> None:
+        """This process changed a syllabus's COs: reload our matrix and tell the other workers."""
+        self.refresh(syllabus_id)
+        if self._versions is not None:
+            self._versions.bump(syllabus_id)
+
+    def sync(self) -> None:
+        """Reload the CO matrices of syllabi another worker re-ingested or cleared."""
+        if self._versions is None:
+            return
+        changed = self._versions.changed()
+        if ALL_SYLLABI in changed:
+            self.load_all()
+            return
+        for sid in changed:
+            self.refresh(sid)
+
+    def get_matrix(self, syllabus_id: str = None) -> _COMatrix:
+        """CO matrix of one syllabus, or of every syllabus when syllabus_id is None."""
+        self.sync()
+        if syllabus_id:
+            return self._matrices.get(syllabus_id) or self._build([], [], [])
+        with self._lock:
+            if self._global is None:
+                parts = [m for m in self._matrices.values() if m.metas]
+                self._global = _COMatrix(
+                    np.vstack([m.matrix for m in parts]) if parts else np.empty((0, 0), dtype=np.float32),
+                    [meta for m in parts for meta in m.metas],
+                    [doc for m in parts for doc in m.documents],
+                )
+            return self._global
 
     # ------------------------------------------------------------------
     # CO Ingestion
@@ -77,23 +215,26 @@ class CoMapper:
         ids_to_add   = []
         metas_to_add = []
 
+        candidates = []
         for c in cos:
             display_co  = c.get("co_id", "")
             course_code = c.get("course_code", "") or syllabus_id
             full_co_id  = c.get("full_co_id", "") or f"{course_code}.{display_co}"
-            text        = c.get("text", "")
-
             # Stable, unique ChromaDB document id keyed on (course_code, full_co_id)
-            doc_id = f"{course_code}::{full_co_id}"
+            candidates.append((f"{course_code}::{full_co_id}", display_co, course_code, full_co_id, c.get("text", "")))
 
-            # Duplicate check by (course_code, full_co_id)
-            try:
-                existing = self.collection.get(ids=[doc_id])
-                if existing and existing.get("ids"):
-                    print(f"  [CO Mapper] Duplicate detected  {full_co_id} -- skipping")
-                    continue
-            except Exception:
-                pass  # not found -> safe to insert
+        # Duplicate check by (course_code, full_co_id): ONE get for every candidate id
+        coll = self._router.for_syllabus(syllabus_id, create=True)
+        try:
+            existing = set(coll.get(ids=[cand[0] for cand in candidates], include=[]).get("ids") or [])
+        except Exception:
+            existing = set()  # lookup failed -> treat all as new
+
+        for doc_id, display_co, course_code, full_co_id, text in candidates:
+            if doc_id in existing:
+                print(f"  [CO Mapper] Duplicate detected  {full_co_id} -- skipping")
+                continue
+            existing.add(doc_id)    # also skips repeats within this batch
 
             texts_to_add.append(text)
             ids_to_add.append(doc_id)
@@ -110,12 +251,13 @@ class CoMapper:
 
         if texts_to_add:
             embeddings = self.embed_fn(texts_to_add, task="passage")
-            self.collection.add(
+            coll.add(
                 ids        = ids_to_add,
                 embeddings = embeddings,
                 metadatas  = metas_to_add,
                 documents  = texts_to_add,
             )
+            self._written(syllabus_id)
 
         return stored
 
@@ -128,14 +270,21 @@ class CoMapper:
             Number of records deleted.
         """
         try:
-            existing = self.collection.get(where={"syllabus_id": syllabus_id})
-            ids_to_delete = existing.get("ids") or []
-            if ids_to_delete:
-                self.collection.delete(ids=ids_to_delete)
-                print(f"  [CO Mapper] Cleared {len(ids_to_delete)} stale CO records for {syllabus_id}")
-                return len(ids_to_delete)
+            colls = [self._router.for_syllabus(syllabus_id)]
+            if self._router.partitioned:
+                colls.append(self.collection)       # rows not migrated yet
+            removed = sum(
+                len(coll.get(where={"syllabus_id": syllabus_id}, include=[]).get("ids") or [])
+                for coll in colls if coll is not None
+            )
+            self._router.delete(syllabus_id)
+            if removed:
+                print(f"  [CO Mapper] Cleared {removed} stale CO records for {syllabus_id}")
+            return removed
         except Exception as e:
             print(f"  [CO Mapper] Clear failed for {syllabus_id}: {e}")
+        finally:
+            self._written(syllabus_id)
         return 0
 
     # ------------------------------------------------------------------
@@ -156,8 +305,14 @@ class CoMapper:
         if not pcos:
             return 0
         mapping = {p["co_id"].upper(): p["pco_id"].upper() for p in pcos if "co_id" in p and "pco_id" in p}
-        self._co_to_pco.setdefault(syllabus_id, {}).update(mapping)
-        return len(mapping)
+        return self._co_to_pco.upsert_many(syllabus_id, mapping)
+
+    def clear_pcos_for_syllabus(self, syllabus_id: str = None) -> int:
+        """Forget the CO->PCO mapping of one syllabus (every syllabus when None)."""
+        if syllabus_id is None:
+            self._co_to_pco.clear()
+            return 0
+        return self._co_to_pco.delete(syllabus_id)
 
     def get_pco_for_co(self, syllabus_id: str, co_id: str) -> str | None:
         """
@@ -172,115 +327,110 @@ class CoMapper:
         """
         if not syllabus_id or not co_id:
             return None
-        syllabus_map = self._co_to_pco.get(syllabus_id, {})
-        return syllabus_map.get(co_id.upper(), None)
+        return self._co_to_pco.get(syllabus_id, co_id)
 
     # ------------------------------------------------------------------
     # CO Query
     # ------------------------------------------------------------------
 
-    def map_question_to_co(
+    def _question_embedding(self, question: str, ctx=None) -> np.ndarray:
+        """Query embedding for the question — from the QuestionContext when available."""
+        if ctx is not None:
+            vec = ctx.embed([question], task="query")
+        else:
+            vec = self.embed_fn([question], task="query")
+        return np.asarray(vec, dtype=np.float32).reshape(-1)
+
+    def map_question(
         self,
         question: str,
         syllabus_id: str = None,
-    ) -> str | None:
+        ctx=None,
+        top_k: int = 3,
+        query_embedding=None,
+    ) -> dict | None:
         """
-        Embed the question and return the best-matching CO display_id (e.g. "CO2").
+        Rank every CO of the syllabus against the question with one dot product.
+
+        Returns the best CO and up to top_k - 1 ranked alternatives:
+            {"display_co": "CO2", "full_co_id": "PEC-IT801B.CO2", "course_code": "PEC-IT801B",
+             "similarity": 0.91, "alternatives": [{"display_co": "CO4", "full_co_id": ..., "similarity": 0.88}]}
+        or None when no COs are stored for the syllabus.
+
+        Similarity keeps the scale the Chroma query reported (1 - distance / 2).
+        ctx / query_embedding: optional precomputed question embedding source.
         """
-        # Section 8 - CO Mapper debug
         dsection("CO Mapper")
         dlog("CO Mapper", "Question",    question[:100])
         dlog("CO Mapper", "Syllabus ID", syllabus_id or "(global)")
 
-        if self.collection.count() == 0:
-            derror("CO Mapper", "CO collection is empty", "No COs have been ingested yet")
+        cos = self.get_matrix(syllabus_id)
+        if not cos.metas:
+            derror("CO Mapper", "No COs stored", f"nothing ingested for {syllabus_id or 'any syllabus'}")
             return None
 
-        q_embedding = self.embed_fn([question], task="query")
-        where       = {"syllabus_id": syllabus_id} if syllabus_id else None
-
-        try:
-            n_results = min(10, self.collection.count())
-            kwargs = dict(query_embeddings=q_embedding, n_results=n_results,
-                          include=["metadatas", "distances", "documents"])
-            if where:
-                kwargs["where"] = where
-            result = self.collection.query(**kwargs)
-        except Exception as e:
-            derror("CO Mapper", "Query failed", str(e))
-            return None
-
-        metadatas = result.get("metadatas") or [[]]
-        distances = result.get("distances") or [[]]
-        documents = result.get("documents") or [[]]
-
-        if not metadatas or not metadatas[0]:
-            derror("CO Mapper", "No CO results returned", "Check if syllabus_id filter is too strict")
-            return None
+        q_vec = (
+            np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+            if query_embedding is not None else self._question_embedding(question, ctx)
+        )
+        norm = float(np.linalg.norm(q_vec)) or 1.0
+        cosine = cos.matrix @ (q_vec / norm)
+        sims   = np.maximum(0.0, 1.0 - (1.0 - cosine) / 2.0)
+        order  = np.argsort(-sims, kind="stable")
+
+        ranked = []
+        for i in order[:max(1, top_k)]:
+            meta = cos.metas[i]
+            display_co = meta.get("display_co") or meta.get("co_id")
+            ranked.append({
+                "display_co" : display_co,
+                "full_co_id" : meta.get("full_co_id", display_co),
+                "course_code": meta.get("course_code"),
+                "similarity" : round(float(sims[i]), 4),
+            })
 
-        # Print ranked CO similarities using display_co + full_co_id
         dlog("CO Mapper", "CO Similarities", "(cosine, descending)")
-        for meta, dist, doc in zip(metadatas[0], distances[0], documents[0]):
+        for i in order[:10]:
+            meta = cos.metas[i]
             display_co = meta.get("display_co") or meta.get("co_id", "?")
-            full_co_id = meta.get("full_co_id", display_co)
-            sim        = max(0.0, 1.0 - dist / 2.0)
-            snippet    = str(doc)[:60].replace("\n", " ")
-            dlog("CO Mapper", f"  {display_co}", f"{sim:.4f}  ({full_co_id})  -- {snippet}")
-
-        selected_meta    = metadatas[0][0]
-        selected_display = selected_meta.get("display_co") or selected_meta.get("co_id", None)
-        selected_full    = selected_meta.get("full_co_id", selected_display)
-        best_sim         = max(0.0, 1.0 - distances[0][0] / 2.0)
-
-        dlog("CO Mapper", "Matched",     selected_full or "None")
-        dlog("CO Mapper", "Similarity",  f"{best_sim:.4f}")
-        dlog("CO Mapper", "Selected CO", selected_display or "None")
-        if selected_display:
-            dlog("CO Mapper", "Reason",
-                 f"Highest cosine similarity among all COs for {syllabus_id or 'global'}")
-        else:
-            derror("CO Mapper", "No CO selected",
-                   "metadatas[0][0] had no display_co or co_id field")
+            snippet    = str(cos.documents[i])[:60].replace("\n", " ")
+            dlog("CO Mapper", f"  {display_co}", f"{sims[i]:.4f}  ({meta.get('full_co_id', display_co)})  -- {snippet}")
+
+        best = ranked[0]
+        dlog("CO Mapper", "Matched",     best["full_co_id"] or "None")
+        dlog("CO Mapper", "Similarity",  f"{best['similarity']:.4f}")
+        dlog("CO Mapper", "Selected CO", best["display_co"] or "None")
+        if not best["display_co"]:
+            derror("CO Mapper", "No CO selected", "best CO had no display_co or co_id field")
+            return None
 
-        return selected_display
+        return {**best, "alternatives": ranked[1:]}
+
+    def map_question_to_co(
+        self,
+        question: str,
+        syllabus_id: str = None,
+        ctx=None,
+    ) -> str | None:
+        """
+        Embed the question and return the best-matching CO display_id (e.g. "CO2").
+        ctx: optional QuestionContext supplying the question embedding.
+        """
+        match = self.map_question(question, syllabus_id, ctx=ctx)
+        return match["display_co"] if match else None
 
     def map_question_to_co_full(
         self,
         question: str,
         syllabus_id: str = None,
+        ctx=None,
     ) -> dict | None:
         """
         Like map_question_to_co but returns a dict with display_co and full_co_id.
         Used by callers that want to surface the full identifier in the API response.
         """
-        if self.collection.count() == 0:
-            return None
-
-        q_embedding = self.embed_fn([question], task="query")
-        where       = {"syllabus_id": syllabus_id} if syllabus_id else None
-
-        try:
-            kwargs = dict(query_embeddings=q_embedding, n_results=1,
-                          include=["metadatas", "distances"])
-            if where:
-                kwargs["where"] = where
-            result = self.collection.query(**kwargs)
-        except Exception:
-            return None
-
-        metadatas = result.get("metadatas") or [[]]
-        distances = result.get("distances") or [[]]
-
-        if not metadatas or not metadatas[0]:
+        match = self.map_question(question, syllabus_id, ctx=ctx, top_k=1)
+        if not match:
             return None
-
-        meta = metadatas[0][0]
-        dist = distances[0][0]
-        sim  = max(0.0, 1.0 - dist / 2.0)
-
-        return {
-            "display_co" : meta.get("display_co") or meta.get("co_id"),
-            "full_co_id" : meta.get("full_co_id"),
-            "course_code": meta.get("course_code"),
-            "similarity" : sim,
-        }
+        match.pop("alternatives", None)
+        return match
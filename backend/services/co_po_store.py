@@ -0,0 +1,118 @@
+"""
+services/co_po_store.py
+------------------------
+Durable CO → PO mapping shared by every worker process.
+
+CoMapper kept the mapping in a per-process dict, so PO mappings vanished
+on restart (nothing re-ingests them at hydration) and each worker saw only
+the syllabi it had ingested itself.  This store keeps one SQLite (WAL) row
+per (syllabus, CO).
+
+Reads are served from memory: a syllabus's mapping is loaded the first time
+it is asked for and kept until another connection commits a change.
+SQLite bumps ``PRAGMA data_version`` whenever another connection commits,
+so checking it costs one pragma per lookup and a write by any worker
+invalidates every other worker's cached copy.
+
+Usage:
+    store = CoPoStore("data/co_po.sqlite3")
+    store.upsert_many("IT-VIII-PEC-IT801B", {"CO1": "PO2", "CO2": "PO1"})
+    store.get("IT-VIII-PEC-IT801B", "co2")        # -> "PO1"
+    store.get_mapping("IT-VIII-PEC-IT801B")       # -> {"CO1": "PO2", "CO2": "PO1"}
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CoPoStore:
+    """Row-per-CO PO mapping in SQLite (WAL) with a lazily loaded memory copy."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, str]] = {}    # syllabus_id → {CO: PO}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS co_po ("
+            "  syllabus_id TEXT NOT NULL,"
+            "  co_id       TEXT NOT NULL,"
+            "  pco_id      TEXT NOT NULL,"
+            "  updated_at  REAL NOT NULL,"
+            "  PRIMARY KEY (syllabus_id, co_id)"
+            ")"
+        )
+        self._conn.commit()
+        self._data_version = self._version()
+
+    def _version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self) -> None:
+        """Drop the memory copy if another connection has committed since the last look."""
+        version = self._version()
+        if version != self._data_version:
+            self._data_version = version
+            self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_mapping(self, syllabus_id: str) -> Dict[str, str]:
+        """{CO: PO} for one syllabus (empty when nothing is stored)."""
+        with self._lock:
+            self._sync()
+            mapping = self._cache.get(syllabus_id)
+            if mapping is None:
+                rows = self._conn.execute(
+                    "SELECT co_id, pco_id FROM co_po WHERE syllabus_id = ?", (syllabus_id,)
+                ).fetchall()
+                mapping = self._cache[syllabus_id] = dict(rows)
+            return dict(mapping)
+
+    def get(self, syllabus_id: str, co_id: str) -> Optional[str]:
+        if not syllabus_id or not co_id:
+            return None
+        return self.get_mapping(syllabus_id).get(co_id.upper())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM co_po").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def upsert_many(self, syllabus_id: str, mapping: Dict[str, str]) -> int:
+        """Insert or update several CO → PO rows in ONE transaction.  Returns rows written."""
+        if not mapping:
+            return 0
+        now  = time.time()
+        rows = [(syllabus_id, co.upper(), po.upper(), now) for co, po in mapping.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO co_po(syllabus_id, co_id, pco_id, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._cache.pop(syllabus_id, None)
+        return len(rows)
+
+    def delete(self, syllabus_id: str) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM co_po WHERE syllabus_id = ?", (syllabus_id,))
+            self._cache.pop(syllabus_id, None)
+        return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM co_po")
+            self._cache.clear()
@@ -1,22 +1,37 @@
 import os
 import re
+import threading
 import chromadb
-from typing import List
-import spacy
+import numpy as np
+from typing import Dict, List
 
-_nlp = None
+from services import nlp_registry
+from vectorstores.partitions import CollectionRouter
+from vectorstores.syllabus_versions import ALL_SYLLABI, SyllabusVersions
 
 def get_nlp():
-    global _nlp
-    if _nlp is None:
-        _nlp = spacy.load("en_core_web_sm")
-    return _nlp
+    """Shared, component-trimmed pipeline (see services/nlp_registry.py)."""
+    return nlp_registry.get_nlp()
 
 def extract_concepts(text: str) -> List[str]:
     """Extract technical noun phrases, capitalized entities, and acronyms."""
-    nlp = get_nlp()
-    # Limit text length to avoid spacy memory issues on massive documents
-    doc = nlp(text[:100000])
+    pieces = nlp_registry.split_text(text)
+    if len(pieces) <= 1:
+        # Questions and short texts: a single parse, no pipe overhead
+        return concepts_from_doc(get_nlp()(text), text)
+
+    # Long documents are streamed piece by piece instead of truncated
+    concepts = set()
+    for doc, piece in zip(nlp_registry.pipe(pieces), pieces):
+        concepts.update(concepts_from_doc(doc, piece))
+    return list(concepts)
+
+def extract_concepts_many(texts: List[str]) -> List[List[str]]:
+    """extract_concepts for many short texts (a question paper) in one nlp.pipe."""
+    return [concepts_from_doc(doc, t) for doc, t in zip(nlp_registry.pipe(texts), texts)]
+
+def concepts_from_doc(doc, text: str) -> List[str]:
+    """extract_concepts on an already-parsed doc (shared ingestion pass)."""
     concepts = set()
     
     # 1. Noun chunks (removing determiners)
@@ -45,22 +60,129 @@ class ConceptStore:
     """
     Builds a subject-local concept index and provides semantic boosting
     for conceptual question analysis.
+
+    The ``concept_store`` Chroma collection is the source of record.  Queries
+    are served from an in-memory, pre-normalised float32 matrix per syllabus
+    (loaded from the collection on first use, refreshed on ingest/delete),
+    so the boost is one matrix product instead of a filtered ANN query.
+    Writes bump a per-syllabus version shared with the other workers, which
+    drop their cached matrix for that syllabus.
+
+    With a partition_catalog each syllabus's concepts live in their own
+    collection (vectorstores/partitions.py); re-ingesting or deleting a
+    syllabus drops it.
     """
-    def __init__(self, embed_fn, persist_dir: str = "./data/vector_db"):
+    def __init__(self, embed_fn, persist_dir: str = "./data/vector_db", partition_catalog=None,
+                 versions_path: str = None):
         self.embed_fn = embed_fn
         self.client = chromadb.PersistentClient(path=persist_dir)
-        self.collection = self.client.get_or_create_collection(
-            name="concept_store",
-            metadata={"hnsw:space": "cosine"}
+        self._router = CollectionRouter(self.client, "concept_store", partition_catalog)
+        self.collection = self._router.shared
+        self._matrices: Dict[str, np.ndarray] = {}   # syllabus_id → (n_concepts, dim) unit rows
+        self._lock = threading.Lock()
+        # Shared with the other worker processes on this persist_dir
+        self._versions = SyllabusVersions(
+            versions_path or os.path.join(os.path.dirname(os.path.abspath(persist_dir)), "concept_versions.sqlite3")
         )
-        
-    def add_syllabus_concepts(self, syllabus_id: str, chunks: List[str]):
-        """Extract and store concepts from chunks during ingestion."""
-        if not chunks:
+
+    # ------------------------------------------------------------------
+    # In-memory concept matrices
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        mat = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if mat.ndim != 2 or mat.shape[0] == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return mat / norms
+
+    def _load_matrix(self, syllabus_id: str) -> np.ndarray:
+        """Read every concept vector of a syllabus from the collection (raises on Chroma errors)."""
+        coll = self._router.for_syllabus(syllabus_id)
+        if coll is None:
+            return np.empty((0, 0), dtype=np.float32)
+        res = coll.get(where=self._router.where(syllabus_id), include=["embeddings"])
+        embeddings = res.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._normalize(embeddings)
+
+    def get_matrix(self, syllabus_id: str) -> np.ndarray:
+        """Cached concept matrix for a syllabus (loaded from Chroma once per change)."""
+        self.sync()
+        mat = self._matrices.get(syllabus_id)
+        if mat is None:
+            try:
+                mat = self._load_matrix(syllabus_id)
+            except Exception as e:
+                # Not cached: a transient error must not disable the boost until restart
+                print(f"[ConceptStore] Could not load concepts for '{syllabus_id}': {e}")
+                return np.empty((0, 0), dtype=np.float32)
+            with self._lock:
+                self._matrices[syllabus_id] = mat
+        return mat
+
+    def refresh(self, syllabus_id: str) -> None:
+        """Drop the cached matrix; the next boost reloads it from the collection."""
+        with self._lock:
+            self._matrices.pop(syllabus_id, None)
+
+    def _bump(self, syllabus_id: str) -> None:
+        if self._versions is not None:
+            self._versions.bump(syllabus_id)
+
+    def sync(self) -> None:
+        """Drop cached matrices of syllabi another worker ingested or deleted."""
+        if self._versions is None:
             return
-            
-        full_text = " ".join(chunks)
-        concepts = extract_concepts(full_text)
+        changed = self._versions.changed()
+        if ALL_SYLLABI in changed:
+            with self._lock:
+                self._matrices.clear()
+            return
+        for sid in changed:
+            self.refresh(sid)
+
+    def delete_syllabus_concepts(self, syllabus_id: str) -> None:
+        """Remove a syllabus's concepts from the collection and the in-memory cache."""
+        try:
+            self._router.delete(syllabus_id)
+        except Exception as e:
+            print(f"[ConceptStore] Error deleting concepts for '{syllabus_id}': {e}")
+        self.refresh(syllabus_id)
+        self._bump(syllabus_id)
+
+    def clear(self) -> None:
+        """Remove every concept (used by /purge_all)."""
+        try:
+            for sid in self._router.syllabi():
+                self._router.drop(sid)
+            all_data = self.collection.get()
+            if all_data and all_data.get("ids"):
+                self.collection.delete(ids=all_data["ids"])
+        except Exception as e:
+            print(f"[ConceptStore] Clear error: {e}")
+        with self._lock:
+            self._matrices.clear()
+        self._bump(ALL_SYLLABI)
+
+    # ------------------------------------------------------------------
+    # Ingestion / query
+    # ------------------------------------------------------------------
+
+    def add_syllabus_concepts(self, syllabus_id: str, chunks: List[str], concepts: List[str] = None):
+        """
+        Extract and store concepts from chunks during ingestion (replaces any previous set).
+
+        concepts: phrases already extracted by the shared ingestion pass
+        (services/syllabus_concepts.py); chunks are not parsed again.
+        """
+        if concepts is None:
+            if not chunks:
+                return
+            concepts = extract_concepts(" ".join(chunks))
         if not concepts:
             return
             
@@ -70,50 +192,93 @@ class ConceptStore:
         embeddings = self.embed_fn(concepts, task="passage")
         ids = [f"{syllabus_id}_c_{i}" for i in range(len(concepts))]
         metas = [{"syllabus_id": syllabus_id, "concept": c} for c in concepts]
-        
+
+        # Re-ingest: drop the previous concept set so stale ids don't linger
+        try:
+            self._router.delete(syllabus_id)
+        except Exception:
+            pass
+
+        coll = self._router.for_syllabus(syllabus_id, create=True)
         batch_size = 500
         for i in range(0, len(concepts), batch_size):
-            self.collection.add(
+            coll.add(
                 ids=ids[i:i+batch_size],
                 embeddings=embeddings[i:i+batch_size],
                 metadatas=metas[i:i+batch_size],
                 documents=concepts[i:i+batch_size]
             )
 
-    def compute_concept_boost(self, question: str, syllabus_id: str) -> float:
+        # The vectors are already in hand — refresh the cache without a round trip
+        with self._lock:
+            self._matrices[syllabus_id] = self._normalize(embeddings)
+        self._bump(syllabus_id)
+
+    def compute_concept_boost(self, question: str, syllabus_id: str, ctx=None) -> float:
         """
         Compare question concepts semantically against LOCAL syllabus concepts ONLY.
         Returns a retrieval boost if local curriculum concept alignment exists.
+
+        The best cosine is the max of one (question concepts × syllabus
+        concepts) product against the cached matrix — exact, and no Chroma
+        traffic on the query path.
+
+        ctx: optional QuestionContext supplying the pre-extracted concepts
+        and their embeddings.
         """
         if not syllabus_id:
             return 0.0
             
-        q_concepts = extract_concepts(question)
+        q_concepts = ctx.concepts if ctx is not None else extract_concepts(question)
         if not q_concepts:
             return 0.0
-            
-        q_embeddings = self.embed_fn(q_concepts, task="query")
-        
-        try:
-            results = self.collection.query(
-                query_embeddings=q_embeddings,
-                n_results=1,
-                where={"syllabus_id": syllabus_id}
-            )
-        except Exception:
+
+        concept_mat = self.get_matrix(syllabus_id)
+        if concept_mat.shape[0] == 0:
             return 0.0
-            
-        distances = results.get("distances", [])
-        if not distances:
+
+        if ctx is not None:
+            q_embeddings = ctx.embed(q_concepts, task="query")
+        else:
+            q_embeddings = self.embed_fn(q_concepts, task="query")
+
+        q_mat = self._normalize(q_embeddings)
+        if q_mat.shape[0] == 0:
             return 0.0
-            
-        best_sim = 0.0
-        for dist_list in distances:
-            if dist_list:
-                sim = max(0.0, min(1.0, 1.0 - float(dist_list[0])))
-                if sim > best_sim:
-                    best_sim = sim
-                    
+        best_sim = max(0.0, min(1.0, float((q_mat @ concept_mat.T).max())))
+        return self._boost_for(best_sim)
+
+    def compute_concept_boost_many(self, contexts, syllabus_id: str) -> np.ndarray:
+        """
+        compute_concept_boost for a whole question paper: the concept vectors
+        of every QuestionContext are stacked and scored with ONE product
+        against the syllabus matrix, then max-reduced per question.
+        """
+        boosts = np.zeros(len(contexts), dtype=np.float64)
+        if not syllabus_id or not contexts:
+            return boosts
+        concept_mat = self.get_matrix(syllabus_id)
+        if concept_mat.shape[0] == 0:
+            return boosts
+
+        blocks, owners = [], []
+        for i, ctx in enumerate(contexts):
+            if ctx.concepts:
+                blocks.append(ctx.embed(ctx.concepts, task="query"))
+                owners.extend([i] * len(ctx.concepts))
+        if not blocks:
+            return boosts
+
+        best = (self._normalize(np.vstack(blocks)) @ concept_mat.T).max(axis=1)
+        per_question = np.full(len(contexts), -np.inf)
+        np.maximum.at(per_question, np.asarray(owners), best)
+        for i, sim in enumerate(per_question):
+            if np.isfinite(sim):
+                boosts[i] = self._boost_for(max(0.0, min(1.0, float(sim))))
+        return boosts
+
+    @staticmethod
+    def _boost_for(best_sim: float) -> float:
         # Safe Hybrid Boosting: Boost ONLY when local curriculum concept alignment exists.
         # This will lift conceptual paraphrases (e.g. "reduce redundancy" -> "normalization")
         # without hardcoding mappings.
@@ -7,7 +7,10 @@ During ingestion:
     Extracts high-quality technical concepts from each syllabus using
     spaCy noun chunks, acronyms, and capitalized entities.
     Generic course terms are filtered out, and the resulting specific
-    concepts are persisted to ``data/scope_concepts.json``.
+    concepts are persisted to ``data/scope_concepts.sqlite3`` (one row per
+    syllabus; see services/scope_concept_store.py).  The distinct
+    concept words are embedded once and the raw float32 matrix is saved in
+    ``data/scope_embeddings/<syllabus>.npy`` (memory-mapped on load).
 
 During question analysis:
     Computes a Concept Overlap Score using word-level semantic matching
@@ -26,23 +29,38 @@ Design principles:
 
 from __future__ import annotations
 
+import hashlib
 import json
-import math
 import os
 import re
+import shutil
 from typing import Any, Dict, List, Optional
 
+from config import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND
+from models.embedding_cache import embedding_namespace
+from services import nlp_registry
+from services.morphology_index import MorphologyIndex
+from services.scope_concept_store import ScopeConceptStore
+
 # ---------------------------------------------------------------------------
 # Storage path & Configuration
 # ---------------------------------------------------------------------------
 
 _DATA_DIR     = os.path.join(os.path.dirname(__file__), "..", "data")
-_CONCEPTS_FILE = os.path.join(_DATA_DIR, "scope_concepts.json")
+_CONCEPTS_DB   = os.path.join(_DATA_DIR, "scope_concepts.sqlite3")
+_CONCEPTS_FILE = os.path.join(_DATA_DIR, "scope_concepts.json")   # legacy, migrated on first open
+_EMBEDDINGS_DIR = os.path.join(_DATA_DIR, "scope_embeddings")
+
+# Persisted matrices are only reused when produced by the same model
+_EMBEDDING_NAMESPACE = embedding_namespace(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)
 
 # In-memory caches
 _concept_cache:       Dict[str, List[str]] = {}  # syllabus_id → concept list
-_embedding_cache:     Dict[str, Any]       = {}  # syllabus_id → list of word embeddings
+_embedding_cache:     Dict[str, Any]       = {}  # syllabus_id → (n_words, dim) unit-row float64 matrix
 _syllabus_word_cache: Dict[str, List[str]] = {}  # syllabus_id → list of distinct words
+_morph_index_cache:   Dict[str, MorphologyIndex] = {}  # syllabus_id → prefix / n-gram index
+
+_db: Optional[ScopeConceptStore] = None
 
 # Query structures, auxiliary verbs, and generic course words to ignore
 GENERIC_WORDS = {
@@ -65,20 +83,69 @@ GENERIC_WORDS = {
 # Persistence helpers
 # ---------------------------------------------------------------------------
 
-def _load_store() -> Dict[str, List[str]]:
-    if os.path.exists(_CONCEPTS_FILE):
-        try:
-            with open(_CONCEPTS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+def _get_db() -> ScopeConceptStore:
+    """Open the concept database on first use, importing the legacy JSON file once."""
+    global _db
+    if _db is None or _db.path != _CONCEPTS_DB:
+        _db = ScopeConceptStore(_CONCEPTS_DB)
+        _db.migrate_json(_CONCEPTS_FILE)
+    return _db
+
+
+def _embedding_paths(syllabus_id: str) -> tuple[str, str]:
+    """(matrix .npy, word-list .json) paths for a syllabus — filename-safe and collision-free."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", syllabus_id)[:80]
+    digest = hashlib.sha1(syllabus_id.encode("utf-8")).hexdigest()[:10]
+    base = os.path.join(_EMBEDDINGS_DIR, f"{safe}-{digest}")
+    return base + ".npy", base + ".words.json"
+
+
+def _save_embeddings(syllabus_id: str, words: List[str], embs) -> None:
+    """Write the word list and its raw embedding matrix; each file is replaced atomically."""
+    import numpy as np
+
+    os.makedirs(_EMBEDDINGS_DIR, exist_ok=True)
+    npy_path, words_path = _embedding_paths(syllabus_id)
+
+    tmp = npy_path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(embs, dtype=np.float32))
+    os.replace(tmp, npy_path)
 
+    tmp = words_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model": _EMBEDDING_NAMESPACE, "rows": "raw", "words": words}, f)
+    os.replace(tmp, words_path)
+
+
+def _load_embeddings(syllabus_id: str, words: List[str]):
+    """
+    Memory-map the persisted matrix for a syllabus.  Returns None when it is
+    missing, was built by another model, or no longer matches the word list.
+    """
+    import numpy as np
+
+    npy_path, words_path = _embedding_paths(syllabus_id)
+    if not (os.path.exists(npy_path) and os.path.exists(words_path)):
+        return None
+    try:
+        with open(words_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta.get("model") != _EMBEDDING_NAMESPACE or meta.get("rows") != "raw"
+                or meta.get("words") != words):
+            return None
+        embs = np.load(npy_path, mmap_mode="r")
+    except (OSError, ValueError, json.JSONDecodeError):
+        return None
+    if embs.shape[0] != len(words):
+        return None
+    return embs
 
-def _save_store(store: Dict[str, List[str]]) -> None:
-    os.makedirs(_DATA_DIR, exist_ok=True)
-    with open(_CONCEPTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(store, f, indent=2)
+
+def _delete_embeddings(syllabus_id: str) -> None:
+    for path in _embedding_paths(syllabus_id):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 # ---------------------------------------------------------------------------
@@ -103,13 +170,47 @@ def extract_syllabus_concepts(text: str, top_n: int = 150) -> List[str]:
         return _extract_by_frequency(text, top_n)
 
 
+def extract_syllabus_concepts_many(texts: List[str], top_n: int = 150) -> List[List[str]]:
+    """
+    Batched variant of extract_syllabus_concepts for several syllabi at once
+    (startup backfill, bulk ingest): the pieces of every text are streamed
+    through ONE ``nlp.pipe`` and counted per syllabus.
+    """
+    from collections import Counter
+
+    try:
+        owners, pieces = [], []
+        for i, text in enumerate(texts):
+            for piece in nlp_registry.split_text(text):
+                owners.append(i)
+                pieces.append(piece)
+        counts = [Counter() for _ in texts]
+        for owner, doc, piece in zip(owners, nlp_registry.pipe(pieces), pieces):
+            counts[owner].update(_scope_candidates(doc, piece))
+        return [_rank_candidates(c, top_n) for c in counts]
+    except Exception as e:
+        print(f"[ScopeValidator] Falling back to frequency extraction: {e}")
+        return [_extract_by_frequency(t, top_n) for t in texts]
+
+
 def _extract_with_spacy(text: str, top_n: int) -> List[str]:
-    """spaCy noun chunks + entities with generic word filters."""
-    import spacy
-    
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text[:100_000])           # spaCy limit guard
+    """
+    spaCy noun chunks + entities with generic word filters.
+
+    The text is streamed through ``nlp.pipe`` in whitespace-aligned pieces
+    and candidate counts are merged as they arrive — nothing is truncated.
+    """
+    from collections import Counter
+
+    counts: Counter = Counter()
+    pieces = nlp_registry.split_text(text)
+    for doc, piece in zip(nlp_registry.pipe(pieces), pieces):
+        counts.update(_scope_candidates(doc, piece))
+    return _rank_candidates(counts, top_n)
 
+
+def _scope_candidates(doc, text: str) -> set:
+    """Generic-filtered concept candidates of one parsed piece of text."""
     candidates: set = set()
 
     # 1. Noun chunks
@@ -137,11 +238,15 @@ def _extract_with_spacy(text: str, top_n: int) -> List[str]:
     for acr in re.findall(r"\b[A-Z]{2,}\b", text):
         candidates.add(acr.lower())
 
-    if not candidates:
-        return []
+    return candidates
+
 
-    # Sort candidates by length (longer = more specific technical terms)
-    ranked = sorted(list(candidates), key=len, reverse=True)
+def _rank_candidates(counts, top_n: int) -> List[str]:
+    """
+    Sort candidates by length (longer = more specific technical terms);
+    among equally long ones, those seen in more pieces come first.
+    """
+    ranked = sorted(counts, key=lambda c: (-len(c), -counts[c], c))
     return ranked[:top_n]
 
 
@@ -159,38 +264,63 @@ def _extract_by_frequency(text: str, top_n: int) -> List[str]:
 # Storage API
 # ---------------------------------------------------------------------------
 
-def store_scope_concepts(syllabus_id: str, concepts: List[str]) -> None:
-    """Persist extracted concepts for a syllabus and update the in-memory cache."""
-    store = _load_store()
-    store[syllabus_id] = concepts
-    _save_store(store)
-    _concept_cache[syllabus_id] = concepts
-    
-    # Invalidate caches
-    _embedding_cache.pop(syllabus_id, None)
-    _syllabus_word_cache.pop(syllabus_id, None)
+def store_scope_concepts(syllabus_id: str, concepts: List[str], embed_fn=None) -> None:
+    """
+    Persist extracted concepts for a syllabus and update the in-memory cache.
+
+    When embed_fn is given the concept words are embedded and persisted now,
+    so the first question after ingestion (or after a restart) does not pay
+    for it.
+    """
+    store_scope_concepts_many({syllabus_id: concepts}, embed_fn=embed_fn)
     print(f"[ScopeValidator] Stored {len(concepts)} concepts for '{syllabus_id}'")
 
 
+def store_scope_concepts_many(items: Dict[str, List[str]], embed_fn=None) -> None:
+    """Persist concepts for several syllabi in one transaction (bulk ingestion / backfill)."""
+    _get_db().upsert_many(items)
+
+    for syllabus_id, concepts in items.items():
+        _concept_cache[syllabus_id] = concepts
+
+        # Invalidate caches
+        _embedding_cache.pop(syllabus_id, None)
+        _syllabus_word_cache.pop(syllabus_id, None)
+        _delete_embeddings(syllabus_id)
+
+        # Build the morphology index now so the first question doesn't pay for it
+        _morph_index_cache[syllabus_id] = MorphologyIndex(_syllabus_words(concepts))
+        if embed_fn is not None:
+            _get_syllabus_words_and_embeddings(syllabus_id, embed_fn)
+
+
+def precompute_scope_embeddings(syllabus_id: str, embed_fn) -> bool:
+    """
+    Make sure the word matrix for a syllabus is persisted and loaded
+    (memory-mapped when already on disk).  Used at startup for syllabi
+    ingested before embeddings were persisted.  Returns False when the
+    syllabus has no concepts.
+    """
+    return _get_syllabus_words_and_embeddings(syllabus_id, embed_fn) is not None
+
+
 def load_scope_concepts(syllabus_id: str) -> List[str]:
     """Load concepts for a syllabus from cache or disk."""
     if syllabus_id in _concept_cache:
         return _concept_cache[syllabus_id]
-    store = _load_store()
-    concepts = store.get(syllabus_id, [])
+    concepts = _get_db().get(syllabus_id) or []
     _concept_cache[syllabus_id] = concepts
     return concepts
 
 
 def delete_scope_concepts(syllabus_id: str) -> None:
     """Remove stored concepts for a deleted syllabus."""
-    store = _load_store()
-    if syllabus_id in store:
-        del store[syllabus_id]
-        _save_store(store)
+    _get_db().delete(syllabus_id)
     _concept_cache.pop(syllabus_id, None)
     _embedding_cache.pop(syllabus_id, None)
     _syllabus_word_cache.pop(syllabus_id, None)
+    _morph_index_cache.pop(syllabus_id, None)
+    _delete_embeddings(syllabus_id)
 
 
 def clear_all_scope_concepts() -> None:
@@ -198,30 +328,60 @@ def clear_all_scope_concepts() -> None:
     _concept_cache.clear()
     _embedding_cache.clear()
     _syllabus_word_cache.clear()
-    if os.path.exists(_CONCEPTS_FILE):
-        os.remove(_CONCEPTS_FILE)
+    _morph_index_cache.clear()
+    _get_db().clear()
+    for path in (_CONCEPTS_FILE, _CONCEPTS_FILE + ".migrated"):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(_EMBEDDINGS_DIR, ignore_errors=True)
 
 
 # ---------------------------------------------------------------------------
 # Semantic overlap computation (query time)
 # ---------------------------------------------------------------------------
 
-def _cosine_similarity(a, b) -> float:
-    """Cosine similarity between two 1-D numpy-compatible arrays."""
+def _normalize_rows(matrix):
+    """
+    L2-normalise each row in float64, as the pairwise cosine did, so the
+    dot products match it near the cutoff; all-zero rows stay zero (cosine 0).
+    """
     import numpy as np
 
-    a = np.asarray(a, dtype=float)
-    b = np.asarray(b, dtype=float)
-    na, nb = np.linalg.norm(a), np.linalg.norm(b)
-    if na == 0 or nb == 0:
-        return 0.0
-    return float(np.dot(a, b) / (na * nb))
+    matrix = np.array(matrix, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _syllabus_words(concepts: List[str]) -> List[str]:
+    """Deconstruct concepts into their distinct words (3+ letters), sorted."""
+    words = set()
+    for c in concepts:
+        for w in re.findall(r"\b[a-zA-Z]{3,}\b", c.lower()):
+            words.add(w)
+    return sorted(words)
+
+
+def _get_morphology_index(syllabus_id: str) -> Optional[MorphologyIndex]:
+    """Return the cached morphology index for a syllabus, building it on demand."""
+    index = _morph_index_cache.get(syllabus_id)
+    if index is None:
+        concepts = load_scope_concepts(syllabus_id)
+        if not concepts:
+            return None
+        index = MorphologyIndex(_syllabus_words(concepts))
+        _morph_index_cache[syllabus_id] = index
+    return index
 
 
 def _get_syllabus_words_and_embeddings(syllabus_id: str, embed_fn) -> Optional[tuple[List[str], Any]]:
     """
-    Return and cache the token list and corresponding SBERT embeddings
-    for all distinct words in the syllabus concepts.
+    Return and cache the token list and the corresponding SBERT embeddings
+    (one float64 matrix of unit rows, row i ↔ word i) for all distinct
+    words in the syllabus concepts.
+
+    The raw matrix is memory-mapped from ``data/scope_embeddings`` when a
+    matching file exists; otherwise it is encoded once and written there.
     """
     if syllabus_id in _syllabus_word_cache and syllabus_id in _embedding_cache:
         return _syllabus_word_cache[syllabus_id], _embedding_cache[syllabus_id]
@@ -230,20 +390,21 @@ def _get_syllabus_words_and_embeddings(syllabus_id: str, embed_fn) -> Optional[t
     if not concepts:
         return None
 
-    # Deconstruct concepts into distinct words
-    syllabus_words = set()
-    for c in concepts:
-        for w in re.findall(r"\b[a-zA-Z]{3,}\b", c.lower()):
-            syllabus_words.add(w)
-    
-    syllabus_words_list = list(syllabus_words)
+    syllabus_words_list = _syllabus_words(concepts)
     if not syllabus_words_list:
         return None
 
-    try:
-        embs = embed_fn(syllabus_words_list, task="passage")
-    except TypeError:
-        embs = embed_fn(syllabus_words_list)
+    embs = _load_embeddings(syllabus_id, syllabus_words_list)
+    if embs is None:
+        try:
+            embs = embed_fn(syllabus_words_list, task="passage")
+        except TypeError:
+            embs = embed_fn(syllabus_words_list)
+        try:
+            _save_embeddings(syllabus_id, syllabus_words_list, embs)
+        except OSError as e:
+            print(f"[ScopeValidator] Could not persist word embeddings for '{syllabus_id}': {e}")
+    embs = _normalize_rows(embs)   # (n_words, dim), unit rows → dot product == cosine
 
     _syllabus_word_cache[syllabus_id] = syllabus_words_list
     _embedding_cache[syllabus_id]     = embs
@@ -271,7 +432,18 @@ def _is_morphological_match(w1: str, w2: str) -> bool:
     return False
 
 
-def compute_concept_overlap(question: str, syllabus_id: str, embed_fn, semantic_cutoff: float = 0.86) -> float:
+def extract_question_words(question: str) -> List[str]:
+    """Tokenize a question into its non-generic content words (3+ letters)."""
+    return [w for w in re.findall(r"\b[a-zA-Z]{3,}\b", question.lower()) if w not in GENERIC_WORDS]
+
+
+def compute_concept_overlap(
+    question: str,
+    syllabus_id: str,
+    embed_fn,
+    semantic_cutoff: float = 0.86,
+    ctx=None,
+) -> float:
     """
     Compute semantic concept overlap using token-level max-similarity with a threshold cutoff.
 
@@ -283,6 +455,13 @@ def compute_concept_overlap(question: str, syllabus_id: str, embed_fn, semantic_
            - Else -> find the max SBERT cosine similarity to any syllabus word.
            - If similarity >= semantic_cutoff -> score = similarity, else 0.0.
         3. Return the average score across all query words.
+
+    The semantic step is a single (unmatched words × syllabus words) matrix
+    product against the cached pre-normalised syllabus matrix, followed by
+    a row-wise max; exact/morphological matches and the cutoff are masks.
+
+    ctx: optional QuestionContext — question words and their embeddings are
+    read from it instead of being tokenized and encoded again.
     """
     word_data = _get_syllabus_words_and_embeddings(syllabus_id, embed_fn)
     if not word_data:
@@ -291,46 +470,35 @@ def compute_concept_overlap(question: str, syllabus_id: str, embed_fn, semantic_
     syllabus_words, syllabus_embs = word_data
 
     # Extract non-generic question words
-    q_words = [w for w in re.findall(r"\b[a-zA-Z]{3,}\b", question.lower()) if w not in GENERIC_WORDS]
+    q_words = ctx.content_words if ctx is not None else extract_question_words(question)
     if not q_words:
         return 1.0  # Safe fallback if question has no content words
 
-    try:
-        q_embs = embed_fn(q_words, task="query")
-    except TypeError:
-        q_embs = embed_fn(q_words)
-
-    similarities = []
-    for q_word, q_emb in zip(q_words, q_embs):
-        # 1. Exact match check
-        if q_word in syllabus_words:
-            similarities.append(1.0)
-            continue
-
-        # 2. Morphological match check
-        morph_found = False
-        for s_word in syllabus_words:
-            if _is_morphological_match(q_word, s_word):
-                similarities.append(1.0)
-                morph_found = True
-                break
-        if morph_found:
-            continue
+    if ctx is not None:
+        q_embs = ctx.embed(q_words, task="query")
+    else:
+        try:
+            q_embs = embed_fn(q_words, task="query")
+        except TypeError:
+            q_embs = embed_fn(q_words)
 
-        # 3. Semantic matching
-        max_sim = 0.0
-        for s_emb in syllabus_embs:
-            sim = _cosine_similarity(q_emb, s_emb)
-            if sim > max_sim:
-                max_sim = sim
+    import numpy as np
 
+    # 1. Exact match and 2. morphological match → score 1.0
+    #    (hash lookups in the per-syllabus index instead of a pairwise scan)
+    index = _get_morphology_index(syllabus_id)
+    matched = np.array([w in index or index.matches(w) for w in q_words])
+    scores = np.ones(len(q_words), dtype=np.float64)
+
+    # 3. Semantic matching for the remaining words: one matrix multiply + row-wise max
+    rest = ~matched
+    if rest.any():
+        q_mat   = _normalize_rows(np.asarray(q_embs)[rest])
+        max_sim = np.maximum((q_mat @ syllabus_embs.T).max(axis=1), 0.0)
         # 4. Soft semantic cutoff to filter out background stylistic associations
-        if max_sim >= semantic_cutoff:
-            similarities.append(max_sim)
-        else:
-            similarities.append(0.0)
+        scores[rest] = np.where(max_sim >= semantic_cutoff, max_sim, 0.0)
 
-    return sum(similarities) / len(similarities)
+    return float(scores.mean())
 
 
 # ---------------------------------------------------------------------------
@@ -345,6 +513,7 @@ def validate_scope(
     high_sim_threshold:    float = 0.72,
     min_overlap_threshold: float = 0.24,
     semantic_cutoff:       float = 0.86,
+    ctx=None,
 ) -> Dict[str, Any]:
     """
     Curriculum Scope Validator — deterministic pre-LLM gate.
@@ -352,6 +521,8 @@ def validate_scope(
     Blocks domain intrusions (like ML, Cloud, AI, IoT, NLP on a Cryptography
     syllabus) when their similarity score is high but their content words do
     not semantically overlap with the syllabus vocabulary.
+
+    ctx: optional QuestionContext forwarded to compute_concept_overlap.
     """
     # ── Guard 1: only activate when a specific syllabus is selected ──────────
     if not syllabus_id:
@@ -366,7 +537,8 @@ def validate_scope(
         return {"is_out_of_scope": False, "concept_overlap": 1.0, "reason": "No scope concepts stored"}
 
     # ── Compute semantic concept overlap ────────────────────────────────────
-    overlap = compute_concept_overlap(question, syllabus_id, embed_fn, semantic_cutoff=semantic_cutoff)
+    overlap = compute_concept_overlap(question, syllabus_id, embed_fn,
+                                      semantic_cutoff=semantic_cutoff, ctx=ctx)
     overlap = round(overlap, 4)
 
     if overlap < min_overlap_threshold:
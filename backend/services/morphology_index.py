@@ -0,0 +1,102 @@
+"""
+services/morphology_index.py
+-----------------------------
+Per-syllabus index for the scope validator's morphological matcher.
+
+``_is_morphological_match(q, s)`` is True when, with both words at least
+4 characters long:
+    (a) q is a substring of s and len(q) >= 5, or
+    (b) s is a substring of q and len(s) >= 5, or
+    (c) both are at least 5 characters and share the same 5-char prefix.
+
+Checking that pairwise against every syllabus word is O(q·s) string work
+per question.  Every rule above needs the matched syllabus word AND the
+question word to be at least 5 characters long, so the index only keeps
+syllabus words of length >= 5 and answers each rule with hash lookups:
+
+    (c) prefix map       : 5-char prefix → words
+    (b) word set         : every substring of q with length >= 5 is looked up
+    (a) 5-gram postings  : candidates = intersection of the postings of q's
+                           5-grams, then verified with ``q in s``
+
+Answers are identical to the pairwise scan.
+
+Usage:
+    index = MorphologyIndex(syllabus_words)
+    "cipher" in index            # exact match
+    index.matches("ciphers")     # any morphological match
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set
+
+_K = 5   # prefix length == minimum substring length == n-gram size
+
+
+class MorphologyIndex:
+    """Hash-based replacement for scanning ``_is_morphological_match`` over a word list."""
+
+    def __init__(self, words: Iterable[str]):
+        self.words: Set[str] = set(words)
+
+        self._long:     Set[str]            = set()   # words with len >= 5
+        self._lengths:  Set[int]            = set()   # distinct lengths of those words
+        self._prefix:   Dict[str, str]      = {}      # 5-char prefix → one word with it
+        self._postings: Dict[str, Set[int]] = {}      # 5-gram → ids into self._by_id
+        self._by_id:    List[str]           = []
+
+        for w in self.words:
+            if len(w) < _K:
+                continue
+            self._long.add(w)
+            self._lengths.add(len(w))
+            self._prefix.setdefault(w[:_K], w)
+            wid = len(self._by_id)
+            self._by_id.append(w)
+            for i in range(len(w) - _K + 1):
+                self._postings.setdefault(w[i:i + _K], set()).add(wid)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def find(self, q: str) -> Optional[str]:
+        """Return a syllabus word that morphologically matches q, or None."""
+        n = len(q)
+        if n < _K:
+            return None
+
+        # (c) shared 5-character prefix
+        hit = self._prefix.get(q[:_K])
+        if hit is not None:
+            return hit
+
+        # (b) a syllabus word (len >= 5) occurs inside q
+        for length in self._lengths:
+            if length > n:
+                continue
+            for i in range(n - length + 1):
+                sub = q[i:i + length]
+                if sub in self._long:
+                    return sub
+
+        # (a) q occurs inside a longer syllabus word
+        candidates: Optional[Set[int]] = None
+        for i in range(n - _K + 1):
+            posting = self._postings.get(q[i:i + _K])
+            if not posting:
+                return None
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return None
+        for wid in candidates or ():
+            if q in self._by_id[wid]:
+                return self._by_id[wid]
+        return None
+
+    def matches(self, q: str) -> bool:
+        """Equivalent to ``any(_is_morphological_match(q, s) for s in words)``."""
+        return self.find(q) is not None
@@ -0,0 +1,127 @@
+"""
+services/nlp_registry.py
+-------------------------
+Process-wide registry of spaCy pipelines.
+
+The scope validator used to call ``spacy.load("en_core_web_sm")`` on every
+extraction (every ingest, every syllabus in the startup backfill) and the
+concept expander kept a second full copy.  Both only read POS tags and
+noun chunks, so the registry loads each model ONCE per process with NER and
+the lemmatizer disabled, and exposes a batched ``pipe`` for ingest-time work.
+
+Usage:
+    from services import nlp_registry
+    nlp  = nlp_registry.get_nlp()                 # shared, trimmed pipeline
+    docs = nlp_registry.pipe(chunk_texts)         # batched nlp.pipe (n_process from config)
+    pieces = nlp_registry.split_text(long_text)   # whitespace-aligned pieces for streaming
+    nlp_registry.stats()                          # load time, loads avoided, docs/sec
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from config import SPACY_MODEL, SPACY_DISABLE, SPACY_BATCH_SIZE, SPACY_N_PROCESS, SPACY_MAX_PIECE_CHARS
+
+_pipelines: Dict[Tuple[str, Tuple[str, ...]], object] = {}
+_lock = threading.Lock()
+
+# Counters
+_load_seconds = 0.0
+_loads        = 0
+_reuses       = 0
+_docs         = 0
+_chars        = 0
+_pipe_seconds = 0.0
+
+
+def get_nlp(model: str = SPACY_MODEL, disable: Tuple[str, ...] = SPACY_DISABLE):
+    """Return the shared pipeline for (model, disabled components), loading it on first use."""
+    global _load_seconds, _loads, _reuses
+    key = (model, tuple(disable))
+    nlp = _pipelines.get(key)
+    if nlp is not None:
+        _reuses += 1
+        return nlp
+
+    with _lock:
+        nlp = _pipelines.get(key)
+        if nlp is None:
+            import spacy
+
+            t0 = time.perf_counter()
+            nlp = spacy.load(model, disable=list(disable))
+            elapsed = time.perf_counter() - t0
+            _load_seconds += elapsed
+            _loads += 1
+            _pipelines[key] = nlp
+            print(f"[NLP] Loaded {model} (pipes: {', '.join(nlp.pipe_names)}) in {elapsed:.2f}s")
+        else:
+            _reuses += 1
+    return nlp
+
+
+def split_text(text: str, max_chars: int = SPACY_MAX_PIECE_CHARS) -> List[str]:
+    """
+    Split text into pieces of at most max_chars, cutting at the last
+    newline (or other whitespace) before the limit so words stay whole.
+    """
+    pieces: List[str] = []
+    start, n = 0, len(text)
+    while n - start > max_chars:
+        end = start + max_chars
+        cut = text.rfind("\n", start, end)
+        if cut <= start:
+            cut = max(text.rfind(" ", start, end), text.rfind("\t", start, end))
+        if cut <= start:
+            cut = end                       # no whitespace at all — hard cut
+        pieces.append(text[start:cut])
+        start = cut
+    if start < n:
+        pieces.append(text[start:])
+    return [p for p in pieces if p.strip()]
+
+
+def pipe(
+    texts: List[str],
+    batch_size: int = SPACY_BATCH_SIZE,
+    n_process: int = SPACY_N_PROCESS,
+    model: str = SPACY_MODEL,
+) -> Iterator:
+    """
+    Batched ``nlp.pipe`` over texts, yielding Docs in input order.
+
+    Worker processes are only forked when there is more than one batch of
+    work; for a handful of texts the fork costs more than it saves.
+    Throughput counters time spaCy only, not the caller's loop body.
+    """
+    global _docs, _chars, _pipe_seconds
+    texts = list(texts)
+    if not texts:
+        return
+    nlp = get_nlp(model)
+    procs = n_process if len(texts) > batch_size else 1
+
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=procs)
+    for text in texts:
+        t0 = time.perf_counter()
+        doc = next(docs)
+        _pipe_seconds += time.perf_counter() - t0
+        _docs  += 1
+        _chars += len(text)
+        yield doc
+
+
+def stats() -> dict:
+    """Load time, loads avoided by sharing, and pipe throughput."""
+    return {
+        "models_loaded":     [{"model": m, "disabled": list(d)} for m, d in _pipelines],
+        "load_seconds":      round(_load_seconds, 3),
+        "loads":             _loads,
+        "loads_avoided":     _reuses,
+        "docs":              _docs,
+        "chars":             _chars,
+        "docs_per_sec":      round(_docs / _pipe_seconds, 2) if _pipe_seconds else 0.0,
+    }
@@ -0,0 +1,96 @@
+"""
+services/priority_gate.py
+--------------------------
+One-at-a-time access to a shared model, with interactive callers first.
+
+The LLM is a single llama.cpp instance that cannot serve two prompts at
+once.  Once background analysis jobs run next to the HTTP threads, a plain
+lock would let a 500-question audit hold the model for minutes while a
+user's single question waits behind it.  The gate keeps one holder at a
+time, but a background caller only takes a free slot when no interactive
+caller is waiting, so interactive requests wait for at most the prompt
+currently running.
+
+Threads mark themselves as background with ``gate.background()``; every
+other thread is interactive.
+
+Usage:
+    gate = PriorityGate()
+    with gate.slot():             # interactive (HTTP request thread)
+        llm(prompt)
+
+    with gate.background():       # job worker thread
+        with gate.slot():
+            llm(prompt)
+
+    gate.stats()                  # waits and wait time per priority
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PriorityGate:
+    """Single-holder gate where interactive callers overtake background ones."""
+
+    def __init__(self):
+        self._cond    = threading.Condition()
+        self._busy    = False
+        self._waiting = 0                 # interactive callers queued for the slot
+        self._local   = threading.local()
+        self._counts  = {"interactive": 0, "background": 0}
+        self._waited  = {"interactive": 0.0, "background": 0.0}
+
+    @contextmanager
+    def background(self):
+        """Mark the current thread as a background caller for the duration."""
+        previous = getattr(self._local, "background", False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    def is_background(self) -> bool:
+        return getattr(self._local, "background", False)
+
+    @contextmanager
+    def slot(self):
+        """Hold the shared resource; blocks until it is this caller's turn."""
+        kind = "background" if self.is_background() else "interactive"
+        t0 = time.perf_counter()
+        with self._cond:
+            if kind == "interactive":
+                self._waiting += 1
+            try:
+                while self._busy or (kind == "background" and self._waiting):
+                    self._cond.wait()
+            finally:
+                if kind == "interactive":
+                    self._waiting -= 1
+            self._busy = True
+            self._counts[kind] += 1
+            self._waited[kind] += time.perf_counter() - t0
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "busy":                self._busy,
+                "interactive_waiting": self._waiting,
+                **{
+                    kind: {
+                        "acquired":    n,
+                        "avg_wait_ms": round(self._waited[kind] / n * 1000, 2) if n else 0.0,
+                    }
+                    for kind, n in self._counts.items()
+                },
+            }
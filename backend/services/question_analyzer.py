@@ -46,6 +46,7 @@ def analyze_question(
     co_mapper=None,        # optional CoMapper instance
     syllabus_id: str = None,
     syllabus_meta: dict = None,
+    ctx=None,              # optional QuestionContext (shared question embeddings)
 ):
     """
     Orchestrates:
@@ -95,16 +96,21 @@ def analyze_question(
     # --------------------------------------------------------
     # Feature 3: CO mapping (only if CoMapper provided)
     # --------------------------------------------------------
+    # One in-memory ranking gives the display CO, full CO id, similarity and
+    # ranked alternatives together.
     mapped_co  = None
     mapped_pco = None
+    co_match   = None
     if co_mapper is not None:
         try:
-            mapped_co = co_mapper.map_question_to_co(question, syllabus_id)
+            co_match = co_mapper.map_question(question, syllabus_id, ctx=ctx)
+            mapped_co = co_match["display_co"] if co_match else None
             if mapped_co and syllabus_id:
                 mapped_pco = co_mapper.get_pco_for_co(syllabus_id, mapped_co)
         except Exception:
             mapped_co  = None
             mapped_pco = None
+            co_match   = None
 
     # --------------------------------------------------------
     # Retrieval Confidence Gate — strict thresholds
@@ -144,6 +150,9 @@ def analyze_question(
             "bloom_level":       bloom_result["bloom_level"],
             "difficulty":        bloom_result["difficulty"],
             "mapped_co":         mapped_co,
+            "mapped_co_full":    co_match["full_co_id"] if co_match else None,
+            "co_similarity":     co_match["similarity"] if co_match else None,
+            "co_alternatives":   co_match["alternatives"] if co_match else [],
             "mapped_pco":        mapped_pco,
             # NEW Grounding keys
             "curriculum_relevance": False,
@@ -207,6 +216,9 @@ def analyze_question(
         "bloom_level":       bloom_result["bloom_level"],
         "difficulty":        bloom_result["difficulty"],
         "mapped_co":         mapped_co,
+        "mapped_co_full":    co_match["full_co_id"] if co_match else None,
+        "co_similarity":     co_match["similarity"] if co_match else None,
+        "co_alternatives":   co_match["alternatives"] if co_match else [],
         "mapped_pco":        mapped_pco,
         # NEW Grounding keys
         "curriculum_relevance":  llm_res.get("curriculum_relevance", True),
@@ -0,0 +1,273 @@
+"""
+services/question_bank.py
+--------------------------
+Per-syllabus bank of analyzed questions for reusing paraphrase analyses.
+
+Papers from different years repeat the same questions with small wording
+changes ("Explain RSA" / "Describe the RSA algorithm").  The exact result
+cache (services/result_cache.py) misses those, so each one paid for
+retrieval, the scope validator and an LLM call again.  The bank stores every
+freshly analyzed question with its query embedding and Bloom level.  A new
+question reuses a stored analysis when:
+
+    - its nearest stored neighbour (same syllabus, same threshold, same
+      settings namespace) has cosine >= min_cosine, and
+    - both questions have the same Bloom verb class — "Explain RSA" must
+      not answer "Implement RSA".
+
+Rows persist in SQLite.  Each (syllabus, threshold) bank is served from an
+in-memory L2-normalised float32 matrix, so a lookup for a whole block of
+questions is one matmul.  Banks hold hundreds to a few thousand questions,
+so an exact scan is both faster and simpler than an ANN graph and never
+misses a neighbour.
+
+Rows carry the syllabus's index generation (the same counter the result
+cache uses).  A re-ingest bumps it, so a bank built against the old index
+is never consulted again, even by another worker process.  Questions added
+by other workers are picked up through ``PRAGMA data_version``, as in
+CoPoStore: the loaded banks are dropped and re-read on the next lookup.
+
+Usage:
+    bank = QuestionBank(path, min_cosine=0.93, namespace=...)
+    hits = bank.lookup_many(vectors, bloom_levels, syllabus_id, threshold, generation)
+    # hits[i] -> {"result": {...}, "question": "Explain RSA", "cosine": 0.95} or None
+    bank.add(question, vector, bloom_level, result, syllabus_id, threshold, generation)
+    bank.invalidate(syllabus_id)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.result_cache import ALL_SYLLABI, normalize_question
+
+
+class _Bank:
+    """In-memory rows of one (syllabus, threshold, generation) bank."""
+
+    __slots__ = ("questions", "normalized", "blooms", "results", "vectors", "_matrix")
+
+    def __init__(self):
+        self.questions:  List[str] = []
+        self.normalized: set = set()
+        self.blooms:     List[str] = []
+        self.results:    List[str] = []
+        self.vectors:    List[np.ndarray] = []
+        self._matrix:    Optional[np.ndarray] = None
+
+    def append(self, question: str, vector: np.ndarray, bloom: str, result: str) -> None:
+        self.questions.append(question)
+        self.normalized.add(normalize_question(question))
+        self.blooms.append(bloom)
+        self.results.append(result)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors) if self.vectors else np.empty((0, 0), dtype=np.float32)
+        return self._matrix
+
+
+class QuestionBank:
+    """Near-duplicate question lookup over previously analyzed questions."""
+
+    def __init__(self, path: Optional[str] = None, min_cosine: float = 0.93, namespace: str = ""):
+        self.path       = path
+        self.min_cosine = float(min_cosine)
+        self.namespace  = namespace
+
+        self._banks: Dict[Tuple[str, float, int], _Bank] = {}
+        self._lock  = threading.Lock()
+
+        # Counters
+        self.lookups      = 0
+        self.hits         = 0
+        self.bloom_blocks = 0      # neighbour close enough, but a different Bloom class
+        self.added        = 0
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS question_bank ("
+                "  id          INTEGER PRIMARY KEY AUTOINCREMENT,"
+                "  syllabus_id TEXT NOT NULL,"
+                "  namespace   TEXT NOT NULL,"
+                "  threshold   REAL NOT NULL,"
+                "  generation  INTEGER NOT NULL,"
+                "  question    TEXT NOT NULL,"
+                "  bloom_level TEXT NOT NULL,"
+                "  embedding   BLOB NOT NULL,"
+                "  result      TEXT NOT NULL,"
+                "  created_at  REAL NOT NULL"
+                ");"
+                "CREATE INDEX IF NOT EXISTS idx_bank_syllabus"
+                "  ON question_bank(syllabus_id, namespace, threshold, generation);"
+            )
+            self._conn.commit()
+            self._data_version = self._version()
+
+    # ------------------------------------------------------------------
+    # Banks
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(syllabus_id: Optional[str], threshold: float, generation: int) -> Tuple[str, float, int]:
+        return (syllabus_id or ALL_SYLLABI, round(float(threshold), 4), int(generation))
+
+    def _version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self) -> None:
+        """Drop the loaded banks if another connection has committed since the last look."""
+        version = self._version()
+        if version != self._data_version:
+            self._data_version = version
+            self._banks.clear()
+
+    def _bank(self, key: Tuple[str, float, int]) -> _Bank:
+        if self._conn is not None:
+            self._sync()
+        bank = self._banks.get(key)
+        if bank is not None:
+            return bank
+        bank = _Bank()
+        if self._conn is not None:
+            rows = self._conn.execute(
+                "SELECT question, embedding, bloom_level, result FROM question_bank"
+                " WHERE syllabus_id = ? AND namespace = ? AND threshold = ? AND generation = ? ORDER BY id",
+                (key[0], self.namespace, key[1], key[2]),
+            ).fetchall()
+            for question, blob, bloom, result in rows:
+                bank.append(question, np.frombuffer(blob, dtype=np.float32), bloom, result)
+        # Drop banks of older generations of this syllabus
+        for stale in [k for k in self._banks if k[0] == key[0] and k[2] != key[2]]:
+            del self._banks[stale]
+        self._banks[key] = bank
+        return bank
+
+    # ------------------------------------------------------------------
+    # Lookup / insert
+    # ------------------------------------------------------------------
+
+    def lookup_many(
+        self,
+        vectors: np.ndarray,
+        bloom_levels: Sequence[str],
+        syllabus_id: Optional[str],
+        threshold: float,
+        generation: int = 0,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Best reusable analysis for each query vector (rows L2-normalised), or
+        None.  Only the nearest neighbour with a matching Bloom level counts.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        out: List[Optional[Dict[str, Any]]] = [None] * len(vectors)
+        with self._lock:
+            self.lookups += len(vectors)
+            bank = self._bank(self._key(syllabus_id, threshold, generation))
+            if not bank.questions or not len(vectors):
+                return out
+            sims = vectors @ bank.matrix().T                       # (n_queries, n_bank)
+            blooms = np.asarray(bank.blooms)
+            for i, bloom in enumerate(bloom_levels):
+                row = np.where(blooms == bloom, sims[i], -1.0)
+                j = int(np.argmax(row))
+                if row[j] >= self.min_cosine:
+                    out[i] = {
+                        "result":   json.loads(bank.results[j]),
+                        "question": bank.questions[j],
+                        "cosine":   round(float(row[j]), 4),
+                    }
+                    self.hits += 1
+                elif float(sims[i].max()) >= self.min_cosine:
+                    self.bloom_blocks += 1
+        return out
+
+    def add(
+        self,
+        question: str,
+        vector: np.ndarray,
+        bloom_level: str,
+        result: Dict[str, Any],
+        syllabus_id: Optional[str],
+        threshold: float,
+        generation: int = 0,
+    ) -> bool:
+        """Store a fresh analysis.  Returns False for questions already in the bank."""
+        key = self._key(syllabus_id, threshold, generation)
+        vec = np.ascontiguousarray(vector, dtype=np.float32).ravel()
+        try:
+            blob = json.dumps(result)
+        except (TypeError, ValueError):
+            return False
+        with self._lock:
+            bank = self._bank(key)
+            if normalize_question(question) in bank.normalized:
+                return False
+            bank.append(question, vec, bloom_level, blob)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO question_bank (syllabus_id, namespace, threshold, generation, question,"
+                    " bloom_level, embedding, result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key[0], self.namespace, key[1], key[2], question, bloom_level, vec.tobytes(), blob, time.time()),
+                )
+                self._conn.commit()
+            self.added += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, syllabus_id: Optional[str]) -> int:
+        """Forget one syllabus's questions (and the all-syllabi bank).  Returns rows removed."""
+        targets = {syllabus_id or ALL_SYLLABI, ALL_SYLLABI}
+        removed = 0
+        with self._lock:
+            for key in [k for k in self._banks if k[0] in targets]:
+                removed += len(self._banks.pop(key).questions)
+            if self._conn is not None:
+                marks = ",".join("?" * len(targets))
+                removed = self._conn.execute(
+                    f"DELETE FROM question_bank WHERE syllabus_id IN ({marks})", tuple(targets)
+                ).rowcount
+                self._conn.commit()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._banks.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM question_bank")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = (
+                self._conn.execute("SELECT COUNT(*) FROM question_bank").fetchone()[0]
+                if self._conn is not None else sum(len(b.questions) for b in self._banks.values())
+            )
+            loaded = sum(len(b.questions) for b in self._banks.values())
+        return {
+            "min_cosine":   self.min_cosine,
+            "lookups":      self.lookups,
+            "hits":         self.hits,
+            "hit_ratio":    round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "bloom_blocks": self.bloom_blocks,
+            "added":        self.added,
+            "stored":       int(stored),
+            "loaded":       loaded,
+        }
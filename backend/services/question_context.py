@@ -0,0 +1,182 @@
+"""
+services/question_context.py
+-----------------------------
+Per-request question context shared across all analysis stages.
+
+One question flows through vector retrieval, the concept boost, the
+curriculum scope validator and CO mapping.  Each of those stages used to
+call the embedder on its own, so a single question was encoded four or
+five times (and the scope validator encoded its words one call per
+question).  QuestionContext tokenizes the question once and embeds every
+question-side text in a single encode call; the stages read their vectors
+from it instead of calling ``embed_fn``.
+
+Usage:
+    ctx = QuestionContext(question, embed_fn=embedder.embed).prefetch()
+    vector_db.query(question, k=8, syllabus_id=sid, ctx=ctx)
+    concept_store.compute_concept_boost(question, sid, ctx=ctx)
+    ...
+    ctx.encode_calls   # -> 1
+
+    # A whole question paper: one nlp.pipe and ONE encode call for all questions
+    contexts = QuestionContext.prefetch_many(questions, embed_fn=embedder.embed)
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class QuestionContext:
+    """
+    Memoises the tokenization and query/passage embeddings of one question.
+
+    Vectors are keyed by (task, text), so any stage asking for a text that
+    was already encoded (the question itself, a content word, a concept
+    phrase) gets the stored vector without touching the model.
+    """
+
+    def __init__(self, question: str, embed_fn):
+        self.question = question
+        self.embed_fn = embed_fn
+
+        # Diagnostics
+        self.encode_calls  = 0   # number of embed_fn invocations
+        self.encoded_texts = 0   # number of texts sent to the model
+
+        self._vectors: Dict[Tuple[str, str], np.ndarray] = {}
+        self._content_words: Optional[List[str]] = None
+        self._concepts:      Optional[List[str]] = None
+
+    # ------------------------------------------------------------------
+    # Tokenization (computed once, lazily)
+    # ------------------------------------------------------------------
+
+    @property
+    def content_words(self) -> List[str]:
+        """Non-generic question words used by the curriculum scope validator."""
+        if self._content_words is None:
+            from services.curriculum_scope_validator import extract_question_words
+            self._content_words = extract_question_words(self.question)
+        return self._content_words
+
+    @property
+    def concepts(self) -> List[str]:
+        """Concept phrases (noun chunks, capitalised terms, acronyms) for the concept boost."""
+        if self._concepts is None:
+            from services.concept_expander import extract_concepts
+            self._concepts = extract_concepts(self.question)
+        return self._concepts
+
+    # ------------------------------------------------------------------
+    # Embeddings
+    # ------------------------------------------------------------------
+
+    def embed(self, texts: List[str], task: str = "query") -> np.ndarray:
+        """
+        Drop-in replacement for ``embed_fn(texts, task=...)``.
+
+        Only texts not seen before are encoded, all in one call.
+        Returns a (len(texts), dim) float32 matrix, rows in input order.
+        Stored rows are zero-copy views into the encoded batch.
+        """
+        if not texts:
+            # The model knows its width: Embedder.embed([]) is (0, dim)
+            return np.asarray(self.embed_fn([], task=task), dtype=np.float32)
+
+        missing: List[str] = []
+        for t in texts:
+            key = (task, t)
+            if key not in self._vectors and t not in missing:
+                missing.append(t)
+
+        if missing:
+            vectors = np.asarray(self.embed_fn(missing, task=task), dtype=np.float32)
+            self.encode_calls  += 1
+            self.encoded_texts += len(missing)
+            for t, v in zip(missing, vectors):
+                self._vectors[(task, t)] = v
+
+        return np.stack([self._vectors[(task, t)] for t in texts])
+
+    @property
+    def query_embedding(self):
+        """Query-side embedding of the full question text."""
+        return self.embed([self.question], task="query")[0]
+
+    def prefetch(self, concepts: bool = True, content_words: bool = True) -> "QuestionContext":
+        """
+        Encode the question and every question-derived text the pipeline
+        will need in ONE encode call.  Later lookups are served from memory.
+        """
+        texts = [self.question]
+        if concepts:
+            try:
+                texts += self.concepts
+            except Exception as e:
+                # spaCy unavailable — the concept boost will degrade on its own
+                print(f"[QuestionContext] Concept extraction failed: {e}")
+                self._concepts = []
+        if content_words:
+            texts += self.content_words
+        self.embed(texts, task="query")
+        return self
+
+    @classmethod
+    def prefetch_many(
+        cls,
+        questions: List[str],
+        embed_fn,
+        concepts: bool = True,
+        content_words: bool = True,
+    ) -> List["QuestionContext"]:
+        """
+        Batch counterpart of prefetch() for a multi-question paper.
+
+        Concept phrases for every question come from one ``nlp.pipe`` and the
+        texts of ALL questions are encoded in a single call; each context then
+        holds its own rows, so downstream stages behave exactly as if each
+        question had been prefetched on its own.
+        """
+        contexts = [cls(q, embed_fn=embed_fn) for q in questions]
+        if not contexts:
+            return contexts
+
+        if concepts:
+            try:
+                from services.concept_expander import extract_concepts_many
+                for ctx, found in zip(contexts, extract_concepts_many(questions)):
+                    ctx._concepts = found
+            except Exception as e:
+                # spaCy unavailable — the concept boost will degrade on its own
+                print(f"[QuestionContext] Concept extraction failed: {e}")
+                for ctx in contexts:
+                    ctx._concepts = []
+
+        per_ctx: List[List[str]] = []
+        unique: Dict[str, int] = {}
+        for ctx in contexts:
+            texts = [ctx.question]
+            if concepts:
+                texts += ctx.concepts
+            if content_words:
+                texts += ctx.content_words
+            per_ctx.append(texts)
+            for t in texts:
+                unique.setdefault(t, len(unique))
+
+        vectors = np.asarray(embed_fn(list(unique), task="query"), dtype=np.float32)
+        for ctx, texts in zip(contexts, per_ctx):
+            for t in texts:
+                ctx._vectors[("query", t)] = vectors[unique[t]]
+            ctx.encode_calls  = 1                         # the shared paper-wide call
+            ctx.encoded_texts = len(set(texts))
+        return contexts
+
+    def diagnostics(self) -> Dict[str, int]:
+        return {
+            "encode_calls":  self.encode_calls,
+            "encoded_texts": self.encoded_texts,
+        }
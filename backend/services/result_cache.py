@@ -0,0 +1,299 @@
+"""
+services/result_cache.py
+-------------------------
+Cache of finished /analyze_question results.
+
+Faculty re-submit the same papers, and run_evaluation.py replays the same
+dataset on every tuning run; each time every question went through
+retrieval, the scope validator and the LLM again.  Results are cached
+under
+
+    (normalized question, syllabus_id, threshold, index generation, namespace)
+
+Each syllabus has an index *generation* number.  Re-ingesting or
+deleting a syllabus bumps its generation and drops its stored rows, so
+exactly that syllabus's entries go away and every other syllabus keeps its
+own.  Analyses run without a syllabus_id search every syllabus, so they
+live under the "*" generation, which is bumped by any syllabus change.
+``namespace`` fingerprints the settings that shape a result (models and
+validator thresholds), so changing them never serves stale answers.
+
+Two tiers, as in models/embedding_cache.py:
+  1. In-memory LRU   (OrderedDict, bounded by item count)
+  2. On-disk SQLite  (optional; bounded by total bytes, LRU eviction),
+     which also holds the generation numbers so they survive restarts
+
+Usage:
+    cache  = ResultCache(path, memory_items=2000, namespace="e5|mistral|0.72")
+    gen    = cache.generation(syllabus_id)                    # once, before analysing
+    cached = cache.get(question, syllabus_id, threshold, gen)  # dict or None
+    cache.put(question, syllabus_id, threshold, result, gen)  # skipped if gen went stale
+    cache.invalidate(syllabus_id)                             # re-ingest / delete
+    cache.stats()                                             # hit ratios per tier
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+ALL_SYLLABI  = "*"
+_EVICT_BATCH = 256      # rows fetched per eviction round
+
+_WS_RE    = re.compile(r"\s+")
+_TRAIL_RE = re.compile(r"[\s?.!:;]+$")
+
+
+def normalize_question(text: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive question form."""
+    return _TRAIL_RE.sub("", _WS_RE.sub(" ", text or "").strip().lower())
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional SQLite) cache of analysis results."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_items: int = 2000,
+        max_bytes: int = 128 * 1024 * 1024,
+        namespace: str = "",
+    ):
+        self.path         = path
+        self.memory_items = int(memory_items)
+        self.max_bytes    = int(max_bytes)
+        self.namespace    = namespace
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()   # key → (syllabus, result)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.memory_hits   = 0
+        self.disk_hits     = 0
+        self.misses        = 0
+        self.invalidations = 0
+        self.evictions     = 0
+
+        self._conn  = None
+        self._bytes = 0     # running size of the disk tier
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "  key         TEXT PRIMARY KEY,"
+                "  syllabus_id TEXT NOT NULL,"
+                "  result      TEXT NOT NULL,"
+                "  nbytes      INTEGER NOT NULL,"
+                "  last_access REAL NOT NULL"
+                ");"
+                "CREATE INDEX IF NOT EXISTS idx_results_syllabus ON results(syllabus_id);"
+                "CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access);"
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "  syllabus_id TEXT PRIMARY KEY,"
+                "  generation  INTEGER NOT NULL"
+                ");"
+            )
+            self._conn.commit()
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Keys / generations
+    # ------------------------------------------------------------------
+
+    def generation(self, syllabus_id: Optional[str]) -> int:
+        """Current index generation of a syllabus (0 until it is first invalidated)."""
+        sid = syllabus_id or ALL_SYLLABI
+        with self._lock:
+            return self._generation(sid)
+
+    def _generation(self, sid: str) -> int:
+        if self._conn is None:
+            return self._generations.get(sid, 0)
+        # Read through to SQLite so invalidations by other workers are seen
+        row = self._conn.execute("SELECT generation FROM generations WHERE syllabus_id = ?", (sid,)).fetchone()
+        return row[0] if row else 0
+
+    def _key(self, question: str, sid: str, threshold: float, generation: int) -> str:
+        h = hashlib.sha1()
+        for part in (self.namespace, sid, str(generation), f"{float(threshold):.4f}",
+                     normalize_question(question)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x1f")
+        return h.hexdigest()
+
+    # ------------------------------------------------------------------
+    # Lookup / insert
+    # ------------------------------------------------------------------
+
+    def get(
+        self, question: str, syllabus_id: Optional[str], threshold: float, generation: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Cached result (a fresh copy) or None.  generation defaults to the current one."""
+        sid = syllabus_id or ALL_SYLLABI
+        with self._lock:
+            key   = self._key(question, sid, threshold, self._generation(sid) if generation is None else generation)
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(entry[1])
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self._remember(key, sid, row[0])
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(
+        self, question: str, syllabus_id: Optional[str], threshold: float, result: Dict[str, Any],
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store a result.  generation: the one read before the analysis started —
+        if the syllabus was invalidated since, the result is stale and dropped.
+        """
+        sid = syllabus_id or ALL_SYLLABI
+        try:
+            blob = json.dumps(result)
+        except (TypeError, ValueError):
+            return      # not JSON-serializable — never cached
+        with self._lock:
+            current = self._generation(sid)
+            if generation is not None and generation != current:
+                return
+            key = self._key(question, sid, threshold, current)
+            self._remember(key, sid, blob)
+            if self._conn is not None:
+                old = self._conn.execute("SELECT nbytes FROM results WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, syllabus_id, result, nbytes, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, sid, blob, len(blob), time.time()),
+                )
+                self._conn.commit()
+                self._bytes += len(blob) - (old[0] if old else 0)
+                self._evict_if_needed()
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, syllabus_id: str) -> int:
+        """
+        Drop every entry of one syllabus (and the all-syllabi entries, which
+        searched it too) by bumping their generations.  Returns rows removed.
+        """
+        targets = {syllabus_id or ALL_SYLLABI, ALL_SYLLABI}
+        removed = 0
+        with self._lock:
+            for sid in targets:
+                gen = self._generation(sid) + 1
+                self._generations[sid] = gen
+                if self._conn is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO generations (syllabus_id, generation) VALUES (?, ?)", (sid, gen)
+                    )
+                    self._bytes -= self._conn.execute(
+                        "SELECT COALESCE(SUM(nbytes), 0) FROM results WHERE syllabus_id = ?", (sid,)
+                    ).fetchone()[0]
+                    removed += self._conn.execute("DELETE FROM results WHERE syllabus_id = ?", (sid,)).rowcount
+            if self._conn is not None:
+                self._conn.commit()
+            stale = [k for k, (sid, _) in self._memory.items() if sid in targets]
+            for k in stale:
+                del self._memory[k]
+            self.invalidations += 1
+        return removed if self._conn is not None else len(stale)
+
+    def clear(self) -> None:
+        """Drop everything (purge / vector DB reset).  Generations keep counting up."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                for (sid,) in self._conn.execute("SELECT DISTINCT syllabus_id FROM results").fetchall():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO generations (syllabus_id, generation) VALUES (?, ?)",
+                        (sid, self._generation(sid) + 1),
+                    )
+                self._conn.execute("DELETE FROM results")
+                self._conn.commit()
+                self._bytes = 0
+            else:
+                self._generations = {sid: gen + 1 for sid, gen in self._generations.items()}
+            self.invalidations += 1
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, sid: str, blob: str) -> None:
+        self._memory[key] = (sid, blob)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_if_needed(self) -> None:
+        """Drop least-recently-used rows until the disk tier is under 90% of its limit."""
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, nbytes FROM results ORDER BY last_access ASC LIMIT ?", (_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            doomed = []
+            for key, nbytes in rows:
+                if self._bytes <= target:
+                    break
+                doomed.append((key,))
+                self._bytes -= nbytes
+            self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+            self._conn.commit()
+            self.evictions += len(doomed)
+
+    # ------------------------------------------------------------------
+    # Diagnostics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk_entries = (
+                self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] if self._conn is not None else 0
+            )
+            memory_entries = len(self._memory)
+        hits    = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits":       self.memory_hits,
+            "disk_hits":         self.disk_hits,
+            "misses":            self.misses,
+            "hit_ratio":         round(hits / lookups, 4) if lookups else 0.0,
+            "memory_hit_ratio":  round(self.memory_hits / lookups, 4) if lookups else 0.0,
+            "disk_hit_ratio":    round(self.disk_hits / lookups, 4) if lookups else 0.0,
+            "invalidations":     self.invalidations,
+            "evictions":         self.evictions,
+            "memory_entries":    memory_entries,
+            "disk_entries":      int(disk_entries),
+            "disk_bytes":        int(self._bytes),
+            "disk_enabled":      self._conn is not None,
+        }
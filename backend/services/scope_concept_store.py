@@ -0,0 +1,132 @@
+"""
+services/scope_concept_store.py
+--------------------------------
+Transactional SQLite storage for the curriculum scope validator's concepts.
+
+Replaces the single ``data/scope_concepts.json`` file, which was read and
+rewritten in full for every syllabus stored or deleted (quadratic during
+bulk ingestion, and last-writer-wins when two workers wrote at once).
+
+One row per syllabus, so upsert and delete touch only that row.  The
+database runs in WAL mode: any number of readers (threads or worker
+processes) proceed while a single writer commits, and ``upsert_many``
+writes a whole batch in one transaction.
+
+The legacy JSON file is imported once, the first time a store is opened
+next to it, and then renamed to ``scope_concepts.json.migrated``.
+
+Usage:
+    store = ScopeConceptStore("data/scope_concepts.sqlite3")
+    store.migrate_json("data/scope_concepts.json")   # no-op when already migrated
+    store.upsert("IT-VIII-PEC-IT801B", ["rsa algorithm", "block cipher"])
+    store.get("IT-VIII-PEC-IT801B")                  # -> ["rsa algorithm", "block cipher"]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class ScopeConceptStore:
+    """Row-per-syllabus concept lists in SQLite (WAL)."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scope_concepts ("
+            "  syllabus_id TEXT PRIMARY KEY,"
+            "  concepts    TEXT NOT NULL,"
+            "  updated_at  REAL NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, syllabus_id: str) -> Optional[List[str]]:
+        """Concept list for a syllabus, or None when nothing is stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT concepts FROM scope_concepts WHERE syllabus_id = ?", (syllabus_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_all(self) -> Dict[str, List[str]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT syllabus_id, concepts FROM scope_concepts").fetchall()
+        return {sid: json.loads(c) for sid, c in rows}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scope_concepts").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def upsert(self, syllabus_id: str, concepts: List[str]) -> None:
+        self.upsert_many({syllabus_id: concepts})
+
+    def upsert_many(self, items: Dict[str, List[str]], overwrite: bool = True) -> int:
+        """Write several syllabi in ONE transaction.  Returns the number of rows written."""
+        if not items:
+            return 0
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        now  = time.time()
+        rows = [(sid, json.dumps(list(c)), now) for sid, c in items.items()]
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                f"{verb} INTO scope_concepts(syllabus_id, concepts, updated_at) VALUES (?, ?, ?)", rows
+            )
+        return cur.rowcount
+
+    def delete(self, syllabus_id: str) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM scope_concepts WHERE syllabus_id = ?", (syllabus_id,))
+        return cur.rowcount > 0
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM scope_concepts")
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        One-shot import of the legacy ``{syllabus_id: [concepts]}`` JSON file.
+
+        Rows already in the database win (INSERT OR IGNORE), so a migration
+        racing a fresh ingest never overwrites newer data.  The JSON file is
+        renamed to ``<name>.migrated`` afterwards.  Returns rows imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[ScopeConceptStore] Skipping unreadable legacy file {json_path}: {e}")
+            return 0
+
+        imported = self.upsert_many(legacy, overwrite=False) if isinstance(legacy, dict) else 0
+        try:
+            os.replace(json_path, json_path + ".migrated")
+        except FileNotFoundError:
+            pass   # another worker migrated it first
+        print(f"[ScopeConceptStore] Migrated {imported} syllabi from {os.path.basename(json_path)}")
+        return imported
@@ -0,0 +1,87 @@
+"""
+services/syllabus_concepts.py
+------------------------------
+Single NLP pass over a syllabus at ingestion time.
+
+The ingest routes used to parse the same joined chunk text twice: once in
+ConceptStore.add_syllabus_concepts (via concept_expander.extract_concepts)
+and once in curriculum_scope_validator.extract_syllabus_concepts, with
+near-identical noun-chunk / capitalised-phrase / acronym logic.  This stage
+parses every chunk ONCE and derives both outputs from the same Docs:
+
+    raw   — every concept phrase, for ConceptStore (retrieval boosting)
+    scope — generic-filtered, specificity-ranked top-N, for the scope validator
+
+Chunks are streamed through ``nlp.pipe`` (long chunks in whitespace-aligned
+pieces) and candidate counts are merged as each Doc arrives, so nothing is
+truncated and only one batch of Docs is alive at a time.  A coverage
+statistic reports how many chunks actually contributed concepts.
+
+Usage:
+    raw, scope, stats = extract_syllabus_concept_sets(chunks, top_n=SCOPE_CONCEPTS_TOP_N)
+    concept_store.add_syllabus_concepts(sid, chunks, concepts=raw)
+    store_scope_concepts(sid, scope, embed_fn=embed_fn)
+    stats["coverage"]     # fraction of chunks that yielded at least one concept
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from services import nlp_registry
+from services.curriculum_scope_validator import _extract_by_frequency, _rank_candidates, _scope_candidates
+
+
+def extract_syllabus_concept_sets(
+    chunks: List[str], top_n: int = 150
+) -> Tuple[List[str], List[str], Dict[str, Any]]:
+    """
+    Stream the syllabus chunks through spaCy once and return
+    (raw ConceptStore phrases, scope concepts, coverage stats).
+
+    If spaCy is unavailable the raw set is empty (ConceptStore is skipped,
+    as before) and the scope list falls back to frequency extraction.
+    """
+    from services.concept_expander import concepts_from_doc
+
+    owners, pieces = [], []
+    for i, chunk in enumerate(chunks):
+        for piece in nlp_registry.split_text(chunk):
+            owners.append(i)
+            pieces.append(piece)
+
+    stats: Dict[str, Any] = {
+        "chunks":               len(chunks),
+        "pieces":               len(pieces),
+        "chars":                sum(len(c) for c in chunks),
+        "chunks_with_concepts": 0,
+        "coverage":             0.0,
+        "ranked_coverage":      0.0,
+    }
+    if not pieces:
+        return [], [], stats
+
+    raw: set = set()
+    counts: Counter = Counter()
+    first_chunk: Dict[str, int] = {}    # candidate → first chunk that produced it
+    contributing = set()
+    try:
+        for owner, doc, piece in zip(owners, nlp_registry.pipe(pieces), pieces):
+            raw.update(concepts_from_doc(doc, piece))
+            candidates = _scope_candidates(doc, piece)
+            if candidates:
+                contributing.add(owner)
+                counts.update(candidates)
+                for c in candidates:
+                    first_chunk.setdefault(c, owner)
+    except Exception as e:
+        print(f"[SyllabusConcepts] spaCy parse failed, using frequency fallback: {e}")
+        return [], _extract_by_frequency(" ".join(chunks), top_n), stats
+
+    scope = _rank_candidates(counts, top_n)
+    n = len(chunks)
+    stats["chunks_with_concepts"] = len(contributing)
+    stats["coverage"]             = round(len(contributing) / n, 4)
+    stats["ranked_coverage"]      = round(len({first_chunk[c] for c in scope}) / n, 4)
+    return list(raw), scope, stats
@@ -8,6 +8,9 @@ Run from D:\\final_v1\\backend\\ with:
 import sys
 import os
 
+import numpy as np
+import pytest
+
 # Allow imports from backend root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -426,3 +429,1855 @@ class TestCurriculumSplitter:
         blocks = split_into_course_blocks(text)
         assert len(blocks) == 2
 
+
+
+# ============================================================
+# FEATURE 8 — question_context.py
+# ============================================================
+from services.question_context import QuestionContext
+
+class TestQuestionContext:
+
+    def _fake_embed(self):
+        calls = []
+        def embed_fn(texts, task="query"):
+            calls.append((task, list(texts)))
+            return [[float(len(t)), 1.0] for t in texts]
+        return embed_fn, calls
+
+    def test_prefetch_single_encode_call(self):
+        embed_fn, calls = self._fake_embed()
+        ctx = QuestionContext("Explain RSA key generation", embed_fn).prefetch(concepts=False)
+        assert ctx.encode_calls == 1
+        # Question + its content words all went into the one call
+        assert "Explain RSA key generation" in calls[0][1]
+        assert "rsa" in calls[0][1]
+
+    def test_repeated_lookups_do_not_re_encode(self):
+        embed_fn, calls = self._fake_embed()
+        ctx = QuestionContext("Explain RSA key generation", embed_fn).prefetch(concepts=False)
+        ctx.embed([ctx.question], task="query")
+        ctx.embed(ctx.content_words, task="query")
+        _ = ctx.query_embedding
+        assert ctx.encode_calls == 1
+        assert len(calls) == 1
+
+    def test_task_is_part_of_key(self):
+        embed_fn, calls = self._fake_embed()
+        ctx = QuestionContext("hashing", embed_fn)
+        ctx.embed(["hashing"], task="query")
+        ctx.embed(["hashing"], task="passage")
+        assert ctx.encode_calls == 2
+
+    def test_vectors_returned_in_input_order(self):
+        embed_fn, _ = self._fake_embed()
+        ctx = QuestionContext("q", embed_fn)
+        vecs = ctx.embed(["abc", "a", "abc"], task="query")
+        assert vecs.shape == (3, 2) and vecs.dtype == np.float32
+        assert vecs[:, 0].tolist() == [3.0, 1.0, 3.0]
+        assert ctx.encoded_texts == 2
+
+    def test_empty_input_keeps_embedding_width(self):
+        def embed_fn(texts, task="query"):
+            return np.ones((len(texts), 2), dtype=np.float32)
+        ctx = QuestionContext("q", embed_fn)
+        assert ctx.embed([]).shape == (0, 2)
+        assert ctx.encode_calls == 0
+
+    def test_content_words_skip_generic(self):
+        embed_fn, _ = self._fake_embed()
+        ctx = QuestionContext("Explain the working of Diffie Hellman", embed_fn)
+        assert ctx.content_words == ["diffie", "hellman"]
+
+    def test_prefetch_many_single_call_matches_individual_prefetch(self):
+        embed_fn, calls = self._fake_embed()
+        questions = ["Explain RSA key generation", "Describe hashing in RSA", "Explain RSA key generation"]
+        contexts = QuestionContext.prefetch_many(questions, embed_fn, concepts=False)
+        assert len(calls) == 1
+        assert len(calls[0][1]) == len(set(calls[0][1]))       # shared texts encoded once
+
+        for q, ctx in zip(questions, contexts):
+            solo = QuestionContext(q, embed_fn).prefetch(concepts=False)
+            assert ctx.encode_calls == 1
+            assert np.array_equal(ctx.query_embedding, solo.query_embedding)
+            assert np.array_equal(ctx.embed(ctx.content_words), solo.embed(solo.content_words))
+
+    def test_prefetch_many_uses_pipe_for_concepts(self, monkeypatch):
+        concept_expander = pytest.importorskip("services.concept_expander")
+        monkeypatch.setattr(concept_expander, "extract_concepts_many",
+                            lambda texts: [[t.split()[-1].lower()] for t in texts])
+        embed_fn, calls = self._fake_embed()
+        contexts = QuestionContext.prefetch_many(["Explain RSA", "Define AES"], embed_fn)
+        assert [c.concepts for c in contexts] == [["rsa"], ["aes"]]
+        assert len(calls) == 1 and "aes" in calls[0][1]
+
+
+# ============================================================
+# FEATURE 9 — embedding_cache.py
+# ============================================================
+from models.embedding_cache import EmbeddingCache, embedding_namespace
+
+class TestEmbeddingCache:
+
+    def _cache(self, tmp_path, **kw):
+        return EmbeddingCache(str(tmp_path / "emb.sqlite3"), **kw)
+
+    def test_key_depends_on_model_prefix_and_text(self):
+        k = EmbeddingCache.make_key("m", "query: ", "rsa")
+        assert k == EmbeddingCache.make_key("m", "query: ", "rsa")
+        assert k != EmbeddingCache.make_key("m", "passage: ", "rsa")
+        assert k != EmbeddingCache.make_key("m2", "query: ", "rsa")
+        assert k != EmbeddingCache.make_key("m", "query: ", "aes")
+
+    def test_namespace_separates_quantized_backends(self):
+        assert embedding_namespace("e5", "torch") == "e5"
+        assert embedding_namespace("e5", "onnx-int8") == "e5@onnx-int8"
+
+    def test_miss_then_memory_hit(self, tmp_path):
+        cache = self._cache(tmp_path)
+        assert cache.get_many(["a"]) == {}
+        cache.put_many({"a": np.array([0.6, 0.8], dtype=np.float32)})
+        got = cache.get_many(["a"])
+        assert np.allclose(got["a"], [0.6, 0.8])
+        s = cache.stats()
+        assert s["misses"] == 1 and s["memory_hits"] == 1
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        self._cache(tmp_path).put_many({"a": np.array([1.0, 0.0], dtype=np.float32)})
+        cache = self._cache(tmp_path)
+        got = cache.get_many(["a"])
+        assert np.allclose(got["a"], [1.0, 0.0])
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_float16_round_trip_is_consistent(self, tmp_path):
+        cache = self._cache(tmp_path, dtype="float16")
+        vec = np.array([0.123456789, 0.987654321], dtype=np.float32)
+        cache.put_many({"a": vec})
+        fresh = cache.get_many(["a"])["a"]
+        assert fresh.dtype == np.float32
+        assert np.array_equal(fresh, cache.round_trip(vec))
+
+    def test_size_bound_evicts_oldest(self, tmp_path):
+        vec = np.zeros(256, dtype=np.float32)          # 1 KiB per row
+        cache = self._cache(tmp_path, max_bytes=4 * 1024, memory_items=1)
+        for i in range(8):
+            cache.put_many({f"k{i}": vec})
+        s = cache.stats()
+        assert s["disk_bytes"] <= 4 * 1024
+        assert s["evictions"] > 0
+        assert "k7" in cache.get_many(["k7"])
+        assert "k0" not in cache.get_many(["k0"])
+
+    def test_running_byte_total_matches_disk(self, tmp_path):
+        cache = self._cache(tmp_path, max_bytes=64 * 1024)
+        cache.put_many({f"k{i}": np.zeros(256, dtype=np.float32) for i in range(600)})
+        cache.put_many({"k0": np.zeros(512, dtype=np.float32)})              # replace: 1 KiB → 2 KiB
+        s = cache.stats()
+        assert s["disk_bytes"] == cache._disk_bytes() <= 64 * 1024
+        assert s["evictions"] > 256                                        # more than one eviction batch
+        assert self._cache(tmp_path, max_bytes=64 * 1024).stats()["disk_bytes"] == s["disk_bytes"]
+        cache.clear()
+        assert cache.stats()["disk_bytes"] == 0
+
+
+# ============================================================
+# FEATURE 10 — embedding_scheduler.py
+# ============================================================
+import threading
+from models.embedding_scheduler import EmbeddingScheduler
+
+class TestEmbeddingScheduler:
+
+    def _fake_embed(self):
+        calls = []
+        def embed_fn(texts, task="query"):
+            calls.append((task, list(texts)))
+            return [[float(len(t)), 1.0 if task == "query" else 0.0] for t in texts]
+        return embed_fn, calls
+
+    def test_each_caller_gets_its_slice(self):
+        embed_fn, _ = self._fake_embed()
+        sched = EmbeddingScheduler(embed_fn, window_ms=1, max_batch=64)
+        out = sched.embed(["ab", "abcd"], task="query")
+        assert out.dtype == np.float32
+        assert out.tolist() == [[2.0, 1.0], [4.0, 1.0]]
+
+    def test_concurrent_requests_share_one_encode(self):
+        embed_fn, calls = self._fake_embed()
+        sched = EmbeddingScheduler(embed_fn, window_ms=200, max_batch=64)
+        results = {}
+
+        def worker(i):
+            results[i] = sched.embed(["x" * (i + 1)], task="query")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for i in range(6):
+            assert results[i].tolist() == [[float(i + 1), 1.0]]
+        assert len(calls) < 6
+        s = sched.stats()
+        assert s["requests"] == 6
+        assert sum(s["batch_size_histogram"].values()) == s["batches"]
+
+    def test_empty_input_keeps_embedding_width(self):
+        sched = EmbeddingScheduler(lambda texts, task="query": np.ones((len(texts), 2), dtype=np.float32),
+                                   window_ms=1, max_batch=64)
+        assert sched.embed([]).shape == (0, 2)
+        assert sched.stats()["requests"] == 0
+
+    def test_tasks_are_encoded_separately(self):
+        embed_fn, calls = self._fake_embed()
+        sched = EmbeddingScheduler(embed_fn, window_ms=1, max_batch=64)
+        assert sched.embed(["abc"], task="passage").tolist() == [[3.0, 0.0]]
+        assert all(task == "passage" for task, _ in calls)
+
+    def test_large_requests_bypass_queue(self):
+        embed_fn, calls = self._fake_embed()
+        sched = EmbeddingScheduler(embed_fn, window_ms=1, max_batch=4)
+        sched.embed(["a", "b", "c", "d", "e"], task="passage")
+        assert sched.stats()["bypassed"] == 1
+        assert calls[0][1] == ["a", "b", "c", "d", "e"]
+
+    def test_errors_propagate_to_caller(self):
+        def broken(texts, task="query"):
+            raise RuntimeError("model down")
+        sched = EmbeddingScheduler(broken, window_ms=1, max_batch=64)
+        try:
+            sched.embed(["x"])
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "model down" in str(e)
+
+
+# ============================================================
+# FEATURE 11 — curriculum_scope_validator.py (vectorized overlap)
+# ============================================================
+import services.curriculum_scope_validator as scope_validator
+
+class TestVectorizedConceptOverlap:
+
+    SID = "TEST-SCOPE-SYLLABUS"
+
+    def _embed_fn(self):
+        # Deterministic pseudo-embeddings; word pairs sharing a stem get close vectors
+        def embed_fn(texts, task="query"):
+            out = []
+            for t in texts:
+                rng = np.random.default_rng(sum(map(ord, t[:3])))
+                base = rng.normal(size=16)
+                noise = np.random.default_rng(sum(map(ord, t))).normal(size=16) * 0.3
+                out.append(base + noise)
+            return np.asarray(out, dtype=np.float32)
+        return embed_fn
+
+    def _reference_overlap(self, question, embed_fn, cutoff):
+        """The original pairwise loop, kept here as the oracle."""
+        words = scope_validator._syllabus_word_cache[self.SID]
+        embs  = embed_fn(words, task="passage")
+        q_words = scope_validator.extract_question_words(question)
+        sims = []
+        for w, q in zip(q_words, embed_fn(q_words, task="query")):
+            if w in words or any(scope_validator._is_morphological_match(w, s) for s in words):
+                sims.append(1.0)
+                continue
+            best = 0.0
+            q = np.asarray(q, dtype=float)
+            for e in np.asarray(embs, dtype=float):
+                c = float(np.dot(q, e) / (np.linalg.norm(q) * np.linalg.norm(e)))
+                best = max(best, c)
+            sims.append(best if best >= cutoff else 0.0)
+        return sum(sims) / len(sims)
+
+    @pytest.fixture(autouse=True)
+    def _isolated_embeddings_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(scope_validator, "_EMBEDDINGS_DIR", str(tmp_path))
+
+    def setup_method(self):
+        scope_validator._concept_cache[self.SID] = [
+            "rsa algorithm", "block cipher", "hash function", "digital signature",
+            "elliptic curve", "key exchange", "firewall",
+        ]
+
+    def teardown_method(self):
+        scope_validator._concept_cache.pop(self.SID, None)
+        scope_validator._embedding_cache.pop(self.SID, None)
+        scope_validator._syllabus_word_cache.pop(self.SID, None)
+        scope_validator._morph_index_cache.pop(self.SID, None)
+
+    def test_matches_pairwise_reference(self):
+        embed_fn = self._embed_fn()
+        questions = [
+            "Explain RSA and elliptic curves",
+            "Describe gradient descent in neural networks",
+            "What are hashing and signatures",
+            "Compare firewalls with intrusion detection",
+        ]
+        for cutoff in (0.0, 0.5, 0.86):
+            for q in questions:
+                got = scope_validator.compute_concept_overlap(q, self.SID, embed_fn, semantic_cutoff=cutoff)
+                ref = self._reference_overlap(q, embed_fn, cutoff)
+                assert abs(got - ref) < 1e-12, (q, cutoff, got, ref)
+
+    def test_syllabus_matrix_is_normalised_float64(self):
+        scope_validator.compute_concept_overlap("rsa", self.SID, self._embed_fn())
+        mat = scope_validator._embedding_cache[self.SID]
+        assert mat.dtype == np.float64
+        assert np.allclose(np.linalg.norm(mat, axis=1), 1.0, atol=1e-12)
+
+    def test_cutoff_decisions_match_reference_near_threshold(self):
+        # Question words whose best cosine sits within float32 rounding of the cutoff
+        cutoff = 0.86
+        words = scope_validator._syllabus_words(scope_validator._concept_cache[self.SID])
+        rng = np.random.default_rng(7)
+        syllabus = rng.normal(size=(len(words), 64)).astype(np.float32)
+        target = syllabus[0] / np.linalg.norm(syllabus[0].astype(np.float64))
+        ortho = rng.normal(size=64)
+        ortho -= ortho.dot(target) * target
+        ortho /= np.linalg.norm(ortho)
+        q_words = ["zzaa", "zzbb", "zzcc", "zzdd", "zzee", "zzff"]
+        queries = {}
+        for w, delta in zip(q_words, (-3e-7, -1e-7, -2e-8, 2e-8, 1e-7, 3e-7)):
+            c = cutoff + delta
+            queries[w] = (c * target + np.sqrt(1 - c * c) * ortho).astype(np.float32)
+
+        def embed_fn(texts, task="query"):
+            if task == "passage":
+                return syllabus[[words.index(t) for t in texts]]
+            return np.stack([queries[t] for t in texts])
+
+        for w in q_words:
+            got = scope_validator.compute_concept_overlap(w, self.SID, embed_fn, semantic_cutoff=cutoff)
+            ref = self._reference_overlap(w, embed_fn, cutoff)
+            assert (got == 0.0) == (ref == 0.0), (w, got, ref)
+            assert abs(got - ref) < 1e-12, (w, got, ref)
+
+    def test_exact_match_scores_one(self):
+        assert scope_validator.compute_concept_overlap("firewall", self.SID, self._embed_fn()) == 1.0
+
+
+class TestPersistedScopeEmbeddings:
+
+    SID = "TEST/PERSISTED SCOPE"
+    CONCEPTS = ["rsa algorithm", "block cipher", "hash function"]
+
+    @pytest.fixture(autouse=True)
+    def _isolated_store(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(scope_validator, "_DATA_DIR", str(tmp_path))
+        monkeypatch.setattr(scope_validator, "_CONCEPTS_FILE", str(tmp_path / "scope_concepts.json"))
+        monkeypatch.setattr(scope_validator, "_CONCEPTS_DB", str(tmp_path / "scope_concepts.sqlite3"))
+        monkeypatch.setattr(scope_validator, "_EMBEDDINGS_DIR", str(tmp_path / "scope_embeddings"))
+        yield
+        scope_validator.delete_scope_concepts(self.SID)
+
+    def _counting_embed_fn(self):
+        calls = []
+        def embed_fn(texts, task="query"):
+            calls.append(list(texts))
+            return np.random.default_rng(len(texts)).normal(size=(len(texts), 8)).astype(np.float32)
+        return embed_fn, calls
+
+    def _forget_in_memory(self):
+        # Simulate a restart: only the on-disk files survive
+        for cache in (scope_validator._concept_cache, scope_validator._embedding_cache,
+                      scope_validator._syllabus_word_cache, scope_validator._morph_index_cache):
+            cache.pop(self.SID, None)
+
+    def test_store_persists_matrix(self):
+        embed_fn, calls = self._counting_embed_fn()
+        scope_validator.store_scope_concepts(self.SID, self.CONCEPTS, embed_fn=embed_fn)
+        assert len(calls) == 1
+        npy_path, words_path = scope_validator._embedding_paths(self.SID)
+        assert os.path.exists(npy_path) and os.path.exists(words_path)
+
+    def test_reload_is_memory_mapped_without_encoding(self):
+        embed_fn, calls = self._counting_embed_fn()
+        scope_validator.store_scope_concepts(self.SID, self.CONCEPTS, embed_fn=embed_fn)
+        stored = np.array(scope_validator._embedding_cache[self.SID])
+        self._forget_in_memory()
+
+        words = scope_validator._syllabus_words(self.CONCEPTS)
+        assert isinstance(scope_validator._load_embeddings(self.SID, words), np.memmap)
+        words, embs = scope_validator._get_syllabus_words_and_embeddings(self.SID, embed_fn)
+        assert len(calls) == 1
+        assert words == scope_validator._syllabus_words(self.CONCEPTS)
+        assert np.array_equal(np.asarray(embs), stored)
+
+    def test_changed_concepts_are_re_encoded(self):
+        embed_fn, calls = self._counting_embed_fn()
+        scope_validator.store_scope_concepts(self.SID, self.CONCEPTS, embed_fn=embed_fn)
+        scope_validator.store_scope_concepts(self.SID, self.CONCEPTS + ["elliptic curve"], embed_fn=embed_fn)
+        self._forget_in_memory()
+        words, embs = scope_validator._get_syllabus_words_and_embeddings(self.SID, embed_fn)
+        assert "elliptic" in words and embs.shape[0] == len(words)
+        assert len(calls) == 2
+
+    def test_delete_removes_files(self):
+        embed_fn, _ = self._counting_embed_fn()
+        scope_validator.store_scope_concepts(self.SID, self.CONCEPTS, embed_fn=embed_fn)
+        scope_validator.delete_scope_concepts(self.SID)
+        assert not any(os.path.exists(p) for p in scope_validator._embedding_paths(self.SID))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FEATURE 12 — morphology_index.py
+# ─────────────────────────────────────────────────────────────────────────────
+
+from services.morphology_index import MorphologyIndex
+
+
+class TestMorphologyIndex:
+    WORDS = [
+        "cipher", "ciphertext", "cryptography", "hash", "hashing", "network",
+        "networks", "signature", "key", "keys", "algorithm", "algorithms",
+        "firewall", "routing", "elliptic", "curve", "protocol", "tree", "trees",
+    ]
+
+    QUERIES = [
+        "cipher", "ciphers", "text", "ciphertexts", "cryptanalysis", "crypt",
+        "hashes", "hash", "networking", "work", "signatures", "sign", "keys",
+        "algorithmic", "rithm", "firewalls", "route", "routings", "curves",
+        "protocols", "tree", "treetop", "xyz", "graph", "subnetwork", "twork",
+    ]
+
+    def test_matches_pairwise_scan(self):
+        index = MorphologyIndex(self.WORDS)
+        for q in self.QUERIES:
+            expected = any(scope_validator._is_morphological_match(q, s) for s in self.WORDS)
+            assert index.matches(q) == expected, q
+
+    def test_matches_pairwise_scan_randomised(self):
+        import random
+        rng = random.Random(7)
+        alphabet = "abcde"
+        words = {"".join(rng.choice(alphabet) for _ in range(rng.randint(3, 9))) for _ in range(300)}
+        index = MorphologyIndex(words)
+        for _ in range(1000):
+            q = "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 10)))
+            expected = any(scope_validator._is_morphological_match(q, s) for s in words)
+            assert index.matches(q) == expected, q
+
+    def test_exact_membership(self):
+        index = MorphologyIndex(self.WORDS)
+        assert "key" in index
+        assert "keyboard" not in index
+        assert len(index) == len(set(self.WORDS))
+
+    def test_short_words_never_match(self):
+        index = MorphologyIndex(self.WORDS)
+        assert not index.matches("hash")
+        assert not index.matches("key")
+
+
+# ============================================================
+# FEATURE 13 — scope_concept_store.py
+# ============================================================
+from services.scope_concept_store import ScopeConceptStore
+
+
+class TestScopeConceptStore:
+
+    def test_upsert_get_delete(self, tmp_path):
+        store = ScopeConceptStore(str(tmp_path / "c.sqlite3"))
+        store.upsert("S1", ["rsa algorithm"])
+        store.upsert("S1", ["block cipher"])
+        assert store.get("S1") == ["block cipher"]
+        assert store.delete("S1") is True
+        assert store.get("S1") is None
+        assert store.delete("S1") is False
+
+    def test_upsert_many_is_one_batch(self, tmp_path):
+        store = ScopeConceptStore(str(tmp_path / "c.sqlite3"))
+        items = {f"S{i}": [f"concept {i}"] for i in range(200)}
+        assert store.upsert_many(items) == 200
+        assert len(store) == 200
+        assert store.get_all() == items
+
+    def test_json_migration_is_one_shot(self, tmp_path):
+        legacy = tmp_path / "scope_concepts.json"
+        legacy.write_text('{"S1": ["hash function"], "S2": ["firewall"]}', encoding="utf-8")
+        store = ScopeConceptStore(str(tmp_path / "c.sqlite3"))
+        store.upsert("S2", ["newer concept"])
+
+        assert store.migrate_json(str(legacy)) == 1
+        assert store.get("S1") == ["hash function"]
+        assert store.get("S2") == ["newer concept"]     # existing rows win
+        assert not legacy.exists()
+        assert (tmp_path / "scope_concepts.json.migrated").exists()
+        assert store.migrate_json(str(legacy)) == 0
+
+    def test_second_connection_sees_committed_writes(self, tmp_path):
+        path = str(tmp_path / "c.sqlite3")
+        writer, reader = ScopeConceptStore(path), ScopeConceptStore(path)
+        writer.upsert_many({"S1": ["a"], "S2": ["b"]})
+        assert reader.get("S2") == ["b"]
+        writer.delete("S1")
+        assert reader.get("S1") is None
+
+
+# ============================================================
+# FEATURE 14 — concept_expander.py (in-memory concept matrix)
+# ============================================================
+
+from vectorstores.partitions import CollectionRouter
+
+
+class _OneCollectionClient:
+    """Chroma client stand-in whose only collection is the given fake."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collection
+
+
+class _FakeConceptCollection:
+    """Minimal stand-in for the concept_store Chroma collection."""
+
+    def __init__(self, rows):
+        self.rows = rows          # {syllabus_id: [vector, ...]}
+        self.get_calls = 0
+        self.query_calls = 0
+
+    def get(self, where=None, include=None):
+        self.get_calls += 1
+        return {"embeddings": self.rows.get(where["syllabus_id"], [])}
+
+    def add(self, ids, embeddings, metadatas, documents):
+        for vec, meta in zip(embeddings, metadatas):
+            self.rows.setdefault(meta["syllabus_id"], []).append(list(vec))
+
+    def delete(self, where=None, ids=None):
+        if where:
+            self.rows.pop(where["syllabus_id"], None)
+
+    def query(self, **kwargs):
+        self.query_calls += 1
+        raise AssertionError("compute_concept_boost must not query Chroma")
+
+
+class TestConceptStoreMatrix:
+
+    def _store(self, rows):
+        concept_expander = pytest.importorskip("services.concept_expander")
+        store = concept_expander.ConceptStore.__new__(concept_expander.ConceptStore)
+        store.embed_fn = lambda texts, task="query": np.eye(4, dtype=np.float32)[: len(texts)]
+        store.collection = _FakeConceptCollection(rows)
+        store._router = CollectionRouter(_OneCollectionClient(store.collection), "concept_store")
+        store._matrices = {}
+        store._lock = threading.Lock()
+        store._versions = None
+        return store
+
+    class _Ctx:
+        def __init__(self, concepts, vectors):
+            self.concepts = concepts
+            self._vectors = np.asarray(vectors, dtype=np.float32)
+
+        def embed(self, texts, task="query"):
+            return self._vectors
+
+    def test_boost_thresholds_from_one_product(self):
+        store = self._store({"S1": [[1, 0, 0, 0], [0, 1, 0, 0]]})
+        strong   = self._Ctx(["a"], [[0.9, 0.1, 0, 0]])
+        moderate = self._Ctx(["a"], [[0.8, 0, 0.6, 0]])
+        weak     = self._Ctx(["a"], [[0, 0, 1, 0]])
+        assert store.compute_concept_boost("q", "S1", ctx=strong) == 0.12
+        assert store.compute_concept_boost("q", "S1", ctx=moderate) == 0.06
+        assert store.compute_concept_boost("q", "S1", ctx=weak) == 0.0
+        assert store.collection.get_calls == 1
+        assert store.collection.query_calls == 0
+
+    def test_load_error_is_not_cached(self):
+        store = self._store({"S1": [[1, 0, 0, 0]]})
+        get = store.collection.get
+
+        def failing_get(**kwargs):
+            raise RuntimeError("chroma busy")
+        store.collection.get = failing_get
+        assert store.get_matrix("S1").shape[0] == 0
+        store.collection.get = get
+        assert store.get_matrix("S1").shape[0] == 1
+
+    def test_ingest_by_another_worker_replaces_cached_empty_matrix(self, tmp_path):
+        from vectorstores.syllabus_versions import SyllabusVersions
+        path = str(tmp_path / "concept_versions.sqlite3")
+        reader, writer = self._store({}), self._store({})
+        writer.collection = reader.collection                     # same Chroma data
+        writer._router = reader._router
+        reader._versions, writer._versions = SyllabusVersions(path), SyllabusVersions(path)
+        ctx = self._Ctx(["a"], [[1, 0, 0, 0]])
+        assert reader.compute_concept_boost("q", "S1", ctx=ctx) == 0.0          # empty matrix cached
+
+        writer.add_syllabus_concepts("S1", [], concepts=["rsa"])                  # another worker ingests S1
+        assert reader.compute_concept_boost("q", "S1", ctx=ctx) == 0.12
+        writer.delete_syllabus_concepts("S1")
+        assert reader.compute_concept_boost("q", "S1", ctx=ctx) == 0.0
+
+    def test_delete_refreshes_matrix(self):
+        store = self._store({"S1": [[1, 0, 0, 0]]})
+        ctx = self._Ctx(["a"], [[1, 0, 0, 0]])
+        assert store.compute_concept_boost("q", "S1", ctx=ctx) == 0.12
+        store.delete_syllabus_concepts("S1")
+        assert store.compute_concept_boost("q", "S1", ctx=ctx) == 0.0
+
+    def test_boost_many_matches_per_question(self):
+        store = self._store({"S1": [[1, 0, 0, 0], [0, 1, 0, 0]]})
+        contexts = [
+            self._Ctx(["a"], [[0.9, 0.1, 0, 0]]),
+            self._Ctx(["a", "b"], [[0, 0, 1, 0], [0.8, 0, 0.6, 0]]),
+            self._Ctx([], np.empty((0, 4))),
+            self._Ctx(["a"], [[0, 0, 0, 1]]),
+        ]
+        many = store.compute_concept_boost_many(contexts, "S1")
+        single = [store.compute_concept_boost("q", "S1", ctx=c) for c in contexts]
+        assert many.tolist() == single == [0.12, 0.06, 0.0, 0.0]
+
+    def test_unknown_syllabus_has_no_boost(self):
+        store = self._store({})
+        assert store.compute_concept_boost("q", "S9", ctx=self._Ctx(["a"], [[1, 0, 0, 0]])) == 0.0
+
+
+# ============================================================
+# FEATURE 15 — nlp_registry.py
+# ============================================================
+import types
+
+from services import nlp_registry
+
+
+class _FakeNLP:
+    pipe_names = ["tok2vec", "tagger", "parser", "attribute_ruler"]
+
+    def __init__(self):
+        self.pipe_calls = []
+
+    def pipe(self, texts, batch_size=1, n_process=1):
+        self.pipe_calls.append((len(texts), batch_size, n_process))
+        return (f"doc:{t}" for t in texts)
+
+
+class TestNLPRegistry:
+
+    @pytest.fixture(autouse=True)
+    def _fake_spacy(self, monkeypatch):
+        self.loads = []
+
+        def load(name, disable=()):
+            self.loads.append((name, tuple(disable)))
+            return _FakeNLP()
+
+        monkeypatch.setitem(sys.modules, "spacy", types.SimpleNamespace(load=load))
+        monkeypatch.setattr(nlp_registry, "_pipelines", {})
+
+    def test_model_loaded_once_with_trimmed_components(self):
+        first = nlp_registry.get_nlp("fake_model", ("ner", "lemmatizer"))
+        second = nlp_registry.get_nlp("fake_model", ("ner", "lemmatizer"))
+        assert first is second
+        assert self.loads == [("fake_model", ("ner", "lemmatizer"))]
+
+    def test_pipe_preserves_order_and_batches(self):
+        docs = list(nlp_registry.pipe(["a", "b", "c"], batch_size=2, n_process=4, model="fake_model"))
+        assert docs == ["doc:a", "doc:b", "doc:c"]
+        nlp = nlp_registry.get_nlp("fake_model")
+        assert nlp.pipe_calls == [(3, 2, 4)]
+
+    def test_small_inputs_do_not_fork(self):
+        list(nlp_registry.pipe(["a"], batch_size=32, n_process=4, model="fake_model"))
+        assert nlp_registry.get_nlp("fake_model").pipe_calls == [(1, 32, 1)]
+
+
+# ============================================================
+# FEATURE 16 — syllabus_concepts.py (single ingestion NLP pass)
+# ============================================================
+
+def _fake_doc(noun_chunks):
+    tok = lambda text, pos="NOUN": types.SimpleNamespace(text=text, pos_=pos)
+    return types.SimpleNamespace(noun_chunks=[[tok(w, p) for w, p in chunk] for chunk in noun_chunks])
+
+
+class TestSingleIngestionPass:
+
+    CHUNKS = ["Block ciphers and RSA.", "Various techniques.", "   "]
+
+    @staticmethod
+    def _fake_pipe(parsed):
+        def pipe(texts):
+            for t in texts:
+                parsed.append(t)
+                if "Block" in t:
+                    yield _fake_doc([[("the", "DET"), ("block", "NOUN"), ("cipher", "NOUN")]])
+                else:
+                    yield _fake_doc([[("various", "ADJ"), ("techniques", "NOUN")]])
+        return pipe
+
+    def test_one_parse_feeds_both_outputs(self, monkeypatch):
+        pytest.importorskip("services.concept_expander")
+        from services import syllabus_concepts
+
+        parsed = []
+        monkeypatch.setattr(syllabus_concepts.nlp_registry, "pipe", self._fake_pipe(parsed))
+
+        raw, scope, stats = syllabus_concepts.extract_syllabus_concept_sets(self.CHUNKS, top_n=10)
+        assert parsed == self.CHUNKS[:2]                # each chunk parsed once, blanks skipped
+        assert "block cipher" in raw and "rsa" in raw
+        assert "various techniques" in raw             # ConceptStore keeps generic phrases
+        assert "block cipher" in scope and "rsa" in scope
+        assert "techniques" not in scope and "various techniques" not in scope
+
+        assert stats["chunks"] == 3
+        assert stats["chunks_with_concepts"] == 1
+        assert stats["coverage"] == round(1 / 3, 4)
+
+    def test_long_chunks_are_split_not_truncated(self, monkeypatch):
+        pytest.importorskip("services.concept_expander")
+        from services import syllabus_concepts
+
+        parsed = []
+        monkeypatch.setattr(syllabus_concepts.nlp_registry, "pipe", self._fake_pipe(parsed))
+        long_chunk = "filler text " * 20_000 + "Block cipher AES at the very end"
+
+        raw, scope, stats = syllabus_concepts.extract_syllabus_concept_sets([long_chunk])
+        assert stats["pieces"] > 1
+        assert sum(len(p) for p in parsed) >= len(long_chunk) - stats["pieces"]
+        assert "aes" in scope
+
+    def test_spacy_failure_falls_back_for_scope_only(self, monkeypatch):
+        pytest.importorskip("services.concept_expander")
+        from services import syllabus_concepts
+
+        def broken(texts):
+            raise OSError("model missing")
+            yield
+        monkeypatch.setattr(syllabus_concepts.nlp_registry, "pipe", broken)
+
+        raw, scope, _ = syllabus_concepts.extract_syllabus_concept_sets(["hashing hashing firewall"], top_n=5)
+        assert raw == []
+        assert scope[0] == "hashing"
+
+
+class TestSplitText:
+
+    def test_pieces_are_bounded_and_lossless(self):
+        text = "alpha beta\ngamma delta " * 500
+        pieces = nlp_registry.split_text(text, max_chars=97)
+        assert all(len(p) <= 97 for p in pieces)
+        assert "".join(pieces) == text
+
+    def test_short_text_is_one_piece(self):
+        assert nlp_registry.split_text("What is RSA?") == ["What is RSA?"]
+
+
+# ============================================================
+# FEATURE 17 — app.py (/analyze_question/stream)
+# ============================================================
+
+import json
+
+class _StubEmbedder:
+    """Stands in for the E5 model so app.py can be imported without loading it."""
+
+    cache_namespace = "stub"
+
+    def embed(self, texts, task="query"):
+        return np.ones((len(texts), 8), dtype=np.float32) / np.sqrt(8)
+
+
+@pytest.fixture(scope="module")
+def app_module():
+    pytest.importorskip("flask")
+    pytest.importorskip("chromadb")
+    embedder = pytest.importorskip("models.embedder")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(embedder, "Embedder", _StubEmbedder)
+        import app
+    return app
+
+
+class TestAnalyzeStream:
+
+    @pytest.fixture
+    def client(self, app_module, monkeypatch):
+        calls = {"batch": [], "one": []}
+
+        def retrieve_batch(questions, syllabus_id, contexts=None):
+            calls["batch"].append(list(questions))
+            if any("explode" in q for q in questions):
+                raise RuntimeError("vector store down")
+            return [(None, [], 0.5) for _ in questions]
+
+        def retrieve_one(q_text, syllabus_id, ctx=None):
+            calls["one"].append(q_text)
+            return None, [], 0.5
+
+        def finish(q_text, ctx, top_chunks, similarity, syllabus_id, threshold):
+            if "bad" in q_text:
+                raise ValueError("boom")
+            return {"question": q_text, "is_in_syllabus": "rsa" in q_text,
+                    "match_type": "SEMANTIC", "llm_decision": True}
+
+        monkeypatch.setattr(app_module, "_retrieve_batch", retrieve_batch)
+        monkeypatch.setattr(app_module, "_retrieve_one", retrieve_one)
+        monkeypatch.setattr(app_module, "_finish_question", finish)
+        monkeypatch.setattr(app_module, "result_cache", None)
+        monkeypatch.setattr(app_module, "question_bank", None)
+        monkeypatch.setattr(app_module, "ANALYZE_STREAM_WINDOW", 2)
+        client = app_module.app.test_client()
+        client.calls = calls
+        return client
+
+    @staticmethod
+    def _ndjson(response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+    def test_results_in_order_with_error_record_and_summary(self, client):
+        resp = client.post("/analyze_question/stream",
+                           json={"question": "rsa keys\nbad one\naes rounds", "syllabus_id": "S1"})
+        assert resp.mimetype == "application/x-ndjson"
+        records = self._ndjson(resp)
+        assert [r["type"] for r in records] == ["start", "result", "error", "result", "summary"]
+        assert records[0] == {"type": "start", "total": 3, "execution": "vectorized"}
+        assert [r["index"] for r in records[1:4]] == [0, 1, 2]
+        assert records[2] == {"type": "error", "index": 1, "question": "bad one", "error": "boom"}
+        summary = records[-1]
+        assert (summary["completed"], summary["errors"], summary["in_syllabus"], summary["not_in_syllabus"],
+                summary["llm_calls"], summary["match_types"]) == (2, 1, 1, 1, 2, {"SEMANTIC": 2})
+        assert client.calls["batch"] == [["rsa keys", "bad one"], ["aes rounds"]]     # windowed slices
+
+    def test_failed_vectorized_window_reports_errors_and_continues(self, client):
+        records = self._ndjson(client.post("/analyze_question/stream",
+                                           json={"question": "explode\nrsa a\nrsa b"}))
+        assert [r["type"] for r in records] == ["start", "error", "error", "result", "summary"]
+        assert records[1]["error"] == "vector store down"
+        assert records[-1]["errors"] == 2 and records[-1]["completed"] == 1
+
+    def test_sse_framing_and_sequential_mode(self, client):
+        resp = client.post("/analyze_question/stream",
+                           json={"question": "rsa a\nrsa b", "format": "sse", "batch_mode": False})
+        assert resp.mimetype == "text/event-stream"
+        events = [e for e in resp.get_data(as_text=True).split("\n\n") if e]
+        assert [e.split("\n")[0] for e in events] == ["event: start", "event: result", "event: result", "event: summary"]
+        assert json.loads(events[0].split("data: ", 1)[1])["execution"] == "sequential"
+        assert client.calls["batch"] == [] and client.calls["one"] == ["rsa a", "rsa b"]
+
+    def test_empty_question_is_rejected(self, client):
+        resp = client.post("/analyze_question/stream", json={"question": "  "})
+        assert resp.status_code == 400
+
+
+def test_question_bank_probe_primes_retrieval_contexts(app_module, monkeypatch):
+    from services.question_bank import QuestionBank
+    encoded, seen = [], []
+
+    def embed_fn(texts, task="query"):
+        encoded.append(list(texts))
+        return np.ones((len(texts), 8), dtype=np.float32) / np.sqrt(8)
+
+    def retrieve_batch(questions, syllabus_id, contexts=None):
+        seen.extend(contexts)
+        return [(ctx, [], 0.5) for ctx in contexts]
+
+    monkeypatch.setattr(app_module, "embed_fn", embed_fn)
+    monkeypatch.setattr(app_module, "_retrieve_batch", retrieve_batch)
+    monkeypatch.setattr(app_module, "_finish_question", lambda q, *a: {"question": q})
+    monkeypatch.setattr(app_module, "result_cache", None)
+    monkeypatch.setattr(app_module, "question_bank", QuestionBank(None))
+    results = [r for _, r in app_module._iter_results(["What is RSA?", "Define AES."], None, 0.2, True)]
+    assert [r["question"] for r in results] == ["What is RSA?", "Define AES."]
+    assert encoded == [["What is RSA?", "Define AES."]]          # bank probe and retrieval share one call
+    assert [ctx.question for ctx in seen] == ["What is RSA?", "Define AES."]
+    assert all(ctx.encode_calls == 1 for ctx in seen)
+    assert app_module.question_bank.stats()["added"] == 2
+
+
+def test_build_result_keeps_ingestion_flags_out_of_response(app_module):
+    chunk = {"text": "RSA", "similarity": 0.8, "module": 2, "is_reference": False, "is_noisy": False}
+    analysis = {"is_in_syllabus": True, "gatekeeper_passed": True, "reason": "", "modules_detected": [2],
+                "bloom_level": "L2", "difficulty": "Easy", "mapped_co": None, "mapped_pco": None, "llm": None}
+    result = app_module._build_result("What is RSA?", 0.8, [chunk], analysis)
+    assert result["top_chunks"] == [{"text": "RSA", "similarity": 0.8, "module": 2}]
+    assert "is_reference" in chunk                  # the filters' input is left alone
+
+
+# ============================================================
+# FEATURE 18 — analysis_jobs.py / priority_gate.py
+# ============================================================
+import time
+
+from services.analysis_jobs import JobStore, JobRunner
+from services.priority_gate import PriorityGate
+
+
+def _fake_run(calls):
+    def run(questions, syllabus_id, threshold, vectorized):
+        calls.append(list(questions))
+        for pos, q in enumerate(questions):
+            yield pos, (ValueError("boom") if q == "bad" else {"question": q, "is_in_syllabus": True})
+    return run
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestJobStore:
+
+    def test_claim_record_and_progress(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        job = store.create(["q1", "q2", "q3"], "SYL", 0.2)
+        assert job["status"] == "queued" and job["progress"]["pending"] == 3
+
+        claimed = store.claim_next()
+        assert claimed["job_id"] == job["job_id"] and claimed["questions"] == ["q1", "q2", "q3"]
+        assert store.claim_next() is None
+
+        store.record_result(job["job_id"], 0, {"question": "q1"})
+        store.record_result(job["job_id"], 2, ValueError("boom"), question="q3")
+        progress = store.get(job["job_id"])["progress"]
+        assert (progress["completed"], progress["errors"], progress["pending"]) == (1, 1, 1)
+        assert store.question_states(job["job_id"], 3) == ["done", "pending", "error"]
+        assert [r["index"] for r in store.results(job["job_id"])] == [0, 2]
+        assert store.results(job["job_id"])[1]["error"] == "boom"
+
+    def test_running_jobs_are_requeued_after_restart(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        store = JobStore(path, lease_seconds=0)     # stopped process: its lease has lapsed
+        job = store.create(["q1", "q2"], "SYL", 0.2)
+        store.claim_next()
+        store.record_result(job["job_id"], 0, {"question": "q1"})
+
+        reopened = JobStore(path)          # simulated process restart
+        assert reopened.requeue_expired() == 1
+        assert reopened.get(job["job_id"])["status"] == "queued"
+        assert reopened.done_indices(job["job_id"]) == {0}
+
+    def test_live_lease_is_not_requeued_by_another_process(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        worker = JobStore(path, lease_seconds=60)
+        job = worker.create(["q1"], "SYL", 0.2)
+        worker.claim_next()
+
+        other = JobStore(path)                       # a second process starting up
+        assert other.requeue_expired() == 0 and other.claim_next() is None
+        assert worker.holds(job["job_id"]) and not other.holds(job["job_id"])
+        assert not other.finish(job["job_id"])
+        assert worker.renew([job["job_id"]]) == 1
+        assert worker.finish(job["job_id"])
+
+    def test_finish_does_not_override_cancel(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        job = store.create(["q1"], None, 0.2)
+        store.claim_next()
+        assert store.cancel(job["job_id"])
+        assert not store.finish(job["job_id"])
+        assert store.status(job["job_id"]) == "cancelled"
+
+
+class TestJobRunner:
+
+    def test_runs_job_to_completion(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        runner = JobRunner(store, _fake_run([]), workers=2, poll_seconds=0.05).start()
+        try:
+            job = runner.submit(["q1", "bad", "q3"], "SYL", 0.2)
+            assert _wait_for(lambda: store.status(job["job_id"]) == "done")
+        finally:
+            runner.stop()
+        results = store.results(job["job_id"])
+        assert [r["ok"] for r in results] == [True, False, True]
+        assert results[2]["question"] == "q3"
+
+    def test_resumed_job_only_runs_missing_questions(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        store = JobStore(path, lease_seconds=0)
+        job = store.create(["q1", "q2", "q3"], "SYL", 0.2)
+        store.claim_next()
+        store.record_result(job["job_id"], 0, {"question": "q1"})
+
+        calls = []
+        runner = JobRunner(JobStore(path), _fake_run(calls), poll_seconds=0.05).start()
+        try:
+            assert _wait_for(lambda: store.status(job["job_id"]) == "done")
+        finally:
+            runner.stop()
+        assert calls == [["q2", "q3"]]
+        assert [r["index"] for r in store.results(job["job_id"])] == [0, 1, 2]
+
+
+class TestPriorityGate:
+
+    def test_interactive_caller_overtakes_waiting_background(self):
+        gate, order = PriorityGate(), []
+        holder_in, release = threading.Event(), threading.Event()
+
+        def holder():
+            with gate.slot():
+                holder_in.set()
+                release.wait(5)
+
+        def background():
+            with gate.background(), gate.slot():
+                order.append("background")
+
+        def interactive():
+            with gate.slot():
+                order.append("interactive")
+
+        threads = [threading.Thread(target=holder)]
+        threads[0].start()
+        holder_in.wait(5)
+        for fn in (background, interactive):
+            t = threading.Thread(target=fn)
+            t.start()
+            threads.append(t)
+        assert _wait_for(lambda: gate.stats()["interactive_waiting"] == 1)
+        time.sleep(0.05)                   # background thread is parked on the gate too
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert order == ["interactive", "background"]
+        assert gate.stats()["background"]["acquired"] == 1
+
+    def test_background_flag_is_per_thread(self):
+        gate = PriorityGate()
+        with gate.background():
+            assert gate.is_background()
+            seen = []
+            t = threading.Thread(target=lambda: seen.append(gate.is_background()))
+            t.start()
+            t.join()
+            assert seen == [False]
+        assert not gate.is_background()
+
+
+# ============================================================
+# FEATURE 19 — result_cache.py
+# ============================================================
+from services.result_cache import ResultCache, normalize_question
+
+
+class TestResultCache:
+
+    def test_normalized_question_hits(self):
+        cache = ResultCache(None)
+        cache.put("What is RSA?", "SYL", 0.2, {"is_in_syllabus": True})
+        assert cache.get("  what is   RSA ", "SYL", 0.2) == {"is_in_syllabus": True}
+        assert cache.get("What is RSA?", "SYL", 0.3) is None          # threshold is part of the key
+        assert cache.get("What is RSA?", "OTHER", 0.2) is None
+        assert normalize_question("Define AES.") == "define aes"
+
+    def test_returns_independent_copies(self):
+        cache = ResultCache(None)
+        cache.put("q", "SYL", 0.2, {"top_chunks": []})
+        cache.get("q", "SYL", 0.2)["top_chunks"].append("mutated")
+        assert cache.get("q", "SYL", 0.2) == {"top_chunks": []}
+
+    def test_invalidate_drops_only_that_syllabus(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "results.sqlite3"))
+        cache.put("q", "A", 0.2, {"sid": "A"})
+        cache.put("q", "B", 0.2, {"sid": "B"})
+        cache.put("q", None, 0.2, {"sid": "*"})
+
+        cache.invalidate("A")
+        assert cache.generation("A") == 1 and cache.generation("B") == 0
+        assert cache.get("q", "A", 0.2) is None
+        assert cache.get("q", "B", 0.2) == {"sid": "B"}
+        assert cache.get("q", None, 0.2) is None                      # all-syllabi search saw A too
+
+    def test_disk_tier_survives_restart_and_sees_generation(self, tmp_path):
+        path = str(tmp_path / "results.sqlite3")
+        ResultCache(path).put("q", "A", 0.2, {"ok": 1})
+
+        reopened = ResultCache(path)
+        assert reopened.get("q", "A", 0.2) == {"ok": 1}
+        assert reopened.stats()["disk_hits"] == 1
+
+        ResultCache(path).invalidate("A")                              # another worker re-ingests A
+        assert reopened.get("q", "A", 0.2) is None
+
+    def test_result_computed_before_invalidation_is_not_cached(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "results.sqlite3"))
+        gen = cache.generation(None)                                   # analysis of every syllabus starts
+        assert cache.get("q", None, 0.2, gen) is None
+        cache.invalidate("A")                                          # A re-ingested meanwhile
+        cache.put("q", None, 0.2, {"stale": True}, gen)
+        assert cache.get("q", None, 0.2) is None
+        assert cache.stats()["disk_entries"] == 0
+
+    def test_disk_tier_is_bounded_by_running_total(self, tmp_path):
+        path  = str(tmp_path / "results.sqlite3")
+        cache = ResultCache(path, max_bytes=16 * 1024)
+        for i in range(600):
+            cache.put(f"q{i}", "A" if i % 2 else "B", 0.2, {"text": "x" * 100})
+        cache.put("q599", "A", 0.2, {"text": "y" * 400})                  # replace a row
+        total = lambda: cache._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        s = cache.stats()
+        assert s["disk_bytes"] == total() <= 16 * 1024
+        assert s["evictions"] > 256
+        assert ResultCache(path).stats()["disk_bytes"] == s["disk_bytes"]
+        cache.invalidate("A")
+        assert cache.stats()["disk_bytes"] == total()
+        cache.clear()
+        assert cache.stats()["disk_bytes"] == 0
+
+    def test_namespace_separates_settings(self, tmp_path):
+        path = str(tmp_path / "results.sqlite3")
+        ResultCache(path, namespace="thr=0.24").put("q", "A", 0.2, {"ok": 1})
+        assert ResultCache(path, namespace="thr=0.30").get("q", "A", 0.2) is None
+
+    def test_hit_ratio(self):
+        cache = ResultCache(None, memory_items=1)
+        cache.put("q1", "A", 0.2, {})
+        cache.get("q1", "A", 0.2)
+        cache.get("q2", "A", 0.2)
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+# ============================================================
+# FEATURE 20 — question_bank.py (semantic answer reuse)
+# ============================================================
+from services.question_bank import QuestionBank
+
+
+def _unit(*xs):
+    v = np.asarray(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+class TestQuestionBank:
+
+    def test_paraphrase_with_same_bloom_is_reused(self):
+        bank = QuestionBank(None, min_cosine=0.9)
+        bank.add("Explain RSA", _unit(1, 0, 0), "Understand", {"is_in_syllabus": True}, "SYL", 0.2)
+
+        hits = bank.lookup_many(
+            np.vstack([_unit(1, 0.1, 0), _unit(0, 1, 0)]), ["Understand", "Understand"], "SYL", 0.2
+        )
+        assert hits[0]["question"] == "Explain RSA" and hits[0]["result"] == {"is_in_syllabus": True}
+        assert hits[0]["cosine"] >= 0.9
+        assert hits[1] is None
+
+    def test_bloom_mismatch_blocks_reuse(self):
+        bank = QuestionBank(None, min_cosine=0.9)
+        bank.add("Explain RSA", _unit(1, 0, 0), "Understand", {}, "SYL", 0.2)
+        assert bank.lookup_many(np.vstack([_unit(1, 0, 0)]), ["Apply"], "SYL", 0.2) == [None]
+        assert bank.stats()["bloom_blocks"] == 1
+
+    def test_scoped_by_syllabus_threshold_and_generation(self):
+        bank = QuestionBank(None, min_cosine=0.9)
+        bank.add("Explain RSA", _unit(1, 0), "Understand", {}, "SYL", 0.2, generation=0)
+        probe = np.vstack([_unit(1, 0)])
+        assert bank.lookup_many(probe, ["Understand"], "OTHER", 0.2) == [None]
+        assert bank.lookup_many(probe, ["Understand"], "SYL", 0.5) == [None]
+        assert bank.lookup_many(probe, ["Understand"], "SYL", 0.2, generation=1) == [None]
+
+    def test_persists_and_invalidates(self, tmp_path):
+        path = str(tmp_path / "bank.sqlite3")
+        bank = QuestionBank(path, min_cosine=0.9)
+        assert bank.add("Explain RSA", _unit(1, 0), "Understand", {"ok": 1}, "SYL", 0.2)
+        assert not bank.add("explain rsa.", _unit(1, 0), "Understand", {"ok": 2}, "SYL", 0.2)   # duplicate
+
+        reopened = QuestionBank(path, min_cosine=0.9)
+        assert reopened.lookup_many(np.vstack([_unit(1, 0)]), ["Understand"], "SYL", 0.2)[0]["result"] == {"ok": 1}
+        assert reopened.invalidate("SYL") == 1
+        assert QuestionBank(path, min_cosine=0.9).lookup_many(
+            np.vstack([_unit(1, 0)]), ["Understand"], "SYL", 0.2) == [None]
+
+    def test_sees_questions_added_by_another_worker(self, tmp_path):
+        path  = str(tmp_path / "bank.sqlite3")
+        mine  = QuestionBank(path, min_cosine=0.9)
+        other = QuestionBank(path, min_cosine=0.9)
+        probe = np.vstack([_unit(1, 0)])
+        assert mine.lookup_many(probe, ["Understand"], "SYL", 0.2) == [None]          # bank now loaded
+        other.add("Explain RSA", _unit(1, 0), "Understand", {"ok": 1}, "SYL", 0.2)
+        assert mine.lookup_many(probe, ["Understand"], "SYL", 0.2)[0]["result"] == {"ok": 1}
+        assert not mine.add("explain RSA", _unit(1, 0), "Understand", {"ok": 2}, "SYL", 0.2)
+
+
+# ============================================================
+# FEATURE 21 — co_mapper.py (in-memory per-syllabus CO matrix)
+# ============================================================
+
+class _FakeCOCollection:
+    """Minimal stand-in for the course_outcomes Chroma collection."""
+
+    def __init__(self, rows):
+        self.rows = rows          # [(id, vector, metadata, document), ...]
+        self.get_calls = 0
+
+    def get(self, ids=None, where=None, include=None):
+        self.get_calls += 1
+        rows = [r for r in self.rows
+                if (ids is None or r[0] in ids) and (where is None or r[2]["syllabus_id"] == where["syllabus_id"])]
+        return {"ids": [r[0] for r in rows], "embeddings": [r[1] for r in rows],
+                "metadatas": [r[2] for r in rows], "documents": [r[3] for r in rows]}
+
+    def add(self, ids, embeddings, metadatas, documents):
+        self.rows += list(zip(ids, embeddings, metadatas, documents))
+
+    def delete(self, ids=None, where=None):
+        self.rows = [r for r in self.rows
+                     if not ((ids is None or r[0] in ids) and (where is None or r[2]["syllabus_id"] == where["syllabus_id"]))]
+
+    def query(self, **kwargs):
+        raise AssertionError("CO mapping must not query Chroma")
+
+    def count(self):
+        raise AssertionError("CO mapping must not count the collection")
+
+
+def _co_row(sid, co, vec):
+    meta = {"syllabus_id": sid, "course_code": "PEC-IT801B", "full_co_id": f"PEC-IT801B.{co}",
+            "display_co": co, "co_id": co}
+    return (f"PEC-IT801B::{sid}.{co}", vec, meta, f"{co} outcome text")
+
+
+class TestCoMapperMatrix:
+
+    def _mapper(self, rows, query_vec=(1, 0, 0)):
+        co_mapper = pytest.importorskip("services.co_mapper")
+        mapper = co_mapper.CoMapper.__new__(co_mapper.CoMapper)
+        mapper.embed_fn   = lambda texts, task="query": np.asarray([query_vec] * len(texts), dtype=np.float32)
+        mapper.collection = _FakeCOCollection(rows)
+        mapper._router    = CollectionRouter(_OneCollectionClient(mapper.collection), "course_outcomes")
+        mapper._co_to_pco = None
+        mapper._matrices  = {}
+        mapper._global    = None
+        mapper._lock      = threading.Lock()
+        mapper._versions  = None
+        mapper.load_all()
+        return mapper
+
+    def test_one_call_returns_best_and_ranked_alternatives(self):
+        mapper = self._mapper([
+            _co_row("S1", "CO1", [0, 1, 0]),
+            _co_row("S1", "CO2", [1, 0, 0]),
+            _co_row("S1", "CO3", [0.8, 0.6, 0]),
+            _co_row("S2", "CO1", [1, 0, 0]),
+        ])
+        match = mapper.map_question("q", "S1")
+        assert (match["display_co"], match["full_co_id"], match["similarity"]) == ("CO2", "PEC-IT801B.CO2", 1.0)
+        assert [a["display_co"] for a in match["alternatives"]] == ["CO3", "CO1"]
+        assert match["alternatives"][0]["similarity"] == 0.9        # (1 + cos) / 2, as Chroma reported
+        assert mapper.collection.get_calls == 1                     # startup load only
+
+    def test_wrappers_and_unknown_syllabus(self):
+        mapper = self._mapper([_co_row("S1", "CO1", [1, 0, 0])])
+        assert mapper.map_question_to_co("q", "S1") == "CO1"
+        assert "alternatives" not in mapper.map_question_to_co_full("q", "S1")
+        assert mapper.map_question("q", "S9") is None
+        assert mapper.map_question("q")["display_co"] == "CO1"      # unscoped: every syllabus
+
+    def test_ingest_and_clear_refresh_the_matrix(self):
+        mapper = self._mapper([], query_vec=(0, 1, 0))
+        assert mapper.add_cos("S1", [{"co_id": "CO1", "course_code": "X", "text": "t"}]) == 1
+        assert mapper.map_question_to_co("q", "S1") == "CO1"
+        mapper.clear_cos_for_syllabus("S1")
+        assert mapper.map_question("q", "S1") is None
+
+    def test_sees_cos_written_by_another_worker(self, tmp_path):
+        from vectorstores.syllabus_versions import SyllabusVersions
+        path = str(tmp_path / "co_versions.sqlite3")
+        reader, writer = self._mapper([], query_vec=(0, 1, 0)), self._mapper([], query_vec=(0, 1, 0))
+        writer.collection = reader.collection                     # same Chroma data
+        writer._router = reader._router
+        reader._versions, writer._versions = SyllabusVersions(path), SyllabusVersions(path)
+        assert reader.map_question("q", "S1") is None
+
+        writer.add_cos("S1", [{"co_id": "CO1", "course_code": "X", "text": "t"}])
+        assert reader.map_question_to_co("q", "S1") == "CO1"
+        writer.clear_cos_for_syllabus("S1")
+        assert reader.map_question("q", "S1") is None
+
+
+# ============================================================
+# FEATURE 22 — co_po_store.py / co_mapper.py (bulk CO ingestion)
+# ============================================================
+
+from services.co_po_store import CoPoStore
+
+
+class TestCoPoStore:
+
+    def test_mapping_survives_a_new_instance(self, tmp_path):
+        path = str(tmp_path / "co_po.sqlite3")
+        assert CoPoStore(path).upsert_many("S1", {"co1": "po2", "CO2": "PO1"}) == 2
+        store = CoPoStore(path)
+        assert store.get("S1", "co1") == "PO2"
+        assert store.get_mapping("S1") == {"CO1": "PO2", "CO2": "PO1"}
+        assert store.get("S2", "CO1") is None
+
+    def test_write_by_another_connection_invalidates_memory_copy(self, tmp_path):
+        path = str(tmp_path / "co_po.sqlite3")
+        reader, writer = CoPoStore(path), CoPoStore(path)
+        writer.upsert_many("S1", {"CO1": "PO1"})
+        assert reader.get("S1", "CO1") == "PO1"              # now cached in reader
+        writer.upsert_many("S1", {"CO1": "PO3"})
+        assert reader.get("S1", "CO1") == "PO3"
+        writer.delete("S1")
+        assert reader.get_mapping("S1") == {}
+
+
+class TestCoMapperBulkIngest:
+
+    def _mapper(self, rows, tmp_path):
+        co_mapper = pytest.importorskip("services.co_mapper")
+        mapper = co_mapper.CoMapper.__new__(co_mapper.CoMapper)
+        mapper.embed_fn   = lambda texts, task="passage": np.ones((len(texts), 3), dtype=np.float32)
+        mapper.collection = _FakeCOCollection(rows)
+        mapper._router    = CollectionRouter(_OneCollectionClient(mapper.collection), "course_outcomes")
+        mapper._co_to_pco = CoPoStore(str(tmp_path / "co_po.sqlite3"))
+        mapper._matrices  = {}
+        mapper._global    = None
+        mapper._lock      = threading.Lock()
+        mapper._versions  = None
+        return mapper
+
+    def test_one_duplicate_check_per_batch(self, tmp_path):
+        mapper = self._mapper([("X::X.CO1", [1, 0, 0], {"syllabus_id": "S1"}, "old")], tmp_path)
+        cos = [{"co_id": f"CO{i}", "course_code": "X", "text": f"t{i}"} for i in (1, 2, 3)]
+        cos.append({"co_id": "CO2", "course_code": "X", "text": "repeat"})
+        mapper.refresh = lambda sid: None
+        assert mapper.add_cos("S1", cos) == 2                 # CO1 stored already, CO2 repeated
+        assert mapper.collection.get_calls == 1
+        assert sorted(r[0] for r in mapper.collection.rows) == ["X::X.CO1", "X::X.CO2", "X::X.CO3"]
+
+    def test_pcos_persist_and_clear(self, tmp_path):
+        mapper = self._mapper([], tmp_path)
+        assert mapper.add_pcos("S1", [{"co_id": "co1", "pco_id": "po4"}]) == 1
+        assert CoPoStore(str(tmp_path / "co_po.sqlite3")).get("S1", "CO1") == "PO4"
+        mapper.clear_pcos_for_syllabus("S1")
+        assert mapper.get_pco_for_co("S1", "CO1") is None
+
+
+# ============================================================
+# FEATURE 23 — chunk_features.py (per-chunk feature store)
+# ============================================================
+
+from services.chunk_features import (
+    ChunkFeatureStore, compute_chunk_features, features_from_metadata, features_to_metadata,
+    is_reference_entry, keyword_set,
+)
+from services.chunk_cleaner import clean_retrieved_chunks
+
+_TOPIC_CHUNK = (
+    "Module 2: Hashing techniques, open addressing and chaining, collision resolution, "
+    "load factor analysis and rehashing strategies for dynamic tables"
+)
+_REFERENCE_CHUNK = "E-Commerce, M.M. Oka, EPH"
+
+
+class TestChunkFeatures:
+
+    def test_features_match_the_query_time_extractors(self):
+        feats = compute_chunk_features(_TOPIC_CHUNK)
+        assert feats.tokens == keyword_set(_TOPIC_CHUNK)
+        assert feats.module.startswith("Unit 2: Hashing")
+        assert (feats.reference, feats.noisy) == (False, False)
+        ref = compute_chunk_features(_REFERENCE_CHUNK)
+        assert ref.reference == is_reference_entry(_REFERENCE_CHUNK) is True
+        assert ref.noisy
+
+    def test_stored_module_label_wins(self):
+        assert compute_chunk_features(_TOPIC_CHUNK, "Unit 5: Trees").module == "Unit 5: Trees"
+
+    def test_metadata_round_trip_and_version_check(self):
+        meta  = features_to_metadata(compute_chunk_features(_TOPIC_CHUNK))
+        assert all(isinstance(v, (str, bool, int)) for v in meta.values())
+        again = features_from_metadata(meta)
+        assert again.tokens == keyword_set(_TOPIC_CHUNK) and again.module.startswith("Unit 2")
+        assert features_from_metadata({**meta, "features_v": 0}) is None
+        assert features_from_metadata({"module": ""}) is None
+
+    def test_store_prefers_memory_then_metadata_then_text(self):
+        store = ChunkFeatureStore()
+        store.put("S1_0", compute_chunk_features(_TOPIC_CHUNK), "S1")
+        assert store.get("S1_0", "ignored").module.startswith("Unit 2")
+        meta = {"syllabus_id": "S2", **features_to_metadata(compute_chunk_features(_REFERENCE_CHUNK))}
+        assert store.get("S2_0", _REFERENCE_CHUNK, meta).reference
+        assert store.get("S2_1", _TOPIC_CHUNK, {"syllabus_id": "S2", "module": ""}).tokens
+        assert (store.hits, store.loaded, store.computed) == (1, 1, 1)
+        assert store.drop_syllabus("S2") == 2 and len(store) == 1
+
+    def test_cleaner_uses_precomputed_flag(self):
+        chunks = [{"text": "short", "is_noisy": False}, {"text": _TOPIC_CHUNK, "is_noisy": True}]
+        assert [c["text"] for c in clean_retrieved_chunks(chunks)] == ["short"]
+
+
+# ============================================================
+# FEATURE 24 — bm25_index.py (dense + sparse fusion)
+# ============================================================
+
+from vectorstores.bm25_index import BM25Index, tokenize
+
+
+class TestBM25Index:
+
+    def _index(self, tmp_path):
+        index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+        index.add("S1", ["S1_0", "S1_1", "S1_2"], [
+            "RSA key generation and modular exponentiation",
+            "Symmetric ciphers: DES and AES block modes",
+            "Hash functions, MAC and digital signatures using RSA",
+        ])
+        return index
+
+    def test_tokenize_keeps_short_terms_and_drops_function_words(self):
+        assert tokenize("Explain the RSA and DES ciphers") == ["rsa", "des", "ciphers"]
+
+    def test_ranks_by_term_rarity_and_scopes_by_syllabus(self, tmp_path):
+        index = self._index(tmp_path)
+        hits = index.search("S1", "RSA modular exponentiation")
+        assert [cid for cid, _ in hits] == ["S1_0", "S1_2"]
+        assert hits[0][1] > hits[1][1] > 0
+        assert index.search("S2", "RSA") == []
+        assert index.search("S1", "quantum") == []
+
+    def test_persisted_and_invalidated_across_instances(self, tmp_path):
+        index = self._index(tmp_path)
+        other = BM25Index(str(tmp_path / "bm25.sqlite3"))
+        assert other.search("S1", "AES")[0][0] == "S1_1"
+        index.delete("S1")
+        assert other.search("S1", "AES") == []
+        assert other.syllabi() == set()
+
+
+class _FakeChunkCollection:
+    """Dense side for fusion tests: query() returns a fixed ranking (or by cosine when dense_ids is None)."""
+
+    def __init__(self, rows, dense_ids):
+        self.rows      = {r[0]: r for r in rows}     # id → (id, vector, meta, doc)
+        self.dense_ids = dense_ids
+        self.query_calls = self.get_calls = 0
+        self.wheres = []
+
+    def query(self, query_embeddings, n_results, where=None):
+        self.query_calls += 1
+        self.wheres.append(where)
+        q   = np.asarray(query_embeddings, dtype=np.float32)
+        out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for qv in q:
+            if self.dense_ids is None:
+                ids = sorted(self.rows, key=lambda i: -float(qv @ np.asarray(self.rows[i][1])))[:n_results]
+            else:
+                ids = self.dense_ids[:n_results]
+            out["ids"].append(ids)
+            out["documents"].append([self.rows[i][3] for i in ids])
+            out["metadatas"].append([self.rows[i][2] for i in ids])
+            out["distances"].append([1.0 - float(qv @ np.asarray(self.rows[i][1])) for i in ids])
+        return out
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        self.get_calls += 1
+        rows = [r for r in self.rows.values()
+                if (ids is None or r[0] in ids) and (where is None or r[2]["syllabus_id"] == where["syllabus_id"])]
+        rows = rows[:limit] if limit else rows
+        return {"ids": [r[0] for r in rows], "embeddings": np.asarray([r[1] for r in rows]),
+                "metadatas": [r[2] for r in rows], "documents": [r[3] for r in rows]}
+
+    def add(self, ids, embeddings, metadatas, documents):
+        for row in zip(ids, np.asarray(embeddings).tolist(), metadatas, documents):
+            self.rows[row[0]] = row
+
+    def delete(self, ids=None, where=None):
+        for cid in [r[0] for r in self.rows.values()
+                    if (ids is None or r[0] in ids) and (where is None or r[2]["syllabus_id"] == where["syllabus_id"])]:
+            del self.rows[cid]
+
+    def count(self):
+        return len(self.rows)
+
+
+class _FakeChromaClient:
+
+    def __init__(self, collections=None):
+        self.collections = dict(collections or {})
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, _FakeChunkCollection([], dense_ids=None))
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+def _use_collection(store, collection, catalog=None):
+    """Point a VectorStore built with __new__ at a fake collection (the shared one)."""
+    store._router    = CollectionRouter(_FakeChromaClient({"syllabi": collection}), "syllabi", catalog)
+    store.collection = collection
+
+
+class TestVectorStoreFusion:
+
+    def _store(self, tmp_path, fusion="rrf", exact=False):
+        chroma_store = pytest.importorskip("vectorstores.chroma_store")
+        store = chroma_store.VectorStore.__new__(chroma_store.VectorStore)
+        rows = [
+            ("S1_0", [1.0, 0.0], {"syllabus_id": "S1"}, "Block cipher modes of operation"),
+            ("S1_1", [0.9, 0.436], {"syllabus_id": "S1"}, "Stream ciphers and keystreams"),
+            ("S1_2", [0.6, 0.8], {"syllabus_id": "S1"}, "Diffie-Hellman key exchange protocol"),
+        ]
+        _use_collection(store, _FakeChunkCollection(rows, dense_ids=["S1_0", "S1_1"]))   # S1_2 beyond the dense top
+        store.lexical_index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+        store.lexical_index.add("S1", [r[0] for r in rows], [r[3] for r in rows])
+        store.embed_fn = lambda texts, task="query": np.asarray([[1.0, 0.0]] * len(texts), dtype=np.float32)
+        store.fusion, store.fusion_candidates, store.rrf_k, store.dense_weight = fusion, 20, 60.0, 0.7
+        store.exact_search, store.exact_max_chunks = exact, 20_000
+        store._matrices, store._lock = {}, threading.Lock()
+        store._versions = None
+        return store
+
+    def test_lexical_only_candidate_enters_with_its_true_distance(self, tmp_path):
+        result = self._store(tmp_path).query("Diffie-Hellman exchange", k=2, syllabus_id="S1")
+        assert set(result["ids"][0]) == {"S1_0", "S1_2"}
+        dist = dict(zip(result["ids"][0], result["distances"][0]))
+        assert dist["S1_2"] == pytest.approx(0.4, abs=1e-6)
+        assert result["documents"][0][result["ids"][0].index("S1_2")].startswith("Diffie")
+
+    def test_unfiltered_query_is_dense_only(self, tmp_path):
+        result = self._store(tmp_path).query("Diffie-Hellman exchange", k=2)
+        assert result["ids"][0] == ["S1_0", "S1_1"]
+
+    def test_query_many_matches_query(self, tmp_path):
+        store = self._store(tmp_path, fusion="weighted")
+        questions = ["Diffie-Hellman exchange", "stream ciphers"]
+        batch = store.query_many(store.embed_fn(questions), k=2, syllabus_id="S1", query_texts=questions)
+        assert [r["ids"] for r in batch] == [store.query(q, k=2, syllabus_id="S1")["ids"] for q in questions]
+
+    @pytest.mark.parametrize("exact", [False, True])
+    def test_query_many_matches_query_when_dense_rankings_differ(self, tmp_path, exact):
+        # "Diffie-Hellman" is S1_2 for BM25 but outside its own dense top 1,
+        # while it IS the dense top 1 of the other question in the batch
+        store = self._store(tmp_path, exact=exact)
+        store.collection.dense_ids = None                         # rank by cosine per query
+        store.fusion_candidates = 1
+        vectors = {"Diffie-Hellman exchange": [1.0, 0.0], "key exchange protocol": [0.6, 0.8]}
+        store.embed_fn = lambda texts, task="query": np.asarray([vectors[t] for t in texts], dtype=np.float32)
+        questions = list(vectors)
+        batch = store.query_many(questions, k=2, syllabus_id="S1")
+        single = [store.query(q, k=2, syllabus_id="S1") for q in questions]
+        assert [r["ids"] for r in batch] == [r["ids"] for r in single]
+        assert "S1_2" in batch[0]["ids"][0]
+
+
+# ============================================================
+# FEATURE 25 — chroma_store.py (exact per-syllabus search)
+# ============================================================
+
+from vectorstores.syllabus_versions import SyllabusVersions
+
+
+class TestExactSyllabusSearch:
+
+    def _store(self, tmp_path, rows=None, **kwargs):
+        store = TestVectorStoreFusion()._store(tmp_path, exact=True, **kwargs)
+        store.lexical_index = None
+        if rows is not None:
+            _use_collection(store, _FakeChunkCollection(rows, dense_ids=[]))
+        return store
+
+    def test_exact_top_k_without_hnsw(self, tmp_path):
+        rows = [(f"S1_{i}", [np.cos(a), np.sin(a)], {"syllabus_id": "S1"}, f"chunk {i}")
+                for i, a in enumerate(np.linspace(0, 1.5, 12))]
+        rows.append(("S2_0", [1.0, 0.0], {"syllabus_id": "S2"}, "other subject"))
+        store = self._store(tmp_path, rows)
+        result = store.query("q", k=3, syllabus_id="S1")          # query vector is [1, 0]
+        assert result["ids"][0] == ["S1_0", "S1_1", "S1_2"]
+        assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+        assert store.collection.query_calls == 0
+        store.query("q", k=3, syllabus_id="S1")
+        assert store.collection.get_calls == 1                    # matrix loaded once
+
+    def test_unfiltered_and_oversized_fall_back_to_hnsw(self, tmp_path):
+        store = self._store(tmp_path)
+        store.query("q", k=2)
+        store.exact_max_chunks = 1
+        store.query("q", k=2, syllabus_id="S1")
+        assert store.collection.query_calls == 2
+
+    def test_query_many_and_fusion_use_the_matrix(self, tmp_path):
+        store = self._store(tmp_path)
+        store.lexical_index = TestVectorStoreFusion()._store(tmp_path).lexical_index
+        questions = ["Diffie-Hellman exchange", "stream ciphers"]
+        batch = store.query_many(store.embed_fn(questions), k=2, syllabus_id="S1", query_texts=questions)
+        assert batch[0]["ids"][0] == ["S1_2", "S1_0"]            # in both rankings → first
+        assert (store.collection.query_calls, store.collection.get_calls) == (0, 1)
+
+    def test_refresh_reloads_after_ingest(self, tmp_path):
+        store = self._store(tmp_path)
+        assert len(store.get_matrix("S1")) == 3
+        store.collection.rows["S1_3"] = ("S1_3", [0.0, 1.0], {"syllabus_id": "S1"}, "new")
+        assert len(store.get_matrix("S1")) == 3
+        store.refresh("S1")
+        assert len(store.get_matrix("S1")) == 4
+
+    def test_write_by_another_worker_drops_matrix_and_features(self, tmp_path):
+        path = str(tmp_path / "syllabus_versions.sqlite3")
+        reader, writer = self._store(tmp_path), self._store(tmp_path)
+        writer.collection = reader.collection                     # same Chroma data
+        writer._router = reader._router
+        reader._versions, writer._versions = SyllabusVersions(path), SyllabusVersions(path)
+        reader.chunk_features, writer.chunk_features = ChunkFeatureStore(), ChunkFeatureStore()
+        reader.chunk_features.put("S1_0", compute_chunk_features("stale text", None), "S1")
+        assert len(reader.get_matrix("S1")) == 3
+
+        writer.delete_syllabus("S1")                              # another process deletes S1
+        assert reader.query("q", k=3, syllabus_id="S1")["ids"][0] == []
+        assert len(reader.chunk_features) == 0
+
+
+class TestSyllabusVersions:
+
+    def test_reports_only_other_processes_writes(self, tmp_path):
+        path = str(tmp_path / "syllabus_versions.sqlite3")
+        mine, other = SyllabusVersions(path), SyllabusVersions(path)
+        mine.bump("S1")
+        assert mine.changed() == set()
+        assert other.changed() == {"S1"}
+        assert other.changed() == set()                           # reported once
+        other.bump("*")
+        assert mine.changed() == {"*"}
+
+
+# ============================================================
+# FEATURE 26 — chroma_store.py (VectorStore.query_many)
+# ============================================================
+
+class TestQueryMany:
+
+    def _store(self, tmp_path):
+        rows = [
+            ("S1_0", [1.0, 0.0], {"syllabus_id": "S1"}, "rsa"),
+            ("S1_1", [0.0, 1.0], {"syllabus_id": "S1"}, "aes"),
+            ("S2_0", [0.0, 1.0], {"syllabus_id": "S2"}, "sql"),
+            ("S2_1", [1.0, 0.0], {"syllabus_id": "S2"}, "joins"),
+        ]
+        store = TestExactSyllabusSearch()._store(tmp_path, rows)
+        vectors = {"rsa q": [1.0, 0.0], "aes q": [0.0, 1.0]}
+        store.embed_calls = 0
+
+        def embed(texts, task="query"):
+            store.embed_calls += 1
+            return np.asarray([vectors[t] for t in texts], dtype=np.float32)
+        store.embed_fn = embed
+        return store
+
+    def test_texts_are_embedded_in_one_call(self, tmp_path):
+        store = self._store(tmp_path)
+        batch = store.query_many(["rsa q", "aes q"], k=1, syllabus_id="S1")
+        assert store.embed_calls == 1
+        assert [r["ids"][0] for r in batch] == [["S1_0"], ["S1_1"]]
+        assert batch == [store.query(q, k=1, syllabus_id="S1") for q in ("rsa q", "aes q")]
+
+    def test_per_query_syllabi_keep_input_order(self, tmp_path):
+        store = self._store(tmp_path)
+        batch = store.query_many(["rsa q", "rsa q", "aes q"], k=1, syllabus_id=["S2", "S1", "S2"])
+        assert [r["ids"][0] for r in batch] == [["S2_1"], ["S1_0"], ["S2_0"]]
+        assert store.collection.get_calls == 2                    # one matrix per syllabus
+
+    def test_embeddings_input_and_empty_batch(self, tmp_path):
+        store = self._store(tmp_path)
+        assert store.query_many([], k=1, syllabus_id="S1") == []
+        batch = store.query_many(np.asarray([[0.0, 1.0]]), k=2, syllabus_id=["S1"])
+        assert batch[0]["ids"][0] == ["S1_1", "S1_0"] and store.embed_calls == 0
+
+
+# ============================================================
+# FEATURE 27 — partitions.py (per-syllabus Chroma collections)
+# ============================================================
+
+import re
+
+from vectorstores.partitions import PartitionCatalog, partition_name
+
+
+class TestPartitionCatalog:
+
+    def test_persisted_mapping_per_store(self, tmp_path):
+        catalog = PartitionCatalog(str(tmp_path / "catalog.sqlite3"))
+        catalog.put("syllabi", "S1", "syllabi-a")
+        catalog.put("concept_store", "S1", "concept_store-a")
+        other = PartitionCatalog(str(tmp_path / "catalog.sqlite3"))
+        assert other.get("syllabi", "S1") == "syllabi-a"
+        assert other.list("concept_store") == {"S1": "concept_store-a"}
+        catalog.remove("syllabi", "S1")
+        assert other.get("syllabi", "S1") is None
+
+    def test_partition_names_are_stable_and_chroma_safe(self):
+        name = partition_name("course_outcomes", "IT-VIII-PEC-IT801B")
+        assert name == partition_name("course_outcomes", "IT-VIII-PEC-IT801B")
+        assert name != partition_name("course_outcomes", "IT-VIII-PEC-IT801C")
+        assert re.fullmatch(r"[A-Za-z0-9._-]{3,63}", name)
+
+
+class TestCollectionRouter:
+
+    def test_shared_layout_filters_by_syllabus(self):
+        router = CollectionRouter(_FakeChromaClient(), "syllabi")
+        assert router.for_syllabus("S1") is router.shared
+        assert router.where("S1") == {"syllabus_id": "S1"}
+        assert router.drop("S1") is False
+
+    def test_partitioned_layout_creates_routes_and_drops(self, tmp_path):
+        client = _FakeChromaClient()
+        router = CollectionRouter(client, "syllabi", PartitionCatalog(str(tmp_path / "catalog.sqlite3")))
+        assert router.for_syllabus("S1") is None
+        coll = router.for_syllabus("S1", create=True)
+        assert router.for_syllabus("S1") is coll and router.where("S1") is None
+        assert router.collections() == [coll]
+        router.shared.add(["old_0"], [[1.0, 0.0]], [{"syllabus_id": "S0"}], ["not migrated"])
+        assert router.collections() == [coll, router.shared]
+        assert router.drop("S1") is True
+        assert partition_name("syllabi", "S1") not in client.collections
+        assert router.syllabi() == []
+
+    def test_delete_also_clears_unmigrated_shared_rows(self, tmp_path):
+        router = CollectionRouter(_FakeChromaClient(), "syllabi", PartitionCatalog(str(tmp_path / "catalog.sqlite3")))
+        router.for_syllabus("S1", create=True)
+        router.shared.add(["old_0", "old_1"], [[1.0, 0.0]] * 2, [{"syllabus_id": "S1"}, {"syllabus_id": "S2"}], ["a", "b"])
+        router.delete("S1")
+        assert router.syllabi() == [] and sorted(router.shared.rows) == ["old_1"]
+
+
+class TestPartitionedVectorStore:
+
+    def _store(self, tmp_path):
+        store = TestExactSyllabusSearch()._store(tmp_path, rows=[])
+        store.exact_search = False
+        _use_collection(store, store.collection, PartitionCatalog(str(tmp_path / "catalog.sqlite3")))
+        store.chunk_features = ChunkFeatureStore()
+        store.embed_fn = lambda texts, task="query": np.asarray(
+            [[1.0, 0.0] if "rsa" in t else [0.0, 1.0] for t in texts], dtype=np.float32)
+        store.add_syllabus("S1", ["rsa keys", "aes rounds"])
+        store.add_syllabus("S2", ["sql joins", "rsa in databases"])
+        return store
+
+    def test_each_syllabus_in_its_own_collection(self, tmp_path):
+        store = self._store(tmp_path)
+        part = store._router.for_syllabus("S1")
+        assert sorted(part.rows) == ["S1_0", "S1_1"] and store.collection.count() == 0
+        assert store.count() == 4 and store.exists("S2")
+        result = store.query("rsa q", k=1, syllabus_id="S1")
+        assert result["ids"][0] == ["S1_0"] and part.wheres == [None]
+
+    def test_global_query_merges_partitions_by_distance(self, tmp_path):
+        result = self._store(tmp_path).query("rsa q", k=2)
+        assert sorted(result["ids"][0]) == ["S1_0", "S2_1"]
+        assert result["distances"][0] == sorted(result["distances"][0])
+
+    def test_delete_drops_the_collection(self, tmp_path):
+        store = self._store(tmp_path)
+        assert store.delete_syllabus("S1")
+        assert not store.exists("S1") and store.count() == 2
+        assert partition_name("syllabi", "S1") not in store._router.client.collections
+        assert store.get_chunks("S1")["ids"] == []
+
+    def test_delete_removes_rows_not_migrated_yet(self, tmp_path):
+        store = self._store(tmp_path)
+        store.collection.add(["old_S1", "old_S3"], [[1.0, 0.0]] * 2,
+                             [{"syllabus_id": "S1"}, {"syllabus_id": "S3"}], ["rsa legacy", "other"])
+        assert store.delete_syllabus("S1")
+        assert sorted(store.collection.rows) == ["old_S3"] and store.exists("S2")
+
+
+# ============================================================
+# FEATURE 28 — embedder.py (backend selection)
+# ============================================================
+import importlib
+
+class _FakeSentenceTransformer:
+    """Records how a backend loader built the model; encodes nothing."""
+
+    def __init__(self, name, device=None, backend="torch", model_kwargs=None):
+        self.name, self.device, self.backend, self.model_kwargs = name, device, backend, model_kwargs
+        self.saved_to = None
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def save_pretrained(self, path):
+        self.saved_to = path
+
+
+def _fake_torch(cuda=False, mps=None):
+    backends = types.SimpleNamespace()
+    if mps is not None:
+        backends.mps = types.SimpleNamespace(is_available=lambda: mps)
+    return types.SimpleNamespace(cuda=types.SimpleNamespace(is_available=lambda: cuda), backends=backends)
+
+
+class TestEmbedderBackends:
+
+    @pytest.fixture(autouse=True)
+    def _embedder(self, monkeypatch):
+        # Import models.embedder against a fake sentence_transformers, then put the real entry back
+        self.exports = []
+        fake_st = types.SimpleNamespace(
+            SentenceTransformer=_FakeSentenceTransformer,
+            export_dynamic_quantized_onnx_model=lambda model, quantization_config, model_name_or_path:
+                self.exports.append((quantization_config, model_name_or_path)),
+        )
+        monkeypatch.setitem(sys.modules, "sentence_transformers", fake_st)
+        saved = sys.modules.pop("models.embedder", None)
+        try:
+            self.embedder = importlib.import_module("models.embedder")
+            yield
+        finally:
+            sys.modules.pop("models.embedder", None)
+            if saved is not None:
+                sys.modules["models.embedder"] = saved
+
+    def test_explicit_device_skips_torch_probe(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "torch", None)   # importing torch would fail
+        assert self.embedder._resolve_device("cuda:1") == "cuda:1"
+
+    @pytest.mark.parametrize("cuda, mps, expected", [
+        (True,  True,  "cuda"),
+        (False, True,  "mps"),
+        (False, False, "cpu"),
+        (False, None,  "cpu"),    # torch build without the mps backend
+    ])
+    def test_auto_device_probe_order(self, monkeypatch, cuda, mps, expected):
+        monkeypatch.setitem(sys.modules, "torch", _fake_torch(cuda=cuda, mps=mps))
+        assert self.embedder._resolve_device("auto") == expected
+        assert self.embedder._resolve_device("") == expected
+
+    def test_torch_backend_uses_resolved_device(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "torch", _fake_torch(cuda=True))
+        emb = self.embedder.Embedder("fake/e5", backend="torch", device="auto", use_cache=False)
+        assert emb.device == "cuda" and emb.model.device == "cuda" and emb.model.backend == "torch"
+        assert emb.dim == 8 and emb.describe() == {"model": "fake/e5", "backend": "torch", "device": "cuda"}
+
+    def test_onnx_backend_is_cpu_only(self):
+        emb = self.embedder.Embedder("fake/e5", backend="onnx", device="cuda", use_cache=False)
+        assert emb.device == "cpu" and emb.model.device == "cpu" and emb.model.backend == "onnx"
+
+    def test_onnx_int8_exports_once(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(self.embedder, "EMBEDDING_EXPORT_DIR", str(tmp_path))
+        emb = self.embedder.Embedder("fake/e5", backend="onnx-int8", use_cache=False)
+        local_dir = str(tmp_path / "fake__e5")
+        file_name = f"onnx/model_qint8_{self.embedder.EMBEDDING_QUANT_CONFIG}.onnx"
+        assert emb.model.name == local_dir and emb.model.model_kwargs == {"file_name": file_name}
+        assert self.exports == [(self.embedder.EMBEDDING_QUANT_CONFIG, local_dir)]
+
+        os.makedirs(os.path.dirname(os.path.join(local_dir, file_name)))
+        open(os.path.join(local_dir, file_name), "wb").close()
+        self.embedder.Embedder("fake/e5", backend="onnx-int8", use_cache=False)
+        assert len(self.exports) == 1
+
+    def test_unknown_backend_rejected_before_loading(self, monkeypatch):
+        loaded = []
+        monkeypatch.setitem(self.embedder.BACKENDS, "torch", lambda name, device: loaded.append(name))
+        with pytest.raises(ValueError, match="Unknown embedding backend 'tensorrt'"):
+            self.embedder.Embedder("fake/e5", backend="tensorrt", use_cache=False)
+        assert loaded == []
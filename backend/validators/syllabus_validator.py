@@ -5,6 +5,7 @@ from llama_cpp import Llama
 
 from config import LLM_MODEL_PATH, LLM_RUNTIME
 from services.grounding_validator import is_explicitly_grounded
+from services.priority_gate import PriorityGate
 
 # --------------------------------------------------
 # Model loading (lazy singleton)
@@ -12,6 +13,10 @@ from services.grounding_validator import is_explicitly_grounded
 
 _LLM = None
 
+# One prompt at a time on the shared model; HTTP request threads go ahead
+# of background analysis-job workers (services/analysis_jobs.py).
+LLM_GATE = PriorityGate()
+
 def get_llm():
     global _LLM
 
@@ -107,11 +112,12 @@ Rules:
 - DO NOT infer modern applications from generic concepts.
 """
 
-    response = llm(
-        prompt,
-        max_tokens=150,  # Increased slightly to prevent truncation
-        stop=["</s>", "[INST]"]
-    )
+    with LLM_GATE.slot():
+        response = llm(
+            prompt,
+            max_tokens=150,  # Increased slightly to prevent truncation
+            stop=["</s>", "[INST]"]
+        )
 
     text = response["choices"][0]["text"]
 
@@ -0,0 +1,199 @@
+"""
+vectorstores/bm25_index.py
+--------------------------
+Persistent per-syllabus BM25 index over the syllabus chunks.
+
+The 20% lexical part of the hybrid score only re-scores the k chunks the
+dense (HNSW) search already returned, so a chunk that matches the exact
+technical terms of a question but ranks k+1 semantically is never seen.
+This index is an independent candidate generator: VectorStore.query fuses
+its ranking with the dense one (reciprocal rank or weighted, see
+VectorStore._fuse) before the top k are handed to the hybrid scorer.
+
+Term frequencies per chunk are computed once at ingestion and kept in
+SQLite (WAL), one row per chunk.  A syllabus is loaded into memory on first
+use as postings of pre-computed BM25 weights — BM25's per-(term, chunk)
+weight does not depend on the query — so a search is one array addition
+per query term.  As in CoPoStore, PRAGMA data_version drops the memory copy
+when another worker process writes.
+
+Usage:
+    index = BM25Index("data/bm25_index.sqlite3")
+    index.add("IT-VIII-PEC-IT801B", ["IT-VIII-PEC-IT801B_0", ...], ["RSA key generation ...", ...])
+    index.search("IT-VIII-PEC-IT801B", "Explain RSA", top_n=20)
+    # -> [("IT-VIII-PEC-IT801B_0", 4.21), ...]   (best first, score > 0 only)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Short tokens are kept ("RSA", "DES", "TCP" are exactly the terms that
+# matter); only function words and exam instruction verbs are dropped —
+# IDF handles the rest.
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how in into is it its of on or "
+    "that the their then there these this to was what when where which why with "
+    "explain describe discuss define write short note notes give".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class _SyllabusIndex:
+    """In-memory BM25 postings of one syllabus."""
+
+    __slots__ = ("ids", "postings")
+
+    def __init__(self, ids: List[str], postings: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        self.ids      = ids         # chunk ids, position = doc index
+        self.postings = postings    # term → (doc indices int32, BM25 weights float32)
+
+
+class BM25Index:
+    """Chunk-level BM25 per syllabus, persisted in SQLite, served from memory."""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1   = float(k1)
+        self.b    = float(b)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _SyllabusIndex] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bm25_chunks ("
+            "  syllabus_id TEXT NOT NULL,"
+            "  chunk_id    TEXT NOT NULL,"
+            "  length      INTEGER NOT NULL,"
+            "  terms       TEXT NOT NULL,"          # JSON {term: tf}
+            "  PRIMARY KEY (syllabus_id, chunk_id)"
+            ")"
+        )
+        self._conn.commit()
+        self._data_version = self._version()
+
+    def _version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self) -> None:
+        version = self._version()
+        if version != self._data_version:
+            self._data_version = version
+            self._indexes.clear()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def add(self, syllabus_id: str, chunk_ids: Sequence[str], texts: Sequence[str]) -> int:
+        """Index (or re-index) chunks of one syllabus in ONE transaction.  Returns chunks written."""
+        rows = []
+        for chunk_id, text in zip(chunk_ids, texts):
+            tokens = tokenize(text)
+            rows.append((syllabus_id, chunk_id, len(tokens), json.dumps(Counter(tokens))))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bm25_chunks(syllabus_id, chunk_id, length, terms) VALUES (?, ?, ?, ?)", rows
+            )
+            self._indexes.pop(syllabus_id, None)
+        return len(rows)
+
+    def delete(self, syllabus_id: str) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM bm25_chunks WHERE syllabus_id = ?", (syllabus_id,))
+            self._indexes.pop(syllabus_id, None)
+        return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bm25_chunks")
+            self._indexes.clear()
+
+    def syllabi(self) -> set:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT DISTINCT syllabus_id FROM bm25_chunks")}
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _load(self, syllabus_id: str) -> _SyllabusIndex:
+        index = self._indexes.get(syllabus_id)
+        if index is not None:
+            return index
+        rows = self._conn.execute(
+            "SELECT chunk_id, length, terms FROM bm25_chunks WHERE syllabus_id = ? ORDER BY rowid", (syllabus_id,)
+        ).fetchall()
+        ids     = [r[0] for r in rows]
+        lengths = np.asarray([r[1] for r in rows], dtype=np.float32)
+        avgdl   = float(lengths.mean()) if len(rows) and lengths.mean() > 0 else 1.0
+        norm    = self.k1 * (1.0 - self.b + self.b * lengths / avgdl)      # per-chunk length normalisation
+
+        postings: Dict[str, Tuple[list, list]] = {}
+        for i, (_, _, terms) in enumerate(rows):
+            for term, tf in json.loads(terms).items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(i)
+                tfs.append(tf)
+
+        n = len(rows)
+        weighted = {}
+        for term, (docs, tfs) in postings.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tfs  = np.asarray(tfs, dtype=np.float32)
+            idf  = math.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            weighted[term] = (docs, (idf * tfs * (self.k1 + 1.0) / (tfs + norm[docs])).astype(np.float32))
+
+        index = self._indexes[syllabus_id] = _SyllabusIndex(ids, weighted)
+        return index
+
+    def scores(self, syllabus_id: str, query_text: str) -> Tuple[List[str], np.ndarray]:
+        """(chunk ids, BM25 score of every chunk) for one query."""
+        with self._lock:
+            self._sync()
+            index = self._load(syllabus_id)
+        out = np.zeros(len(index.ids), dtype=np.float32)
+        for term in set(tokenize(query_text)):
+            posting = index.postings.get(term)
+            if posting is not None:
+                out[posting[0]] += posting[1]
+        return index.ids, out
+
+    def search(self, syllabus_id: Optional[str], query_text: str, top_n: int = 20) -> List[Tuple[str, float]]:
+        """Best chunks of one syllabus for a query → [(chunk_id, score)], score > 0 only."""
+        if not syllabus_id or not query_text:
+            return []
+        ids, scores = self.scores(syllabus_id, query_text)
+        if not len(ids):
+            return []
+        top_n = min(top_n, len(ids))
+        top   = np.argpartition(-scores, top_n - 1)[:top_n]
+        top   = top[np.argsort(-scores[top], kind="stable")]
+        return [(ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def search_many(self, syllabus_id: Optional[str], query_texts: Sequence[str], top_n: int = 20):
+        return [self.search(syllabus_id, q, top_n) for q in query_texts]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM bm25_chunks").fetchone()[0]
+        return {"chunks": int(stored), "loaded_syllabi": len(self._indexes)}
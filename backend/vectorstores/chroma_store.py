@@ -1,7 +1,17 @@
 import os
 os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
 
+import threading
+from typing import Dict
+
 import chromadb
+import numpy as np
+
+from services.chunk_features import (
+    ChunkFeatureStore, compute_chunk_features, features_from_metadata, features_to_metadata,
+)
+from vectorstores.partitions import CollectionRouter
+from vectorstores.syllabus_versions import ALL_SYLLABI, SyllabusVersions
 
 # ============================================
 # Function to fully disable telemetry at runtime
@@ -43,21 +53,132 @@ disable_chroma_telemetry()
 
 
 
+def _empty_result():
+    return {"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}
+
+
+def _merge_by_distance(results, n_results):
+    """Per-collection query results → one result holding each query's n nearest overall."""
+    n_queries = max((len(r.get("ids") or []) for r in results), default=0)
+    out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    for i in range(n_queries):
+        rows = []
+        for r in results:
+            lists = {key: (r.get(key) or []) for key in out}
+            if i >= len(lists["ids"]):
+                continue
+            rows.extend(zip(lists["distances"][i], lists["ids"][i], lists["documents"][i], lists["metadatas"][i]))
+        rows.sort(key=lambda row: row[0])
+        rows = rows[:n_results]
+        out["distances"].append([row[0] for row in rows])
+        out["ids"].append([row[1] for row in rows])
+        out["documents"].append([row[2] for row in rows])
+        out["metadatas"].append([row[3] for row in rows])
+    return out
+
+
+def _normalize(embeddings) -> np.ndarray:
+    mat = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if mat.ndim != 2 or mat.shape[0] == 0:
+        return np.empty((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class _ChunkMatrix:
+    """Unit-normalised chunk embeddings of one syllabus, with their Chroma rows."""
+
+    __slots__ = ("ids", "matrix", "documents", "metadatas", "positions")
+
+    def __init__(self, ids, matrix, documents, metadatas):
+        self.ids       = ids
+        self.matrix    = matrix            # (n_chunks, dim) float32, unit rows
+        self.documents = documents
+        self.metadatas = metadatas
+        self.positions = {cid: i for i, cid in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+
 class VectorStore:
-    def __init__(self, embed_fn, persist_dir="./data/vector_db"):
+    """
+    Syllabus chunks in the ``syllabi`` Chroma collection.
+
+    With a lexical_index (vectorstores/bm25_index.py), syllabus-filtered
+    queries draw ``fusion_candidates`` chunks from both the dense search and
+    BM25 and keep the best k of the fused ranking:
+
+        "rrf"       sum of 1 / (rrf_k + rank) over the two rankings
+        "weighted"  dense_weight * cosine + (1 - dense_weight) * BM25 / max BM25
+
+    Results keep the usual shape; chunks found only by BM25 get their true
+    cosine distance, so downstream hybrid scoring is unchanged.
+
+    With exact_search, the dense side of a syllabus-filtered query is an
+    exact NumPy top-k over that syllabus's normalised embedding matrix
+    (loaded from the collection on first use, refreshed on ingest/delete),
+    instead of a metadata-filtered HNSW search over every syllabus: a
+    subject has a few hundred chunks, so one matrix product is faster and
+    never loses recall to the filter.  Syllabi above exact_max_chunks, and
+    global or metadata_filter searches, still go to HNSW.
+
+    Matrices and chunk features are per-process copies.  Every ingest /
+    delete bumps the syllabus in a shared SyllabusVersions table, and each
+    query first drops the copies of syllabi other workers have changed.
+
+    With a partition_catalog (vectorstores/partitions.py), every syllabus
+    lives in its own collection: filtered searches need no where clause,
+    deleting a syllabus drops its collection, and global searches query
+    each partition and merge by distance.  ``collection`` is then the shared
+    collection holding only rows not yet migrated.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        persist_dir="./data/vector_db",
+        lexical_index=None,
+        fusion="rrf",
+        fusion_candidates=20,
+        rrf_k=60,
+        dense_weight=0.7,
+        exact_search=True,
+        exact_max_chunks=20_000,
+        partition_catalog=None,
+        versions_path=None,
+    ):
         self.embed_fn = embed_fn  # we fully control embedding generation
         self.client = chromadb.PersistentClient(path=persist_dir)
 
-        # Create or get a collection WITHOUT Chroma auto-embedding
-        self.collection = self.client.get_or_create_collection(
-            name="syllabi",
-            metadata={"hnsw:space": "cosine"}  # ensure cosine scoring
+        # Collections WITHOUT Chroma auto-embedding, cosine scoring: the shared
+        # "syllabi" one, or one per syllabus when a catalog is given
+        self._router    = CollectionRouter(self.client, "syllabi", partition_catalog)
+        self.collection = self._router.shared
+        # Per-chunk token sets / flags / module labels, keyed by chunk id
+        self.chunk_features = ChunkFeatureStore()
+
+        self.lexical_index     = lexical_index
+        self.fusion            = fusion
+        self.fusion_candidates = int(fusion_candidates)
+        self.rrf_k             = float(rrf_k)
+        self.dense_weight      = float(dense_weight)
+
+        self.exact_search     = exact_search
+        self.exact_max_chunks = int(exact_max_chunks)
+        self._matrices: Dict[str, _ChunkMatrix] = {}   # syllabus_id → chunk matrix
+        self._lock = threading.Lock()
+        # Shared with the other worker processes on this persist_dir
+        self._versions = SyllabusVersions(
+            versions_path or os.path.join(os.path.dirname(os.path.abspath(persist_dir)), "syllabus_versions.sqlite3")
         )
 
     def add_syllabus(self, syllabus_id, chunks, extra_meta=None):
         """
         chunks: list of str  OR  list of (text, module_label) tuples.
-        Module labels are stored in ChromaDB metadata for later retrieval.
+        Module labels are stored in ChromaDB metadata for later retrieval,
+        together with the chunk's query-invariant features (chunk_features.py).
         extra_meta: dict of additional metadata (e.g. department, subject_name) to store with every chunk.
         """
         # Normalise to (text, label) pairs
@@ -69,22 +190,76 @@ class VectorStore:
                 pairs.append((c, None))
 
         texts      = [p[0] for p in pairs]
-        embeddings = self.embed_fn(texts, task="passage")
+        embeddings = self.embed_fn(texts, task="passage")   # (n, dim) float32 — Chroma accepts ndarrays
 
         ids       = [f"{syllabus_id}_{i}" for i in range(len(texts))]
         metadatas = []
+        features  = []
         for t, m in pairs:
+            feats = compute_chunk_features(t, m)
             meta = {"syllabus_id": syllabus_id, "chunk": t, "module": m or ""}
+            meta.update(features_to_metadata(feats))
             if extra_meta:
                 meta.update(extra_meta)
             metadatas.append(meta)
+            features.append(feats)
 
-        self.collection.add(
+        self._router.for_syllabus(syllabus_id, create=True).add(
             ids=ids,
             embeddings=embeddings,
             metadatas=metadatas,
             documents=texts
         )
+        for chunk_id, feats in zip(ids, features):
+            self.chunk_features.put(chunk_id, feats, syllabus_id)
+        if self.lexical_index is not None:
+            self.lexical_index.add(syllabus_id, ids, texts)
+        self._written(syllabus_id)
+
+    def backfill_chunk_features(self) -> int:
+        """
+        Load every chunk's features into memory, computing and persisting them
+        for chunks ingested before they existed (or under an older version).
+        Returns the number of chunks backfilled.
+        """
+        backfilled = 0
+        for coll in self._router.collections():
+            data  = coll.get(include=["documents", "metadatas"])
+            stale_ids, stale_metas = [], []
+            for chunk_id, doc, meta in zip(data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or []):
+                meta  = dict(meta or {})
+                feats = features_from_metadata(meta)
+                if feats is None:
+                    feats = compute_chunk_features(doc or "", meta.get("module"))
+                    meta.update(features_to_metadata(feats))
+                    stale_ids.append(chunk_id)
+                    stale_metas.append(meta)
+                self.chunk_features.put(chunk_id, feats, meta.get("syllabus_id"))
+            if stale_ids:
+                coll.update(ids=stale_ids, metadatas=stale_metas)
+                backfilled += len(stale_ids)
+        if backfilled:
+            with self._lock:
+                self._matrices.clear()
+            self._bump(ALL_SYLLABI)
+        return backfilled
+
+    def backfill_lexical_index(self) -> int:
+        """Index syllabi stored before the BM25 index existed.  Returns syllabi indexed."""
+        if self.lexical_index is None:
+            return 0
+        data    = self.get_chunks(include=["documents", "metadatas"])
+        indexed = self.lexical_index.syllabi()
+        pending = {}
+        for chunk_id, doc, meta in zip(data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or []):
+            sid = (meta or {}).get("syllabus_id")
+            if sid and sid not in indexed:
+                ids, docs = pending.setdefault(sid, ([], []))
+                ids.append(chunk_id)
+                docs.append(doc or "")
+        for sid, (ids, docs) in pending.items():
+            self.lexical_index.add(sid, ids, docs)
+        return len(pending)
 
     def exists(self, syllabus_id: str) -> bool:
         """
@@ -92,53 +267,173 @@ class VectorStore:
         Used to prevent duplicate embeddings during selective ingestion.
         """
         try:
-            result = self.collection.get(
-                where={"syllabus_id": syllabus_id},
+            coll = self._router.for_syllabus(syllabus_id)
+            if coll is None:
+                return False
+            result = coll.get(
+                where=self._router.where(syllabus_id),
                 limit=1,
             )
             return bool(result and result.get("ids"))
         except Exception:
             return False
 
+    def get_chunks(self, syllabus_id=None, include=("documents", "metadatas")):
+        """collection.get of one syllabus's chunks (or every chunk) in either layout."""
+        include = list(include)
+        if syllabus_id:
+            coll = self._router.for_syllabus(syllabus_id)
+            if coll is None:
+                return {"ids": [], **{key: [] for key in include}}
+            return coll.get(where=self._router.where(syllabus_id), include=include)
+        out = {"ids": [], **{key: [] for key in include}}
+        for coll in self._router.collections():
+            data = coll.get(include=include)
+            for key in out:
+                values = data.get(key)
+                if values is not None:
+                    out[key].extend(list(values))
+        return out
+
+    def count(self) -> int:
+        """Chunks stored across every collection."""
+        return sum(coll.count() for coll in self._router.collections())
+
     def delete_syllabus(self, syllabus_id):
-        """Remove all chunks belonging to a given syllabus_id from the collection."""
+        """Remove all chunks of a syllabus_id (drops its collection when partitioned)."""
         try:
-            self.collection.delete(where={"syllabus_id": syllabus_id})
+            self._router.delete(syllabus_id)
+            self.chunk_features.drop_syllabus(syllabus_id)
+            if self.lexical_index is not None:
+                self.lexical_index.delete(syllabus_id)
+            self._written(syllabus_id)
             return True
         except Exception as e:
             print(f"Error deleting syllabus {syllabus_id}: {e}")
             return False
 
+    def clear_derived(self):
+        """Forget every chunk's features, BM25 postings and cached matrix (after a wipe)."""
+        self.chunk_features.clear()
+        if self.lexical_index is not None:
+            self.lexical_index.clear()
+        with self._lock:
+            self._matrices.clear()
+        self._bump(ALL_SYLLABI)
+
     def reset_collection(self):
         """
         Wipe ALL vectors from the collection.
         Safer than deleting per-syllabus when data is badly polluted.
         """
         try:
+            for sid in self._router.syllabi():
+                self._router.drop(sid)
             all_data = self.collection.get()
             if all_data and all_data.get("ids"):
                 self.collection.delete(ids=all_data["ids"])
                 print(f"[Vector DB] Reset: removed {len(all_data['ids'])} vectors.")
+            self.clear_derived()
             return True
         except Exception as e:
             print(f"[Vector DB] Reset error: {e}")
             return False
 
-    def query(self, query_text, k=3, syllabus_id=None, metadata_filter=None):
-        query_embedding = self.embed_fn([query_text], task="query")
+    # ------------------------------------------------------------------
+    # Exact per-syllabus search
+    # ------------------------------------------------------------------
 
-        where_clause = None
-        if syllabus_id:
-            where_clause = {"syllabus_id": syllabus_id}
-            print(f"[Vector Retrieval] syllabus_id={syllabus_id} | k={k}")
-        elif metadata_filter:
-            where_clause = metadata_filter
+    def get_matrix(self, syllabus_id):
+        """Cached chunk matrix of one syllabus (loaded from Chroma once)."""
+        self.sync()
+        mat = self._matrices.get(syllabus_id)
+        if mat is None:
+            data = self.get_chunks(syllabus_id, include=["embeddings", "documents", "metadatas"])
+            embs = data.get("embeddings")          # may be an ndarray — no truthiness test
+            mat  = _ChunkMatrix(
+                list(data.get("ids") or []),
+                _normalize([] if embs is None else embs),
+                list(data.get("documents") or []),
+                list(data.get("metadatas") or []),
+            )
+            with self._lock:
+                self._matrices[syllabus_id] = mat
+        return mat
+
+    def refresh(self, syllabus_id):
+        """Drop a syllabus's cached matrix after ingest/delete (reloaded on next use)."""
+        with self._lock:
+            self._matrices.pop(syllabus_id, None)
+
+    def _bump(self, syllabus_id):
+        if self._versions is not None:
+            self._versions.bump(syllabus_id)
 
+    def _written(self, syllabus_id):
+        """This process changed a syllabus: drop our matrix and tell the other workers."""
+        self.refresh(syllabus_id)
+        self._bump(syllabus_id)
+
+    def sync(self):
+        """Drop matrices and chunk features of syllabi another worker re-ingested or deleted."""
+        if self._versions is None:
+            return
+        changed = self._versions.changed()
+        if not changed:
+            return
+        if ALL_SYLLABI in changed:
+            self.chunk_features.clear()
+            with self._lock:
+                self._matrices.clear()
+            return
+        for sid in changed:
+            self.chunk_features.drop_syllabus(sid)
+            self.refresh(sid)
+
+    @staticmethod
+    def _exact_query(mat, query_embeddings, n_results):
+        """Exact cosine top-n over one syllabus, in collection.query's result shape."""
+        q_mat = _normalize(query_embeddings)
+        out   = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        n     = min(n_results, len(mat))
+        sims  = q_mat @ mat.matrix.T if n else np.empty((len(q_mat), 0), dtype=np.float32)
+        for row in sims:
+            top = np.argpartition(-row, n - 1)[:n] if n else np.empty(0, dtype=np.int64)
+            top = top[np.argsort(-row[top], kind="stable")]
+            out["ids"].append([mat.ids[i] for i in top])
+            out["documents"].append([mat.documents[i] for i in top])
+            out["metadatas"].append([mat.metadatas[i] for i in top])
+            out["distances"].append([float(1.0 - row[i]) for i in top])      # Chroma's cosine distance
+        return out
+
+    def _dense_query(self, query_embeddings, n_results, where_clause, syllabus_id=None):
+        """
+        Exact matrix top-n for one syllabus when enabled, else collection.query
+        on the syllabus's collection, or on every partition merged by distance
+        (None while the HNSW index is not on disk yet).
+        """
+        if syllabus_id and self.exact_search:
+            mat = self.get_matrix(syllabus_id)
+            if len(mat) <= self.exact_max_chunks:
+                return self._exact_query(mat, query_embeddings, n_results)
+        if syllabus_id:
+            colls = [self._router.for_syllabus(syllabus_id)]
+            where_clause = self._router.where(syllabus_id)
+        else:
+            colls = self._router.collections()
+        colls = [c for c in colls if c is not None]
+        if not colls:
+            return None
         try:
-            result = self.collection.query(
-                query_embeddings=query_embedding,
-                n_results=k,
-                where=where_clause
+            if len(colls) == 1:
+                return colls[0].query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where_clause
+                )
+            return _merge_by_distance(
+                [c.query(query_embeddings=query_embeddings, n_results=n_results, where=where_clause) for c in colls],
+                n_results,
             )
         except Exception as e:
             err = str(e)
@@ -146,11 +441,180 @@ class VectorStore:
             # hasn't been flushed to disk yet (e.g. fresh collection on first query).
             if "Nothing found on disk" in err or "hnsw segment" in err.lower():
                 print(f"[Vector Retrieval] WARNING: HNSW index not ready yet ({err[:80]}). Returning empty.")
-                return {"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}
+                return None
             raise
 
+    @staticmethod
+    def _split(result, n):
+        """One multi-embedding query result → n results in the single-query shape."""
+        per_query = []
+        for i in range(n):
+            row = {}
+            for key in ("documents", "metadatas", "distances", "ids"):
+                lists = result.get(key) or []
+                row[key] = [lists[i] if i < len(lists) and lists[i] is not None else []]
+            per_query.append(row)
+        return per_query
+
+    def _fusion_scores(self, dense_ids, lexical_hits, candidates):
+        """Fused score of every candidate id (higher is better)."""
+        if self.fusion == "weighted":
+            top = lexical_hits[0][1] if lexical_hits else 0.0
+            lex = {cid: score / top for cid, score in lexical_hits} if top > 0 else {}
+            return {
+                cid: self.dense_weight * max(0.0, 1.0 - dist) + (1.0 - self.dense_weight) * lex.get(cid, 0.0)
+                for cid, (_, _, dist) in candidates.items()
+            }
+        scores = dict.fromkeys(candidates, 0.0)
+        for ranking in (dense_ids, [cid for cid, _ in lexical_hits]):
+            for rank, cid in enumerate(ranking):
+                if cid in scores:
+                    scores[cid] += 1.0 / (self.rrf_k + rank + 1)
+        return scores
+
+    def _fuse(self, rows, query_texts, query_embeddings, syllabus_id, k):
+        """Fuse dense rows with BM25 hits per query and keep the best k of each."""
+        hits = self.lexical_index.search_many(syllabus_id, query_texts, self.fusion_candidates)
+
+        # Chunks BM25 found for a query but its own dense search did not (they
+        # may be in another query's dense row, with that query's distance):
+        # embeddings from the syllabus matrix when it is loaded, else ONE get
+        # for every query's
+        missing = sorted({
+            cid for row, h in zip(rows, hits) for cid in {c for c, _ in h} - set(row["ids"][0])
+        })
+        extra   = {}
+        mat     = self._matrices.get(syllabus_id)
+        if mat is not None:
+            for cid in missing:
+                i = mat.positions.get(cid)
+                if i is not None:
+                    extra[cid] = (mat.documents[i], mat.metadatas[i], mat.matrix[i])
+            missing = [cid for cid in missing if cid not in extra]
+        if missing:
+            coll = self._router.for_syllabus(syllabus_id) or self.collection
+            got  = coll.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+            embs = got.get("embeddings")          # may be an ndarray — no truthiness test
+            for cid, doc, meta, emb in zip(got.get("ids") or [], got.get("documents") or [],
+                                           got.get("metadatas") or [], [] if embs is None else embs):
+                emb = np.asarray(emb, dtype=np.float32)
+                extra[cid] = (doc, meta, emb / (np.linalg.norm(emb) or 1.0))
+
+        q_mat = np.asarray(query_embeddings, dtype=np.float32).reshape(len(rows), -1)
+        q_mat = q_mat / np.maximum(np.linalg.norm(q_mat, axis=1, keepdims=True), 1e-12)
+
+        fused = []
+        for q, row, h in zip(q_mat, rows, hits):
+            candidates = {
+                cid: (doc, meta, float(d) if d is not None else 1.0)
+                for cid, doc, meta, d in zip(row["ids"][0], row["documents"][0], row["metadatas"][0], row["distances"][0])
+            }
+            for cid, _ in h:
+                if cid not in candidates and cid in extra:
+                    doc, meta, emb = extra[cid]
+                    candidates[cid] = (doc, meta, 1.0 - float(q @ emb))
+            scores = self._fusion_scores(row["ids"][0], h, candidates)
+            best   = sorted(candidates, key=lambda cid: -scores[cid])[:k]     # stable: dense order breaks ties
+            fused.append({
+                "ids":       [best],
+                "documents": [[candidates[cid][0] for cid in best]],
+                "metadatas": [[candidates[cid][1] for cid in best]],
+                "distances": [[candidates[cid][2] for cid in best]],
+            })
+        return fused
+
+    def _fuses(self, syllabus_id, query_texts):
+        return self.lexical_index is not None and bool(syllabus_id) and query_texts is not None
+
+    def query(self, query_text, k=3, syllabus_id=None, metadata_filter=None, ctx=None):
+        """
+        ctx: optional QuestionContext — when given, the query vector is taken
+        from it instead of re-encoding query_text.
+        """
+        self.sync()
+        if ctx is not None:
+            query_embedding = ctx.embed([query_text], task="query")
+        else:
+            query_embedding = self.embed_fn([query_text], task="query")
+
+        where_clause = None
+        if syllabus_id:
+            where_clause = {"syllabus_id": syllabus_id}
+            print(f"[Vector Retrieval] syllabus_id={syllabus_id} | k={k}")
+        elif metadata_filter:
+            where_clause = metadata_filter
+
+        fuse   = self._fuses(syllabus_id, [query_text] if query_text else None)
+        result = self._dense_query(
+            query_embedding, max(k, self.fusion_candidates) if fuse else k, where_clause, syllabus_id
+        )
+        if result is None:
+            return _empty_result()
+        if fuse:
+            result = self._fuse(self._split(result, 1), [query_text], query_embedding, syllabus_id, k)[0]
+
         # Log filtered chunk count
         docs = result.get("documents") or [[]]
         print(f"[Vector Retrieval] filtered_chunks={len(docs[0]) if docs else 0}")
         return result
 
+    def _query_group(self, query_embeddings, k, syllabus_id, metadata_filter, query_texts):
+        """Queries sharing one syllabus: ONE exact matrix top-k or multi-embedding collection.query."""
+        n = len(query_embeddings)
+        where_clause = None
+        if syllabus_id:
+            where_clause = {"syllabus_id": syllabus_id}
+            print(f"[Vector Retrieval] syllabus_id={syllabus_id} | k={k} | batch={n}")
+        elif metadata_filter:
+            where_clause = metadata_filter
+
+        fuse   = self._fuses(syllabus_id, query_texts)
+        result = self._dense_query(
+            query_embeddings, max(k, self.fusion_candidates) if fuse else k, where_clause, syllabus_id
+        )
+        if result is None:
+            return [_empty_result() for _ in range(n)]
+        rows = self._split(result, n)
+        if fuse:
+            rows = self._fuse(rows, list(query_texts), query_embeddings, syllabus_id, k)
+        return rows
+
+    def query_many(self, queries, k=3, syllabus_id=None, metadata_filter=None, query_texts=None):
+        """
+        Retrieve for many questions at once.
+
+        queries: question texts (embedded with ONE embed_fn call) or an
+        (n, dim) matrix of query embeddings, one row per question.
+        syllabus_id: None, one id for every query, or a list with one id (or
+        None) per query.  Queries are grouped by syllabus and each group is
+        one exact matrix top-k (or one multi-embedding collection.query).
+        query_texts: the questions' texts when embeddings are passed — needed
+        for BM25 fusion, which query() always applies to syllabus-filtered
+        searches.
+        Returns a list of n results in input order, each in the same dict
+        shape as query()
+        ({"documents": [[...]], "metadatas": [[...]], "distances": [[...]], "ids": [[...]]}).
+        """
+        n = len(queries)
+        if n == 0:
+            return []
+        self.sync()
+        if isinstance(queries[0], str):
+            query_texts = list(queries) if query_texts is None else query_texts
+            q_mat = self.embed_fn(list(queries), task="query")
+        else:
+            q_mat = queries
+        q_mat = np.asarray(q_mat, dtype=np.float32)
+
+        if syllabus_id is None or isinstance(syllabus_id, str):
+            return self._query_group(q_mat, k, syllabus_id, metadata_filter, query_texts)
+
+        groups = {}
+        for i, sid in enumerate(syllabus_id):
+            groups.setdefault(sid or None, []).append(i)
+        out = [None] * n
+        for sid, idx in groups.items():
+            texts = [query_texts[i] for i in idx] if query_texts is not None else None
+            for i, row in zip(idx, self._query_group(q_mat[idx], k, sid, metadata_filter, texts)):
+                out[i] = row
+        return out
@@ -0,0 +1,169 @@
+"""
+vectorstores/partitions.py
+--------------------------
+Optional per-syllabus collection layout for the Chroma stores.
+
+VectorStore (``syllabi``), ConceptStore (``concept_store``) and CoMapper
+(``course_outcomes``) keep every syllabus in one shared collection and
+filter with where={"syllabus_id": ...}.  As the number of syllabi grows,
+filtered HNSW searches walk a graph that is mostly other subjects, and
+deletes leave tombstones across the one shared index.
+
+In the partitioned layout each store gets one collection per syllabus,
+named ``<base>-<sha1(syllabus_id)[:16]>``.  A SQLite catalog records which
+collection holds which (store, syllabus) so every worker routes the same
+way.  Deleting a syllabus is a drop-collection.  Searches without a
+syllabus fan out over the partitions and merge by distance.
+
+Enable with CHROMA_PARTITIONED in config.py.  Existing data is moved with
+migrate_partitions.py (server stopped); until then the shared collection
+still answers global searches but not filtered ones.
+
+Usage:
+    catalog = PartitionCatalog("data/partition_catalog.sqlite3")
+    router  = CollectionRouter(client, "syllabi", catalog)
+    coll    = router.for_syllabus("IT-VIII-PEC-IT801B", create=True)
+    coll.query(query_embeddings=q, n_results=8, where=router.where("IT-VIII-PEC-IT801B"))
+    router.delete("IT-VIII-PEC-IT801B")     # partition + any unmigrated shared rows
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+COSINE = {"hnsw:space": "cosine"}
+
+
+def partition_name(base_name: str, syllabus_id: str) -> str:
+    """Chroma-safe collection name (3-63 chars of [a-zA-Z0-9._-]) for one syllabus."""
+    return f"{base_name}-{hashlib.sha1(syllabus_id.encode('utf-8')).hexdigest()[:16]}"
+
+
+class PartitionCatalog:
+    """(store, syllabus_id) → collection name, in SQLite (WAL)."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS partitions ("
+            "  store       TEXT NOT NULL,"
+            "  syllabus_id TEXT NOT NULL,"
+            "  collection  TEXT NOT NULL,"
+            "  created_at  REAL NOT NULL,"
+            "  PRIMARY KEY (store, syllabus_id)"
+            ")"
+        )
+        self._conn.commit()
+
+    def get(self, store: str, syllabus_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT collection FROM partitions WHERE store = ? AND syllabus_id = ?", (store, syllabus_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, store: str, syllabus_id: str, collection: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO partitions(store, syllabus_id, collection, created_at) VALUES (?, ?, ?, ?)",
+                (store, syllabus_id, collection, time.time()),
+            )
+
+    def remove(self, store: str, syllabus_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM partitions WHERE store = ? AND syllabus_id = ?", (store, syllabus_id))
+
+    def list(self, store: str) -> Dict[str, str]:
+        """{syllabus_id: collection name} of one store."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT syllabus_id, collection FROM partitions WHERE store = ? ORDER BY syllabus_id", (store,)
+            ).fetchall()
+        return dict(rows)
+
+
+class CollectionRouter:
+    """
+    Where one store keeps a syllabus's rows: the shared collection
+    (catalog=None, the default layout) or that syllabus's own collection.
+    """
+
+    def __init__(self, client, base_name: str, catalog: Optional[PartitionCatalog] = None):
+        self.client      = client
+        self.base_name   = base_name
+        self.catalog     = catalog
+        self.partitioned = catalog is not None
+        self.shared      = client.get_or_create_collection(name=base_name, metadata=COSINE)
+
+    def for_syllabus(self, syllabus_id: str, create: bool = False):
+        """Collection holding this syllabus (None when partitioned and it has none yet)."""
+        if not self.partitioned:
+            return self.shared
+        name = self.catalog.get(self.base_name, syllabus_id)
+        if name is None:
+            if not create:
+                return None
+            name = partition_name(self.base_name, syllabus_id)
+            coll = self.client.get_or_create_collection(name=name, metadata={**COSINE, "syllabus_id": syllabus_id})
+            self.catalog.put(self.base_name, syllabus_id, name)
+            return coll
+        return self.client.get_or_create_collection(name=name, metadata={**COSINE, "syllabus_id": syllabus_id})
+
+    def where(self, syllabus_id: Optional[str]) -> Optional[dict]:
+        """Metadata filter for this syllabus — unnecessary inside its own partition."""
+        if not syllabus_id or self.partitioned:
+            return None
+        return {"syllabus_id": syllabus_id}
+
+    def drop(self, syllabus_id: str) -> bool:
+        """Drop a syllabus's partition.  False in the shared layout (caller deletes by filter)."""
+        if not self.partitioned:
+            return False
+        name = self.catalog.get(self.base_name, syllabus_id)
+        if name is not None:
+            try:
+                self.client.delete_collection(name=name)
+            except Exception as e:
+                print(f"[Partitions] Could not drop {name} ({syllabus_id}): {e}")
+            self.catalog.remove(self.base_name, syllabus_id)
+        return True
+
+    def delete(self, syllabus_id: str) -> None:
+        """
+        Remove every row of a syllabus: drop its partition and where-delete it
+        from the shared collection, which in the partitioned layout still
+        holds whatever migrate_partitions.py has not moved yet.
+        """
+        self.drop(syllabus_id)
+        if self.partitioned:
+            try:
+                if not self.shared.count():
+                    return
+            except Exception:
+                pass
+        self.shared.delete(where={"syllabus_id": syllabus_id})
+
+    def syllabi(self) -> List[str]:
+        return list(self.catalog.list(self.base_name)) if self.partitioned else []
+
+    def collections(self) -> list:
+        """Every collection a global read must visit (partitions + a non-empty shared one)."""
+        if not self.partitioned:
+            return [self.shared]
+        colls = [self.for_syllabus(sid) for sid in self.syllabi()]
+        try:
+            if self.shared.count():
+                colls.append(self.shared)     # rows not migrated yet
+        except Exception:
+            pass
+        return [c for c in colls if c is not None]
@@ -0,0 +1,82 @@
+"""
+vectorstores/syllabus_versions.py
+---------------------------------
+Cross-worker change stamps for the per-process syllabus caches.
+
+VectorStore keeps each syllabus's chunk matrix and chunk features in
+memory.  When another worker process re-ingests or deletes a syllabus,
+those copies are stale, but nothing in this process saw the write.  Every
+write bumps the syllabus's version in a small SQLite table.  Before
+serving, a reader checks ``PRAGMA data_version`` (as CoPoStore and
+BM25Index do) and, only if another connection committed, re-reads the
+versions to learn which syllabi changed.
+
+The "*" row is bumped by writes that touch every syllabus (reset,
+feature backfill); readers then drop everything.
+
+Usage:
+    versions = SyllabusVersions("data/syllabus_versions.sqlite3")
+    versions.bump("IT-VIII-PEC-IT801B")        # after ingest / delete
+    versions.changed()                         # {"IT-VIII-PEC-IT801B"} in other workers
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Set
+
+ALL_SYLLABI = "*"
+
+
+class SyllabusVersions:
+    """Per-syllabus write counters in SQLite (WAL), diffed against what this process last saw."""
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS syllabus_versions ("
+            "  syllabus_id TEXT PRIMARY KEY,"
+            "  version     INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+        self._seen: Dict[str, int] = self._read()
+        self._data_version = self._version()
+
+    def _version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _read(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT syllabus_id, version FROM syllabus_versions").fetchall())
+
+    def bump(self, syllabus_id: str) -> None:
+        """Record a write to one syllabus (ALL_SYLLABI for every syllabus)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO syllabus_versions(syllabus_id, version) VALUES (?, 1)"
+                " ON CONFLICT(syllabus_id) DO UPDATE SET version = version + 1",
+                (syllabus_id,),
+            )
+            # Our own write: nothing to reload here
+            self._seen[syllabus_id] = self._conn.execute(
+                "SELECT version FROM syllabus_versions WHERE syllabus_id = ?", (syllabus_id,)
+            ).fetchone()[0]
+
+    def changed(self) -> Set[str]:
+        """Syllabi other processes wrote since the last call ("*" = all of them)."""
+        with self._lock:
+            version = self._version()
+            if version == self._data_version:
+                return set()
+            self._data_version = version
+            current = self._read()
+            changed = {sid for sid, v in current.items() if self._seen.get(sid) != v}
+            self._seen = current
+        return changed
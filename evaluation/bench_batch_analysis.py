@@ -0,0 +1,120 @@
+"""
+bench_batch_analysis.py
+=======================
+Throughput of /analyze_question on a multi-question paper: the per-question
+loop vs the vectorized batch mode.
+
+Builds a paper of --questions questions (Q1. ... Q60.) from the evaluation
+dataset and posts it to a running backend twice per repetition:
+
+    - sequential : "batch_mode": false  (one encode / Chroma query / spaCy
+                                         parse / boost per question)
+    - vectorized : "batch_mode": true   (one nlp.pipe, one encode call, one
+                                         multi-embedding collection.query,
+                                         array hybrid scoring)
+
+Reports questions/second for both and checks the per-question verdicts and
+similarity scores agree.  Set --threshold above 1.0 to keep the LLM out of
+the timing; the default 0.2 includes the LLM for questions that pass the
+gate, the same way the UI calls the endpoint.
+
+Usage:
+    python bench_batch_analysis.py --syllabus IT-VIII-PEC-IT801B
+    python bench_batch_analysis.py --syllabus IT-VIII-PEC-IT801B --questions 60 --repeat 3 --threshold 1.1
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("[FATAL] 'requests' is not installed. Run: pip install requests")
+    sys.exit(1)
+
+_EVAL_DIR       = Path(__file__).resolve().parent
+DATASET_PATH    = _EVAL_DIR / "evaluation_dataset.json"
+DEFAULT_BACKEND = "http://127.0.0.1:5000"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Sequential vs vectorized /analyze_question on a question paper.")
+    p.add_argument("--backend",   default=DEFAULT_BACKEND, help="Flask backend base URL.")
+    p.add_argument("--syllabus",  required=True,           help="syllabus_id to analyze against.")
+    p.add_argument("--questions", default=60,  type=int,   help="Questions in the generated paper.")
+    p.add_argument("--repeat",    default=3,   type=int,   help="Repetitions per mode (best run is reported).")
+    p.add_argument("--threshold", default=0.2, type=float, help="Analysis threshold forwarded to the backend.")
+    p.add_argument("--output",    default=str(_EVAL_DIR / "batch_analysis.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def build_paper(n):
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        pool = [e["question"] for e in json.load(f) if e.get("question") and "REPLACE_ME" not in e["question"]]
+    if not pool:
+        print("[FATAL] Evaluation dataset has no questions.")
+        sys.exit(1)
+    questions = [pool[i % len(pool)] for i in range(n)]
+    return " ".join(f"Q{i + 1}. {q}" for i, q in enumerate(questions)), questions
+
+
+def run(backend, paper, syllabus_id, threshold, batch_mode):
+    t0 = time.perf_counter()
+    resp = requests.post(
+        f"{backend}/analyze_question",
+        json={"question": paper, "syllabus_id": syllabus_id, "threshold": threshold, "batch_mode": batch_mode,
+              "use_cache": False},     # time the pipeline, not the result cache / question bank
+        timeout=3600,
+    )
+    secs = time.perf_counter() - t0
+    resp.raise_for_status()
+    return resp.json(), secs
+
+
+def main():
+    args = parse_args()
+    paper, questions = build_paper(args.questions)
+
+    report = {"questions": len(questions), "syllabus_id": args.syllabus, "threshold": args.threshold}
+    outputs = {}
+    for mode, batch_mode in (("sequential", False), ("vectorized", True)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            data, secs = run(args.backend, paper, args.syllabus, args.threshold, batch_mode)
+            best = min(best, secs)
+        outputs[mode] = data.get("questions", [])
+        report[mode] = {
+            "execution":          data.get("execution"),
+            "seconds":            round(best, 3),
+            "questions_per_sec":  round(len(questions) / best, 2),
+        }
+
+    seq, vec = outputs["sequential"], outputs["vectorized"]
+    same_verdict = sum(a.get("is_in_syllabus") == b.get("is_in_syllabus") for a, b in zip(seq, vec))
+    max_sim_diff = max(
+        (abs((a.get("similarity_score") or 0.0) - (b.get("similarity_score") or 0.0)) for a, b in zip(seq, vec)),
+        default=0.0,
+    )
+    report["verdict_agreement"]  = round(same_verdict / max(len(seq), 1), 4)
+    report["max_similarity_diff"] = round(max_sim_diff, 6)
+    report["speedup"] = round(report["sequential"]["seconds"] / report["vectorized"]["seconds"], 2)
+
+    print(f"\nPaper: {len(questions)} questions | syllabus={args.syllabus} | threshold={args.threshold}")
+    print(f"\n{'Mode':<12}{'seconds':>10}{'q/sec':>10}")
+    print("-" * 32)
+    for mode in ("sequential", "vectorized"):
+        r = report[mode]
+        print(f"{mode:<12}{r['seconds']:>10.2f}{r['questions_per_sec']:>10.2f}")
+    print(f"\nSpeedup: {report['speedup']:.2f}x | verdict agreement: {report['verdict_agreement']:.4f} "
+          f"| max similarity diff: {report['max_similarity_diff']:.2e}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
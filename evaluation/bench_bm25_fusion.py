@@ -0,0 +1,186 @@
+"""
+bench_bm25_fusion.py
+====================
+Cost of the per-syllabus BM25 index (vectorstores/bm25_index.py) against
+the regex keyword overlap it complements.
+
+    regex overlap : keyword_set(question) & keyword_set(chunk) for the k=8
+                    chunks the dense search returned — re-tokenized on every
+                    request, and blind to chunks outside those 8
+    BM25          : tokenized once at ingestion; a query scores every chunk
+                    of the syllabus from pre-weighted postings
+
+Reports:
+    - indexing throughput (chunks/sec into the SQLite index)
+    - first-query load of a syllabus (postings build) in ms
+    - per-query latency p50 / p95 for both paths
+    - BM25 recall@8 / @20 of the chunk each synthetic question was drawn from
+
+By default the corpus is synthetic (--syllabi x --chunks chunks over a
+Zipf vocabulary, questions built from rare terms of one chunk), so it runs
+without a backend.  --from-db uses the chunks in backend/data/vector_db
+instead (needs chromadb); questions are then drawn from those chunks.
+
+Usage:
+    python bench_bm25_fusion.py
+    python bench_bm25_fusion.py --syllabi 20 --chunks 300 --questions 500
+    python bench_bm25_fusion.py --from-db
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+from services.chunk_features import keyword_set
+from vectorstores.bm25_index import BM25Index, tokenize
+
+_RETRIEVAL_K = 8
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="BM25 index vs regex keyword overlap: indexing and query cost.")
+    p.add_argument("--syllabi",   default=10,  type=int, help="Synthetic syllabi.")
+    p.add_argument("--chunks",    default=250, type=int, help="Chunks per synthetic syllabus.")
+    p.add_argument("--vocab",     default=6000, type=int, help="Synthetic vocabulary size.")
+    p.add_argument("--questions", default=300, type=int, help="Questions to time.")
+    p.add_argument("--from-db",   action="store_true",   help="Use the chunks stored in backend/data/vector_db.")
+    p.add_argument("--seed",      default=7,   type=int)
+    p.add_argument("--output",    default=str(_EVAL_DIR / "bm25_fusion.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def synthetic_corpus(args, rng):
+    vocab   = [f"term{i:05d}" for i in range(args.vocab)]
+    weights = 1.0 / np.arange(1, args.vocab + 1)
+    weights /= weights.sum()
+    corpus  = {}
+    for s in range(args.syllabi):
+        chunks = []
+        for _ in range(args.chunks):
+            words = rng.choice(vocab, size=int(rng.integers(30, 90)), p=weights)
+            chunks.append(" ".join(words))
+        corpus[f"SYN-{s:03d}"] = chunks
+    return corpus
+
+
+def db_corpus():
+    from vectorstores.chroma_store import VectorStore
+    store = VectorStore(embed_fn=None, persist_dir=str(_BACKEND_DIR / "data" / "vector_db"))
+    data  = store.collection.get(include=["documents", "metadatas"])
+    corpus = {}
+    for doc, meta in zip(data.get("documents") or [], data.get("metadatas") or []):
+        sid = (meta or {}).get("syllabus_id")
+        if sid and doc:
+            corpus.setdefault(sid, []).append(doc)
+    return corpus
+
+
+def make_questions(corpus, n, rng):
+    """Questions from the rarer terms of one chunk → (syllabus_id, chunk index, text)."""
+    df = {sid: Counter(t for doc in chunks for t in set(tokenize(doc))) for sid, chunks in corpus.items()}
+    questions = []
+    sids = sorted(corpus)
+    while len(questions) < n:
+        sid = sids[int(rng.integers(len(sids)))]
+        j   = int(rng.integers(len(corpus[sid])))
+        terms = sorted(set(tokenize(corpus[sid][j])), key=lambda t: (df[sid][t], t))
+        if not terms:
+            continue
+        picked = rng.choice(terms[:12], size=min(4, len(terms[:12])), replace=False)
+        questions.append((sid, j, "Explain " + " ".join(picked)))
+    return questions
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else 0.0
+
+
+def main():
+    args   = parse_args()
+    rng    = np.random.default_rng(args.seed)
+    corpus = db_corpus() if args.from_db else synthetic_corpus(args, rng)
+    if not corpus:
+        print("[FATAL] No chunks to index.")
+        sys.exit(1)
+    n_chunks  = sum(len(c) for c in corpus.values())
+    questions = make_questions(corpus, args.questions, rng)
+    ids       = {sid: [f"{sid}_{i}" for i in range(len(chunks))] for sid, chunks in corpus.items()}
+
+    workdir = tempfile.mkdtemp(prefix="bench_bm25_")
+    try:
+        index = BM25Index(str(Path(workdir) / "bm25.sqlite3"))
+
+        # ── Indexing ────────────────────────────────────────────────────────
+        t0 = time.perf_counter()
+        for sid, chunks in corpus.items():
+            index.add(sid, ids[sid], chunks)
+        index_secs = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for sid in corpus:
+            index.scores(sid, "warmup")               # builds the in-memory postings
+        load_ms = (time.perf_counter() - t0) * 1000 / len(corpus)
+
+        # ── Query latency ───────────────────────────────────────────────────
+        regex_t, bm25_t = [], []
+        hits8 = hits20 = 0
+        for sid, j, q in questions:
+            # The old path: the 8 dense results (here: 8 neighbouring chunks) re-tokenized per request
+            chunks = corpus[sid]
+            window = [chunks[(j + d) % len(chunks)] for d in range(_RETRIEVAL_K)]
+            t0 = time.perf_counter()
+            q_words = keyword_set(q)
+            _ = [len(q_words & keyword_set(doc)) / len(q_words) if q_words else 0.0 for doc in window]
+            regex_t.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            hits = index.search(sid, q, top_n=20)
+            bm25_t.append(time.perf_counter() - t0)
+
+            ranked = [cid for cid, _ in hits]
+            target = ids[sid][j]
+            hits8  += target in ranked[:_RETRIEVAL_K]
+            hits20 += target in ranked
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "corpus":             "vector_db" if args.from_db else "synthetic",
+        "syllabi":            len(corpus),
+        "chunks":             n_chunks,
+        "questions":          len(questions),
+        "index_chunks_per_s": round(n_chunks / index_secs, 1) if index_secs else 0.0,
+        "load_ms_per_syllabus": round(load_ms, 3),
+        "regex_overlap_ms":   {"p50": pct(regex_t, 50), "p95": pct(regex_t, 95)},
+        "bm25_search_ms":     {"p50": pct(bm25_t, 50), "p95": pct(bm25_t, 95)},
+        "bm25_recall_at_8":   round(hits8 / len(questions), 4),
+        "bm25_recall_at_20":  round(hits20 / len(questions), 4),
+    }
+
+    print(f"\nCorpus: {report['corpus']} — {len(corpus)} syllabi, {n_chunks} chunks, {len(questions)} questions")
+    print(f"Indexing: {report['index_chunks_per_s']:.1f} chunks/sec, "
+          f"first-query load {report['load_ms_per_syllabus']:.2f} ms/syllabus")
+    print(f"\n{'Path':<34}{'p50 ms':>10}{'p95 ms':>10}")
+    print("-" * 54)
+    print(f"{'regex overlap (8 chunks)':<34}{report['regex_overlap_ms']['p50']:>10.3f}{report['regex_overlap_ms']['p95']:>10.3f}")
+    print(f"{'BM25 search (whole syllabus)':<34}{report['bm25_search_ms']['p50']:>10.3f}{report['bm25_search_ms']['p95']:>10.3f}")
+    print(f"\nBM25 recall of the source chunk: @8 {report['bm25_recall_at_8']:.3f}  @20 {report['bm25_recall_at_20']:.3f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+bench_co_ingestion.py
+=====================
+CO / CO→PO ingestion for a full program: per-CO duplicate checks and an
+in-process PO dict vs CoMapper's bulk duplicate check and SQLite PO store.
+
+Builds a synthetic program of --subjects subjects with --cos COs each (and
+one PO per CO), then for both paths:
+
+    - first ingest   every CO is new
+    - re-ingest      every CO is a duplicate (the common "ingest the program
+                     again" case, where the per-CO gets dominate)
+    - restart        a fresh CoMapper on the same directory; how many PO
+                     mappings are still visible
+
+    legacy : one collection.get(ids=[doc_id]) per CO, PO mapping in a dict
+    bulk   : CoMapper.add_cos (one get for all candidate ids) +
+             add_pcos (one SQLite transaction per subject)
+
+Embeddings are random unit vectors so the timing measures storage work, not
+the transformer.  Everything runs in a temporary directory.
+
+Usage:
+    python bench_co_ingestion.py
+    python bench_co_ingestion.py --subjects 60 --cos 6 --repeat 3
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+from services.co_mapper import CoMapper
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="CO / CO-PO ingestion benchmark (per-CO vs bulk).")
+    p.add_argument("--subjects", default=60,  type=int, help="Subjects in the synthetic program.")
+    p.add_argument("--cos",      default=6,   type=int, help="COs per subject.")
+    p.add_argument("--dim",      default=768, type=int, help="Embedding dimension.")
+    p.add_argument("--repeat",   default=3,   type=int, help="Repetitions (best run is reported).")
+    p.add_argument("--output",   default=str(_EVAL_DIR / "co_ingestion.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def make_embed_fn(dim):
+    rng = np.random.default_rng(7)
+
+    def embed(texts, task="passage"):
+        v = rng.standard_normal((len(texts), dim)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+    return embed
+
+
+def build_program(n_subjects, n_cos):
+    program = []
+    for s in range(n_subjects):
+        code = f"PEC-XX{s:03d}"
+        cos  = [{"co_id": f"CO{i + 1}", "course_code": code, "full_co_id": f"{code}.CO{i + 1}",
+                 "text": f"{code}.CO{i + 1} Apply technique {i} of subject {s}"} for i in range(n_cos)]
+        pcos = [{"co_id": f"CO{i + 1}", "pco_id": f"PO{(i % 12) + 1}"} for i in range(n_cos)]
+        program.append((f"SYL-{s:03d}", cos, pcos))
+    return program
+
+
+def legacy_ingest(mapper, pco_dict, program):
+    """The previous add_cos / add_pcos: one get per CO, PO mapping in process memory."""
+    for sid, cos, pcos in program:
+        texts, ids, metas = [], [], []
+        for c in cos:
+            doc_id = f"{c['course_code']}::{c['full_co_id']}"
+            existing = mapper.collection.get(ids=[doc_id])
+            if existing and existing.get("ids"):
+                continue
+            texts.append(c["text"])
+            ids.append(doc_id)
+            metas.append({"syllabus_id": sid, "course_code": c["course_code"], "full_co_id": c["full_co_id"],
+                          "display_co": c["co_id"], "co_id": c["co_id"]})
+        if texts:
+            mapper.collection.add(ids=ids, embeddings=mapper.embed_fn(texts), metadatas=metas, documents=texts)
+        pco_dict.setdefault(sid, {}).update({p["co_id"]: p["pco_id"] for p in pcos})
+
+
+def bulk_ingest(mapper, program):
+    for sid, cos, pcos in program:
+        mapper.add_cos(sid, cos)
+        mapper.add_pcos(sid, pcos)
+
+
+def visible_pcos(mapper, program):
+    return sum(mapper.get_pco_for_co(sid, p["co_id"]) is not None for sid, _, pcos in program for p in pcos)
+
+
+def run(mode, program, dim):
+    workdir = tempfile.mkdtemp(prefix="bench_co_")
+    try:
+        mapper = CoMapper(embed_fn=make_embed_fn(dim), persist_dir=str(Path(workdir) / "vector_db"))
+        pco_dict = {}
+        ingest = (lambda: legacy_ingest(mapper, pco_dict, program)) if mode == "legacy" else (lambda: bulk_ingest(mapper, program))
+
+        t0 = time.perf_counter()
+        ingest()
+        first = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ingest()
+        again = time.perf_counter() - t0
+
+        # Simulated restart: a fresh mapper (fresh process memory) on the same directory
+        # (the legacy dict never reached the store, so it sees nothing)
+        restarted = CoMapper(embed_fn=make_embed_fn(dim), persist_dir=str(Path(workdir) / "vector_db"))
+        surviving = visible_pcos(restarted, program)
+        return first, again, surviving
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    args    = parse_args()
+    program = build_program(args.subjects, args.cos)
+    total_cos = args.subjects * args.cos
+    report  = {"subjects": args.subjects, "cos": total_cos}
+
+    for mode in ("legacy", "bulk"):
+        best_first = best_again = float("inf")
+        surviving = 0
+        for _ in range(args.repeat):
+            with contextlib.redirect_stdout(io.StringIO()):        # per-CO duplicate logs
+                first, again, surviving = run(mode, program, args.dim)
+            best_first = min(best_first, first)
+            best_again = min(best_again, again)
+        report[mode] = {
+            "first_ingest_s":      round(best_first, 3),
+            "reingest_s":          round(best_again, 3),
+            "cos_per_sec":         round(total_cos / best_first, 1),
+            "pcos_after_restart":  surviving,
+        }
+
+    print(f"\nProgram: {args.subjects} subjects, {total_cos} COs")
+    print(f"\n{'Mode':<8}{'first s':>10}{'re-ingest s':>13}{'COs/sec':>10}{'POs after restart':>19}")
+    print("-" * 60)
+    for mode in ("legacy", "bulk"):
+        r = report[mode]
+        print(f"{mode:<8}{r['first_ingest_s']:>10.3f}{r['reingest_s']:>13.3f}{r['cos_per_sec']:>10.1f}"
+              f"{r['pcos_after_restart']:>15}/{total_cos}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+bench_embedding_backends.py
+===========================
+Parity check and throughput comparison for the Embedder backends.
+
+Encodes the chunks already stored in ChromaDB with every backend
+(torch / onnx / onnx-int8) and compares each one against the fp32 torch
+reference:
+
+    - Cosine agreement per chunk   (mean / p1 / min of ref · candidate)
+    - Retrieval parity             (top-1 agreement and overlap@k on the
+                                    evaluation dataset questions)
+    - Throughput                   (chunks / second, cache disabled)
+
+Choose the fastest backend whose retrieval parity stays at 1.0, then set
+EMBEDDING_BACKEND (env var or backend/config.py).
+
+Usage:
+    python bench_embedding_backends.py
+    python bench_embedding_backends.py --backends torch,onnx-int8 --limit 500
+    python bench_embedding_backends.py --syllabus IT-VIII-PEC-IT801B --k 8
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+from models.embedder import Embedder, BACKENDS
+from vectorstores.chroma_store import VectorStore
+
+DATASET_PATH = _EVAL_DIR / "evaluation_dataset.json"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Embedding backend parity + throughput benchmark.")
+    p.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backends to compare.")
+    p.add_argument("--syllabus", default=None,  help="Restrict to one syllabus_id (default: all chunks).")
+    p.add_argument("--limit",    default=1000, type=int, help="Maximum number of stored chunks to encode.")
+    p.add_argument("--k",        default=8,    type=int, help="Top-k for retrieval parity.")
+    p.add_argument("--output",   default=str(_EVAL_DIR / "embedding_backends.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def load_chunks(syllabus_id, limit):
+    store = VectorStore(embed_fn=None, persist_dir=str(_BACKEND_DIR / "data" / "vector_db"))
+    kwargs = {"include": ["documents"]}
+    if syllabus_id:
+        kwargs["where"] = {"syllabus_id": syllabus_id}
+    docs = store.collection.get(**kwargs).get("documents") or []
+    return docs[:limit]
+
+
+def load_questions():
+    if not DATASET_PATH.exists():
+        return []
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [e["question"] for e in data if e.get("question") and "REPLACE_ME" not in e["question"]]
+
+
+def encode(embedder, texts, task):
+    t0 = time.perf_counter()
+    vecs = np.asarray(embedder.embed(texts, task=task), dtype=np.float32)
+    return vecs, time.perf_counter() - t0
+
+
+def top_k(q_vecs, c_vecs, k):
+    sims = q_vecs @ c_vecs.T
+    k = min(k, c_vecs.shape[0])
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def main():
+    args     = parse_args()
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    chunks   = load_chunks(args.syllabus, args.limit)
+    questions = load_questions()
+
+    if not chunks:
+        print("[FATAL] No chunks found in ChromaDB. Ingest a syllabus first.")
+        sys.exit(1)
+
+    print(f"\nChunks: {len(chunks)} | Questions: {len(questions)} | k={args.k}")
+
+    # fp32 torch reference (cache disabled so every backend is timed cold)
+    ref = Embedder(backend="torch", use_cache=False)
+    ref_chunks, _ = encode(ref, chunks, "passage")
+    ref_q, _      = encode(ref, questions, "query") if questions else (None, 0.0)
+    ref_topk      = top_k(ref_q, ref_chunks, args.k) if questions else None
+
+    report = {}
+    for backend in backends:
+        emb = ref if backend == "torch" else Embedder(backend=backend, use_cache=False)
+        encode(emb, chunks[:8], "passage")                     # warm-up
+        c_vecs, secs = encode(emb, chunks, "passage")
+
+        agreement = np.sum(ref_chunks * c_vecs, axis=1)
+        row = {
+            "device":          emb.device,
+            "chunks_per_sec":  round(len(chunks) / secs, 2),
+            "cosine_mean":     round(float(agreement.mean()), 6),
+            "cosine_p1":       round(float(np.percentile(agreement, 1)), 6),
+            "cosine_min":      round(float(agreement.min()), 6),
+        }
+
+        if questions:
+            q_vecs, _ = encode(emb, questions, "query")
+            cand_topk = top_k(q_vecs, c_vecs, args.k)
+            row["top1_agreement"] = round(float(np.mean(cand_topk[:, 0] == ref_topk[:, 0])), 4)
+            row[f"overlap_at_{args.k}"] = round(float(np.mean([
+                len(set(a) & set(b)) / len(a) for a, b in zip(ref_topk, cand_topk)
+            ])), 4)
+
+        report[backend] = row
+
+    print(f"\n{'Backend':<12}{'Device':<8}{'chunks/s':>10}{'cos mean':>11}{'cos min':>10}{'top1':>8}{'ovl@k':>8}")
+    print("-" * 67)
+    for backend, r in report.items():
+        print(f"{backend:<12}{r['device']:<8}{r['chunks_per_sec']:>10.1f}{r['cosine_mean']:>11.5f}"
+              f"{r['cosine_min']:>10.5f}{r.get('top1_agreement', float('nan')):>8.3f}"
+              f"{r.get(f'overlap_at_{args.k}', float('nan')):>8.3f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"chunks": len(chunks), "questions": len(questions), "k": args.k, "backends": report}, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+bench_morphology_index.py
+=========================
+Pairwise scan vs MorphologyIndex for the scope validator's morphological
+matcher.
+
+For every syllabus in the scope concept store (backend/data) with at least
+--min-concepts concepts (falls back to a synthetic syllabus when none is
+large enough), every question word is matched against the syllabus words:
+
+    - pairwise : any(_is_morphological_match(w, s) for s in syllabus_words)
+    - indexed  : w in index or index.matches(w)
+
+Both must agree on every word; the script exits non-zero otherwise.
+
+Usage:
+    python bench_morphology_index.py
+    python bench_morphology_index.py --min-concepts 150 --repeat 5
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+from services.curriculum_scope_validator import (
+    _get_db,
+    _is_morphological_match,
+    _syllabus_words,
+    extract_question_words,
+)
+from services.morphology_index import MorphologyIndex
+
+DATASET_PATH = _EVAL_DIR / "evaluation_dataset.json"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Morphological matcher benchmark (pairwise vs indexed).")
+    p.add_argument("--min-concepts", default=150, type=int, help="Only benchmark syllabi with at least this many concepts.")
+    p.add_argument("--repeat",       default=3,   type=int, help="Timing repetitions (best run is reported).")
+    p.add_argument("--output",       default=str(_EVAL_DIR / "morphology_index.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def load_syllabi(min_concepts):
+    return {sid: c for sid, c in _get_db().get_all().items() if len(c) >= min_concepts}
+
+
+def synthetic_syllabus(n_concepts, seed=13):
+    rng   = random.Random(seed)
+    stems = ["crypt", "cipher", "network", "protocol", "algorithm", "signature", "compil",
+             "parser", "schedul", "memory", "process", "thread", "databas", "transact",
+             "graph", "matrix", "vector", "optimi", "regress", "classif", "cluster"]
+    tails = ["", "s", "ing", "ion", "ed", "er", "ography", "analysis", "text", "ization"]
+    words = lambda: rng.choice(stems) + rng.choice(tails)
+    return [f"{words()} {words()}" for _ in range(n_concepts)]
+
+
+def load_question_words(syllabus_words):
+    questions = []
+    if DATASET_PATH.exists():
+        with open(DATASET_PATH, "r", encoding="utf-8") as f:
+            questions = [e["question"] for e in json.load(f) if e.get("question") and "REPLACE_ME" not in e["question"]]
+    words = [w for q in questions for w in extract_question_words(q)]
+    # Pad with inflected syllabus words so both matching paths are exercised
+    rng = random.Random(29)
+    words += [rng.choice(syllabus_words) + rng.choice(["", "s", "ing", "al"]) for _ in range(500)]
+    return words
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def bench_one(concepts, repeat):
+    syllabus_words = _syllabus_words(concepts)
+    q_words        = load_question_words(syllabus_words)
+    word_set       = set(syllabus_words)
+
+    pairwise, t_pair = best_of(repeat, lambda: [
+        w in word_set or any(_is_morphological_match(w, s) for s in syllabus_words) for w in q_words
+    ])
+
+    t0 = time.perf_counter()
+    index = MorphologyIndex(syllabus_words)
+    t_build = time.perf_counter() - t0
+    indexed, t_index = best_of(repeat, lambda: [w in index or index.matches(w) for w in q_words])
+
+    mismatches = [w for w, a, b in zip(q_words, pairwise, indexed) if a != b]
+    return {
+        "concepts":        len(concepts),
+        "syllabus_words":  len(syllabus_words),
+        "question_words":  len(q_words),
+        "matched":         sum(indexed),
+        "pairwise_ms":     round(t_pair * 1000, 3),
+        "index_build_ms":  round(t_build * 1000, 3),
+        "indexed_ms":      round(t_index * 1000, 3),
+        "speedup":         round(t_pair / t_index, 1) if t_index else None,
+        "mismatches":      mismatches[:20],
+    }
+
+
+def main():
+    args    = parse_args()
+    syllabi = load_syllabi(args.min_concepts)
+    if not syllabi:
+        print(f"[Info] No stored syllabus has >= {args.min_concepts} concepts — using a synthetic one.")
+        syllabi = {"SYNTHETIC": synthetic_syllabus(max(args.min_concepts, 150))}
+
+    report = {sid: bench_one(concepts, args.repeat) for sid, concepts in syllabi.items()}
+
+    print(f"\n{'Syllabus':<28}{'concepts':>9}{'words':>7}{'q-words':>9}{'pairwise ms':>13}{'indexed ms':>12}{'speedup':>9}")
+    print("-" * 87)
+    for sid, r in report.items():
+        print(f"{sid[:27]:<28}{r['concepts']:>9}{r['syllabus_words']:>7}{r['question_words']:>9}"
+              f"{r['pairwise_ms']:>13.2f}{r['indexed_ms']:>12.2f}{r['speedup']:>8.1f}x")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+    if any(r["mismatches"] for r in report.values()):
+        print("[FATAL] Indexed matcher disagrees with the pairwise scan.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
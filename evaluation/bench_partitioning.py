@@ -0,0 +1,146 @@
+"""
+bench_partitioning.py
+=====================
+Syllabus-filtered HNSW search and syllabus deletion as the number of
+ingested syllabi grows: one shared ``syllabi`` collection filtered by
+where={"syllabus_id": ...} vs one collection per syllabus
+(vectorstores/partitions.py, CHROMA_PARTITIONED).
+
+For each --syllabi count N, both layouts are filled with N syllabi of
+--chunks random chunks, then:
+
+    - first query     p50 of the first filtered query per syllabus, which
+                      in the partitioned layout opens that collection's
+                      HNSW index from disk
+    - filtered query  p50 / p95 of VectorStore.query(k=8, syllabus_id=...)
+                      once every syllabus has been queried, with
+                      exact_search and BM25 off, so the timing is the
+                      Chroma search itself
+    - delete          mean VectorStore.delete_syllabus time (where-delete on
+                      the shared collection vs drop-collection)
+
+Embeddings are random unit vectors so the timing measures the index, not
+the transformer.  Everything runs in temporary directories (needs chromadb).
+
+Usage:
+    python bench_partitioning.py
+    python bench_partitioning.py --syllabi 10,50,100,200 --chunks 300 --queries 200
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+from vectorstores.chroma_store import VectorStore
+from vectorstores.partitions import PartitionCatalog
+
+_RETRIEVAL_K = 8
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Shared vs per-syllabus Chroma collections: filtered query and delete cost.")
+    p.add_argument("--syllabi", default="10,50,100,200", help="Comma-separated syllabus counts.")
+    p.add_argument("--chunks",  default=300, type=int, help="Chunks per syllabus.")
+    p.add_argument("--dim",     default=768, type=int, help="Embedding dimension.")
+    p.add_argument("--queries", default=200, type=int, help="Filtered queries timed per layout.")
+    p.add_argument("--deletes", default=5,   type=int, help="Syllabi deleted per layout.")
+    p.add_argument("--seed",    default=7,   type=int)
+    p.add_argument("--output",  default=str(_EVAL_DIR / "partitioning.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def make_embed_fn(dim, seed):
+    rng = np.random.default_rng(seed)
+
+    def embed(texts, task="passage"):
+        v = rng.standard_normal((len(texts), dim)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+    return embed
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else 0.0
+
+
+def run_layout(n_syllabi, args, partitioned):
+    workdir = tempfile.mkdtemp(prefix="bench_partitions_")
+    try:
+        store = VectorStore(
+            embed_fn=make_embed_fn(args.dim, args.seed),
+            persist_dir=str(Path(workdir) / "vector_db"),
+            exact_search=False,
+            partition_catalog=PartitionCatalog(str(Path(workdir) / "catalog.sqlite3")) if partitioned else None,
+        )
+        sids = [f"SYN-{i:04d}" for i in range(n_syllabi)]
+        t0 = time.perf_counter()
+        for sid in sids:
+            store.add_syllabus(sid, [f"{sid} chunk {j}" for j in range(args.chunks)])
+        ingest_secs = time.perf_counter() - t0
+
+        # Cold: first touch of each syllabus.  Kept apart from the steady-state
+        # numbers, otherwise with many syllabi most timed queries are cold opens.
+        first_t = []
+        for sid in sids:
+            t0 = time.perf_counter()
+            store.query(f"question about {sid}", k=_RETRIEVAL_K, syllabus_id=sid)
+            first_t.append(time.perf_counter() - t0)
+
+        rng = np.random.default_rng(args.seed)
+        query_t = []
+        for _ in range(args.queries):
+            sid = sids[int(rng.integers(len(sids)))]
+            t0 = time.perf_counter()
+            store.query(f"question about {sid}", k=_RETRIEVAL_K, syllabus_id=sid)
+            query_t.append(time.perf_counter() - t0)
+
+        delete_t = []
+        for sid in sids[:min(args.deletes, len(sids))]:
+            t0 = time.perf_counter()
+            store.delete_syllabus(sid)
+            delete_t.append(time.perf_counter() - t0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "ingest_s":       round(ingest_secs, 3),
+        "first_query_ms": {"p50": pct(first_t, 50), "p95": pct(first_t, 95)},
+        "query_ms":       {"p50": pct(query_t, 50), "p95": pct(query_t, 95)},
+        "delete_ms":      round(float(np.mean(delete_t)) * 1000, 3) if delete_t else 0.0,
+    }
+
+
+def main():
+    args   = parse_args()
+    counts = [int(c) for c in args.syllabi.split(",") if c.strip()]
+    report = {"chunks_per_syllabus": args.chunks, "queries": args.queries, "runs": []}
+
+    print(f"\n{'Syllabi':>8}  {'Layout':<12}{'first p50':>11}{'query p50':>11}{'query p95':>11}"
+          f"{'delete ms':>11}{'ingest s':>10}")
+    print("-" * 76)
+    for n in counts:
+        for layout, partitioned in (("shared", False), ("partitioned", True)):
+            with contextlib.redirect_stdout(io.StringIO()):        # per-query retrieval logs
+                res = run_layout(n, args, partitioned)
+            report["runs"].append({"syllabi": n, "layout": layout, **res})
+            print(f"{n:>8}  {layout:<12}{res['first_query_ms']['p50']:>11.3f}{res['query_ms']['p50']:>11.3f}"
+                  f"{res['query_ms']['p95']:>11.3f}{res['delete_ms']:>11.3f}{res['ingest_s']:>10.2f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+bench_spacy_pipeline.py
+=======================
+Load-time and throughput comparison for the shared spaCy registry.
+
+Compares the old extraction path against services/nlp_registry.py on the
+chunks stored in ChromaDB:
+
+    - Load time        full ``spacy.load`` (old: paid on EVERY extraction)
+                       vs the trimmed pipeline (NER + lemmatizer disabled,
+                       paid once per process)
+    - Throughput       docs/sec for ``nlp(text)`` one doc at a time with the
+                       full pipeline vs batched ``nlp.pipe`` on the trimmed
+                       pipeline, for each --n-process value
+    - Parity           scope concepts extracted by both pipelines must match
+
+Usage:
+    python bench_spacy_pipeline.py
+    python bench_spacy_pipeline.py --limit 2000 --n-process 1,2,4 --batch-size 64
+"""
+
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from pathlib import Path
+
+_EVAL_DIR    = Path(__file__).resolve().parent
+_BACKEND_DIR = _EVAL_DIR.parent / "backend"
+sys.path.insert(0, str(_BACKEND_DIR))
+
+import spacy
+
+from config import SPACY_MODEL, SPACY_DISABLE
+from services.curriculum_scope_validator import _rank_candidates, _scope_candidates
+from vectorstores.chroma_store import VectorStore
+
+DATASET_PATH = _EVAL_DIR / "evaluation_dataset.json"
+
+
+def concepts_from_doc(doc, text: str, top_n: int = 150):
+    """Rank the scope-validator concept candidates of one parsed text."""
+    return _rank_candidates(Counter(_scope_candidates(doc, text)), top_n)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="spaCy registry load-time + docs/sec benchmark.")
+    p.add_argument("--limit",      default=1000, type=int, help="Maximum number of stored chunks to parse.")
+    p.add_argument("--batch-size", default=32,   type=int, help="nlp.pipe batch size.")
+    p.add_argument("--n-process",  default="1,2", help="Comma-separated n_process values to try.")
+    p.add_argument("--loads",      default=3,    type=int, help="Model loads to average for load time.")
+    p.add_argument("--output",     default=str(_EVAL_DIR / "spacy_pipeline.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def load_texts(limit):
+    try:
+        store = VectorStore(embed_fn=None, persist_dir=str(_BACKEND_DIR / "data" / "vector_db"))
+        docs = store.collection.get(include=["documents"]).get("documents") or []
+    except Exception as e:
+        print(f"[Info] Could not read ChromaDB ({e}); using evaluation questions.")
+        docs = []
+    if not docs and DATASET_PATH.exists():
+        with open(DATASET_PATH, "r", encoding="utf-8") as f:
+            docs = [e["question"] for e in json.load(f) if e.get("question")]
+    return docs[:limit]
+
+
+def time_load(disable, n):
+    total = 0.0
+    nlp = None
+    for _ in range(n):
+        t0 = time.perf_counter()
+        nlp = spacy.load(SPACY_MODEL, disable=list(disable))
+        total += time.perf_counter() - t0
+    return nlp, total / n
+
+
+def main():
+    args  = parse_args()
+    texts = load_texts(args.limit)
+    if not texts:
+        print("[FATAL] No chunks or questions found. Ingest a syllabus first.")
+        sys.exit(1)
+    chars = sum(len(t) for t in texts)
+    print(f"\nTexts: {len(texts)} | chars: {chars} | model: {SPACY_MODEL}")
+
+    full_nlp, full_load    = time_load((), args.loads)
+    trim_nlp, trimmed_load = time_load(SPACY_DISABLE, args.loads)
+
+    report = {
+        "texts": len(texts),
+        "chars": chars,
+        "load_seconds": {
+            "full":    round(full_load, 3),
+            "trimmed": round(trimmed_load, 3),
+            "pipes_full":    full_nlp.pipe_names,
+            "pipes_trimmed": trim_nlp.pipe_names,
+        },
+        "throughput": {},
+    }
+
+    # Old path: one full-pipeline doc at a time
+    t0 = time.perf_counter()
+    full_docs = [full_nlp(t) for t in texts]
+    secs = time.perf_counter() - t0
+    report["throughput"]["full_sequential"] = round(len(texts) / secs, 2)
+
+    # Registry path: batched pipe on the trimmed pipeline
+    trimmed_docs = None
+    for n_proc in [int(x) for x in args.n_process.split(",") if x.strip()]:
+        t0 = time.perf_counter()
+        docs = list(trim_nlp.pipe(texts, batch_size=args.batch_size, n_process=n_proc))
+        secs = time.perf_counter() - t0
+        report["throughput"][f"trimmed_pipe_n{n_proc}"] = round(len(texts) / secs, 2)
+        trimmed_docs = trimmed_docs or docs
+
+    mismatched = sum(
+        concepts_from_doc(a, t) != concepts_from_doc(b, t)
+        for a, b, t in zip(full_docs, trimmed_docs, texts)
+    )
+    report["concept_parity"] = round(1.0 - mismatched / len(texts), 4)
+
+    print(f"\nModel load: full {full_load:.2f}s | trimmed {trimmed_load:.2f}s "
+          f"(old path paid the full load on every extraction)")
+    print(f"\n{'Mode':<22}{'docs/sec':>10}")
+    print("-" * 32)
+    for mode, dps in report["throughput"].items():
+        print(f"{mode:<22}{dps:>10.1f}")
+    print(f"\nConcept parity (full vs trimmed): {report['concept_parity']:.4f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
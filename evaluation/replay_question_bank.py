@@ -0,0 +1,149 @@
+"""
+replay_question_bank.py
+=======================
+Replay report for the semantic question bank: how many LLM calls do
+paraphrased repeats across historical papers save?
+
+Papers are replayed oldest first, each as one /analyze_question call:
+
+    --papers DIR     every *.txt file in DIR is one paper (sorted by name,
+                     e.g. 2019.txt, 2020.txt, ...), questions as "Q1. ... Q2. ..."
+    (default)        the evaluation dataset split into --paper-size chunks
+
+For every question the report counts the "cache_source" of the answer:
+
+    fresh      analyzed end to end (an LLM call when "llm_decision" is set)
+    exact      result cache — the same question seen before
+    semantic   question bank — a paraphrase of an earlier question
+
+"LLM calls saved" counts reused answers whose original analysis consulted
+the LLM.  With --verify every semantic reuse is re-analyzed with
+"use_cache": false and the verdicts are compared, which is how
+QUESTION_BANK_MIN_COSINE should be tuned.
+
+Start from an empty bank for a meaningful report (POST /purge_all, or point
+QUESTION_BANK_PATH / RESULT_CACHE_PATH at fresh files).  Needs the backend
+running.
+
+Usage:
+    python replay_question_bank.py --syllabus IT-VIII-PEC-IT801B
+    python replay_question_bank.py --syllabus IT-VIII-PEC-IT801B --papers past_papers/ --verify
+"""
+
+import sys
+import json
+import argparse
+from collections import Counter
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("[FATAL] 'requests' is not installed. Run: pip install requests")
+    sys.exit(1)
+
+_EVAL_DIR       = Path(__file__).resolve().parent
+DATASET_PATH    = _EVAL_DIR / "evaluation_dataset.json"
+DEFAULT_BACKEND = "http://127.0.0.1:5000"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="LLM calls saved by semantic reuse across historical papers.")
+    p.add_argument("--backend",    default=DEFAULT_BACKEND, help="Flask backend base URL.")
+    p.add_argument("--syllabus",   required=True,           help="syllabus_id the papers belong to.")
+    p.add_argument("--papers",     default=None,            help="Directory of *.txt papers, replayed in name order.")
+    p.add_argument("--paper-size", default=20,  type=int,   help="Questions per paper when replaying the dataset.")
+    p.add_argument("--threshold",  default=0.2, type=float, help="Analysis threshold forwarded to the backend.")
+    p.add_argument("--verify",     action="store_true",     help="Re-analyze semantic reuses uncached and compare verdicts.")
+    p.add_argument("--output",     default=str(_EVAL_DIR / "question_bank_replay.json"), help="JSON report path.")
+    return p.parse_args()
+
+
+def load_papers(args):
+    if args.papers:
+        files = sorted(Path(args.papers).glob("*.txt"))
+        return [(f.stem, f.read_text(encoding="utf-8")) for f in files]
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        pool = [e["question"] for e in json.load(f) if e.get("question") and "REPLACE_ME" not in e["question"]]
+    size = max(1, args.paper_size)
+    return [
+        (f"dataset-{i // size + 1}", " ".join(f"Q{j + 1}. {q}" for j, q in enumerate(pool[i:i + size])))
+        for i in range(0, len(pool), size)
+    ]
+
+
+def analyze(backend, text, syllabus_id, threshold, use_cache=True):
+    resp = requests.post(
+        f"{backend}/analyze_question",
+        json={"question": text, "syllabus_id": syllabus_id, "threshold": threshold, "use_cache": use_cache},
+        timeout=3600,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return data["questions"] if data.get("mode") == "batch" else [data]
+
+
+def main():
+    args   = parse_args()
+    papers = load_papers(args)
+    if not papers:
+        print("[FATAL] No papers to replay.")
+        sys.exit(1)
+
+    totals  = Counter()
+    per_paper, reuses = [], []
+    for name, text in papers:
+        results = analyze(args.backend, text, args.syllabus, args.threshold)
+        counts  = Counter()
+        for r in results:
+            source = r.get("cache_source") or "fresh"
+            counts[source] += 1
+            if r.get("llm_decision") is not None:
+                counts["llm_calls" if source == "fresh" else "llm_saved"] += 1
+            if source == "semantic":
+                reuses.append(r)
+        totals.update(counts)
+        per_paper.append({"paper": name, "questions": len(results), **counts})
+        print(f"  {name:<20} {len(results):>4} q | fresh {counts['fresh']:>3} | exact {counts['exact']:>3} "
+              f"| semantic {counts['semantic']:>3} | LLM calls {counts['llm_calls']:>3} | saved {counts['llm_saved']:>3}")
+
+    questions = sum(p["questions"] for p in per_paper)
+    would_be  = totals["llm_calls"] + totals["llm_saved"]
+    report = {
+        "syllabus_id":       args.syllabus,
+        "threshold":         args.threshold,
+        "papers":            per_paper,
+        "questions":         questions,
+        "fresh":             totals["fresh"],
+        "exact_reuse":       totals["exact"],
+        "semantic_reuse":    totals["semantic"],
+        "llm_calls":         totals["llm_calls"],
+        "llm_calls_saved":   totals["llm_saved"],
+        "llm_saved_ratio":   round(totals["llm_saved"] / would_be, 4) if would_be else 0.0,
+        "semantic_examples": [
+            {"question": r["question"], "reused_question": r.get("reused_question"),
+             "cosine": r.get("reused_similarity")}
+            for r in reuses[:25]
+        ],
+    }
+
+    if args.verify and reuses:
+        agree = 0
+        for r in reuses:
+            fresh = analyze(args.backend, r["question"], args.syllabus, args.threshold, use_cache=False)[0]
+            agree += fresh.get("is_in_syllabus") == r.get("is_in_syllabus")
+        report["semantic_verdict_agreement"] = round(agree / len(reuses), 4)
+
+    print(f"\n{questions} questions over {len(papers)} papers: "
+          f"{totals['llm_calls']} LLM calls made, {totals['llm_saved']} saved "
+          f"({report['llm_saved_ratio']:.1%}); {totals['semantic']} semantic / {totals['exact']} exact reuses")
+    if "semantic_verdict_agreement" in report:
+        print(f"Semantic reuse verdict agreement: {report['semantic_verdict_agreement']:.4f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -130,6 +130,12 @@ def main():
     scores = {"B1": [], "B2": [], "B3": [], "B4": [], "B5": []}
     times = {"B1": [], "B2": [], "B3": [], "B4": [], "B5": []}
     
+    # B3 for the whole dataset in one batched retrieval (one encode call, one
+    # top-k); its time is shared equally between the questions
+    t0 = time.perf_counter()
+    sbert_results = vector_db.query_many([e["question"] for e in dataset], k=1, syllabus_id=syllabus_id)
+    sbert_time = (time.perf_counter() - t0) / max(len(dataset), 1)
+
     print("Executing Pass 1 (Scoring)...")
     for i, entry in enumerate(dataset, start=1):
         q = entry["question"]
@@ -147,11 +153,9 @@ def main():
         times["B2"].append(time.perf_counter() - t0)
         
         # B3
-        t0 = time.perf_counter()
-        sbert_res = vector_db.query(q, k=1, syllabus_id=syllabus_id)
-        dists = sbert_res.get("distances")
+        dists = sbert_results[i - 1].get("distances")
         scores["B3"].append(1.0 - dists[0][0] if dists and dists[0] else 0.0)
-        times["B3"].append(time.perf_counter() - t0)
+        times["B3"].append(sbert_time)
         
         # B4 & B5
         t0 = time.perf_counter()
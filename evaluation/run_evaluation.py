@@ -99,6 +99,7 @@ def parse_args():
     p.add_argument("--syllabus",  default=None,                    help="Force a specific syllabus_id.")
     p.add_argument("--threshold", default=DEFAULT_THRESHOLD, type=float, help="Similarity gatekeeper threshold.")
     p.add_argument("--output",    default=str(DEFAULT_OUTPUT),     help="Output directory for reports.")
+    p.add_argument("--no-cache",  action="store_true",             help="Bypass the backend result cache (e.g. after code changes).")
     return p.parse_args()
 
 
@@ -210,6 +211,7 @@ def analyze_question(
     syllabus_id: str,
     threshold: float,
     backend_url: str,
+    use_cache: bool = True,
 ) -> dict:
     """
     POST to /analyze_question and return the structured result dict.
@@ -220,6 +222,7 @@ def analyze_question(
         "syllabus_id": syllabus_id,
         "threshold":   threshold,
         "mode":        "text",
+        "use_cache":   "true" if use_cache else "false",
     }
     try:
         resp = requests.post(
@@ -246,6 +249,7 @@ def run_evaluation_loop(
     syllabus_id: str,
     threshold:   float,
     backend_url: str,
+    use_cache:   bool = True,
 ) -> list:
     """
     Send every question through the backend and return a list of result records.
@@ -265,7 +269,7 @@ def run_evaluation_loop(
         short_q  = question[:70] + "..." if len(question) > 70 else question
         print(f"  [{i:>3}/{total}] {short_q}")
 
-        api_resp = analyze_question(question, syllabus_id, threshold, backend_url)
+        api_resp = analyze_question(question, syllabus_id, threshold, backend_url, use_cache)
 
         is_error   = "_error" in api_resp
         predicted  = bool(api_resp.get("is_in_syllabus", False))
@@ -586,6 +590,7 @@ def main():
         syllabus_id = syllabus_id,
         threshold   = args.threshold,
         backend_url = args.backend,
+        use_cache   = not args.no_cache,
     )
 
     # ── Step 4 & 5: Compute metrics ──────────────────────────────────────────